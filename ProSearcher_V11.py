@@ -1,18 +1,44 @@
 import requests
-from requests.adapters import HTTPAdapter
+import numpy as np
+from requests.adapters import HTTPAdapter, BaseAdapter
+from requests.structures import CaseInsensitiveDict
 from urllib3.util.retry import Retry
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
+try:
+    import lxml # noqa: F401 - opsiyonel, daha hızlı HTML parser
+    HTML_PARSER = "lxml"
+except ImportError:
+    HTML_PARSER = "html.parser"
 import sqlite3
 import time
 import random
 import logging
 from datetime import datetime, timedelta
 import sys
+import argparse
 import os
 import re
 import statistics
+import bisect
 import json
+import hashlib
+import gzip
+import base64
+import zlib
 import math
+import itertools
+import threading
+import queue
+import heapq
+import signal
+import contextlib
+import cProfile
+from dataclasses import dataclass
+import pstats
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from urllib.parse import urlparse, urljoin, parse_qsl, urlencode, urlunparse
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -22,11 +48,84 @@ class Config:
     BASE_URL = os.getenv("TARGET_URL", "https://www.sahibinden.com/kategori/bilgisayar-cevre-birimleri")
     DB_NAME = os.getenv("DB_NAME", "ilan_takip_v11_cognitive.db")
     CHECK_INTERVAL = int(os.getenv("CHECK_INTERVAL", 300))
+    # Çok hedefli tarama: virgülle ayrılmış kategori URL'leri (boşsa sadece TARGET_URL)
+    TARGETS = [u.strip() for u in os.getenv("TARGET_URLS", "").split(",") if u.strip()] or [BASE_URL]
     DISCORD_WEBHOOK_URL = os.getenv("DISCORD_WEBHOOK_URL")
     
     MAX_PAGES = 5
     MIN_SAMPLE_SIZE = 10
     
+    # Tarama (Fetch) Katmanı
+    PAGE_SIZE = 20 # Sayfalama adımı (pagingOffset)
+    FETCH_CONCURRENCY = int(os.getenv("FETCH_CONCURRENCY", 4))
+    RATE_LIMIT_PER_SEC = float(os.getenv("RATE_LIMIT_PER_SEC", 1.0)) # Host başına istek/saniye
+    RATE_LIMIT_BURST = 3
+    FETCH_TIMEOUT = 15       # saniye
+    FETCH_MAX_RETRIES = 4    # 429/5xx için tekrar sayısı
+    BACKOFF_BASE = 2.0       # saniye, her denemede ikiye katlanır
+    BACKOFF_MAX = 60.0
+    # Artımlı tarama: sayfanın bu oranı değişmemiş ilanlardan oluşuyorsa sayfalamayı durdur
+    INCREMENTAL_CRAWL = os.getenv("INCREMENTAL_CRAWL", "1") == "1"
+    INCREMENTAL_STOP_RATIO = 0.8
+    FULL_SWEEP_EVERY = int(os.getenv("FULL_SWEEP_EVERY", 12)) # Her N döngüde bir tam tarama
+    DEACTIVATE_AFTER_MISSES = 3 # Art arda bu kadar tam taramada görülmeyen ilan pasife alınır
+    STRATEGY_YIELD_DROP = 0.5 # Son başarılı verimin bu oranının altına düşerse diğer stratejiler denenir
+    # Parse + sınıflandırma süreç havuzu (0 = aynı süreçte, GIL'i paylaşır)
+    PARSE_WORKERS = int(os.getenv("PARSE_WORKERS", 0))
+    PARSE_CHUNK = int(os.getenv("PARSE_CHUNK", 2)) # Worker'a tek seferde gönderilen sayfa sayısı
+    WRITE_BATCH_PAGES = int(os.getenv("WRITE_BATCH_PAGES", 8)) # Akışta tek transaction'da yazılan sayfa sayısı
+    
+    # Zamanlayıcı: hedef başına uyarlanan tarama aralığı
+    MIN_CHECK_INTERVAL = int(os.getenv("MIN_CHECK_INTERVAL", 60))
+    MAX_CHECK_INTERVAL = int(os.getenv("MAX_CHECK_INTERVAL", 900))
+    TARGET_CHURN = 5       # Döngü başına "normal" değişim (yeni + fiyatı değişen ilan); üstü aralığı kısaltır
+    CHURN_SMOOTHING = 0.3  # Değişim EWMA ağırlığı (yeni gözlem)
+    
+    # Tekrar ilan (repost) tespiti: başlık MinHash + LSH (imza boyu/band değişirse indeks yeniden kurulmalı)
+    DUP_NUM_PERM = 64          # MinHash imza uzunluğu
+    DUP_BANDS = 8              # LSH bandı; band başına 8 satır -> ~0.77 benzerlikte %50 aday olma olasılığı
+    DUP_THRESHOLD = 0.8        # Tahmini Jaccard benzerliği eşiği (karakter 4-gram)
+    DUP_PRICE_TOLERANCE = 0.1  # Fiyat farkı bu oranı aşan benzer başlıklar tekrar sayılmaz
+    DUP_BUCKET_CAP = 32        # Kova başına üye sınırı (aynı başlık yığınları aramayı doğrusal yapmasın)
+    
+    # Emsal ilanlar: başlık token'ı -> ilan ters indeksi
+    COMPARABLES_K = 3            # Açıklamada gösterilen emsal sayısı
+    TOKEN_MAX_POSTINGS = 2000    # Sorgu başına okunan posting bütçesi; daha sık token'lar ("temiz", "kutulu") yok sayılır
+    
+    # Bildirim Kuyruğu (Discord)
+    NOTIFY_QUEUE_SIZE = 500      # Bellekteki kuyruk sınırı; taşanlar DB'de bekler
+    NOTIFY_BATCH = 10            # Discord: mesaj başına en fazla 10 embed
+    NOTIFY_TIMEOUT = 10          # saniye
+    NOTIFY_COOLDOWN = 6 * 3600   # Aynı ilan + karar için tekrar bildirim aralığı (saniye)
+    NOTIFY_RETENTION = 7 * 86400 # Gönderilmiş kayıtların saklanma süresi (saniye)
+    
+    # Fiyat geçmişi: son N saatlik pencerede fiyat eğimi (recent_velocity)
+    VELOCITY_WINDOW_HOURS = 48
+    
+    # Piyasa özeti (dashboard nabzı ve trend serisi)
+    MARKET_SUMMARY_RETENTION = 90 * 86400 # Özet satırlarının saklanma süresi (saniye)
+    MARKET_SUMMARY_EVERY = int(os.getenv("MARKET_SUMMARY_EVERY", 300)) # Hedef sayısından bağımsız en sık anlık görüntü (saniye)
+    MARKET_SUMMARY_FULL_RES = 7 * 86400 # Bundan eski anlık görüntüler günde bire seyreltilir (saniye)
+    
+    # Döngü metrikleri (cycle_metrics tablosu + Prometheus)
+    METRICS_FILE = os.getenv("METRICS_FILE") # node_exporter textfile collector için .prom yolu
+    METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+    METRICS_PORT = int(os.getenv("METRICS_PORT", 0)) # 0 = /metrics sunucusu kapalı
+    CYCLE_METRICS_RETENTION = 30 * 86400 # saniye
+    
+    # Soğuk arşiv: uzun süredir pasif ilanlar + fiyat geçmişleri gzip NDJSON dosyalarına taşınır
+    ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", "archive")
+    ARCHIVE_AFTER_DAYS = int(os.getenv("ARCHIVE_AFTER_DAYS", 30)) # 0 = arşivleme kapalı
+    ARCHIVE_EVERY = 86400  # Zamanlayıcının arşiv işini çalıştırma aralığı (saniye)
+    ARCHIVE_BATCH = 5000   # Tek transaction'da taşınan ilan sayısı
+    
+    # Kayıt / tekrar oynatma: ham yanıtlar gzip JSONL'e eklenir, `replay` ile çevrimdışı oynatılır
+    CAPTURE_FILE = os.getenv("CAPTURE_FILE") # Boş = kayıt kapalı
+    
+    # Veritabanı
+    DB_BUSY_TIMEOUT = 10.0 # saniye (kilitli DB'de bekleme süresi)
+    DB_IN_CHUNK = 500      # IN (...) sorgularında parametre grubu boyutu
+    
     # Sigmoid Parametreleri (Z-Score Dönüşümü için)
     # Bu ayarlar Z=-2.0 civarında maksimum ivmelenmeyi sağlar.
     SIGMOID_CENTER = 2.0  
@@ -35,7 +134,10 @@ class Config:
     # Risk Yönetimi
     CRITICAL_LOW_Z = -4.5 # Bu noktanın altı artık "Outlier/Hata" bölgesidir.
 
-    # Harici Config (Simülasyon)
+    # Harici Config: rules.json (değişince döngü başında yeniden yüklenir)
+    RULES_FILE = os.getenv("RULES_FILE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "rules.json"))
+    
+    # Gömülü varsayılan kurallar (rules.json yoksa / geçersizse; eski DB'lerin sınıflandığı taksonomi)
     EXTERNAL_CONFIG = """
     {
         "TAXONOMY": {
@@ -75,7 +177,10 @@ class Config:
     """
     
     USER_AGENTS = [
-        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/127.0.0.0 Safari/537.36"
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/127.0.0.0 Safari/537.36",
+        "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.5 Safari/605.1.15",
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:128.0) Gecko/20100101 Firefox/128.0",
+        "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/126.0.0.0 Safari/537.36"
     ]
 
 logging.basicConfig(
@@ -85,11 +190,193 @@ logging.basicConfig(
 )
 
 class ConfigLoader:
-    _data = json.loads(Config.EXTERNAL_CONFIG)
+    """
+    V11: rules.json'dan kural yükleyici. Dosya doğrulanır, taksonomi derlenir
+    ve (veri, derlenmiş, sürüm) üçlüsü tek atamayla değiştirilir; okuyan thread
+    hiçbir zaman yarım kural görmez. Dosya yoksa / geçersizse eldeki kurallar kalır.
+    """
+    _rules = (json.loads(Config.EXTERNAL_CONFIG), None, 1) # (veri, CompiledTaxonomy, sürüm)
+    _stamp = None  # Yüklenen dosyanın (mtime_ns, boyut) damgası
+    _checked = False
+    _lock = threading.Lock()
+
+    SELECTOR_KEYS = ("name", "container", "title", "price", "link", "id")
+
+    @classmethod
+    def _current(cls):
+        if not cls._checked: cls.reload_if_changed()
+        return cls._rules
+
+    @classmethod
+    def get_taxonomy(cls): return cls._current()[0]['TAXONOMY']
+    @classmethod
+    def get_selectors(cls): return cls._current()[0]['SELECTORS']['strategies']
+    @classmethod
+    def get_version(cls): return cls._current()[2]
+
     @classmethod
-    def get_taxonomy(cls): return cls._data['TAXONOMY']
+    def compiled(cls):
+        data, compiled, version = cls._current()
+        if compiled is None:
+            # Gömülü varsayılanlar ilk kullanımda derlenir
+            with cls._lock:
+                if cls._rules[1] is None and cls._rules[2] == version:
+                    cls._rules = (data, CompiledTaxonomy(data['TAXONOMY']), version)
+            compiled = cls._rules[1]
+        return compiled
+
+    @staticmethod
+    def default_taxonomy(): return json.loads(Config.EXTERNAL_CONFIG)['TAXONOMY']
+
+    @classmethod
+    def snapshot(cls):
+        """(veri, sürüm): worker süreçlerine aynı kuralları kurmak için."""
+        data, _, version = cls._current()
+        return data, version
+
+    @classmethod
+    def install(cls, data, version):
+        """Üst süreçten gelen kuralları kurar; dosya izlenmez (worker süreçleri)."""
+        with cls._lock:
+            cls._rules = (data, CompiledTaxonomy(data['TAXONOMY']), version)
+            cls._checked = True
+
     @classmethod
-    def get_selectors(cls): return cls._data['SELECTORS']['strategies']
+    def validate(cls, data):
+        """Kural dosyasındaki hataların listesi (boş = geçerli)."""
+        errors = []
+        tax = data.get('TAXONOMY') if isinstance(data, dict) else None
+        if not isinstance(tax, dict): return ["TAXONOMY bölümü yok"]
+        # Bölüm tipi yanlışsa (ör. "SPECS": []) hata olarak raporlanır, boş bölüm gibi devam edilir
+        specs = tax.get('SPECS', {})
+        if not isinstance(specs, dict): errors.append("SPECS sözlük olmalı"); specs = {}
+        for name, det in specs.items():
+            if not isinstance(det, dict) or not isinstance(det.get('regex'), str):
+                errors.append(f"SPECS.{name}: regex eksik"); continue
+            try: re.compile(det['regex'])
+            except re.error as e: errors.append(f"SPECS.{name}: geçersiz regex ({e})")
+        cats = tax.get('CATEGORIES')
+        if not isinstance(cats, dict): errors.append("CATEGORIES sözlük olmalı"); cats = {}
+        elif not cats: errors.append("CATEGORIES boş")
+        for name, det in cats.items():
+            if not isinstance(det, dict) or not isinstance(det.get('regex'), str):
+                errors.append(f"CATEGORIES.{name}: regex eksik"); continue
+            try: re.compile(det['regex'])
+            except re.error as e: errors.append(f"CATEGORIES.{name}: geçersiz regex ({e})")
+            spec = det.get('dominant_spec')
+            if spec is not None and (not isinstance(spec, str) or spec not in specs):
+                errors.append(f"CATEGORIES.{name}: bilinmeyen dominant_spec '{spec}'")
+        brands = tax.get('BRANDS')
+        if not isinstance(brands, dict): errors.append("BRANDS sözlük olmalı"); brands = {}
+        elif not brands: errors.append("BRANDS boş")
+        for name, det in brands.items():
+            syn = det.get('synonyms') if isinstance(det, dict) else None
+            if not isinstance(syn, list) or not all(isinstance(x, str) and x for x in syn):
+                errors.append(f"BRANDS.{name}: synonyms metin listesi olmalı")
+            if not isinstance(det, dict) or not isinstance(det.get('tier'), str):
+                errors.append(f"BRANDS.{name}: tier eksik")
+        selectors = data.get('SELECTORS')
+        strategies = selectors.get('strategies') if isinstance(selectors, dict) else None
+        if not isinstance(strategies, list): errors.append("SELECTORS.strategies liste olmalı"); strategies = []
+        elif not strategies: errors.append("SELECTORS.strategies boş")
+        for i, strat in enumerate(strategies):
+            missing = [k for k in cls.SELECTOR_KEYS if not isinstance(strat, dict) or not strat.get(k)]
+            if missing: errors.append(f"SELECTORS.strategies[{i}]: eksik alan {missing}")
+        return errors
+
+    @classmethod
+    def load(cls, path=None):
+        """Dosyayı okur, doğrular, derler ve kuralları atomik olarak değiştirir."""
+        path = path or Config.RULES_FILE
+        st = os.stat(path)
+        with open(path, encoding="utf-8") as f: data = json.load(f)
+        errors = cls.validate(data)
+        if errors: raise ValueError("; ".join(errors))
+        compiled = CompiledTaxonomy(data['TAXONOMY']) # Eşleşme maliyeti burada, ilan başına değil
+        with cls._lock:
+            cls._rules = (data, compiled, cls._rules[2] + 1)
+            cls._stamp = (st.st_mtime_ns, st.st_size)
+        logging.info(f"Kurallar yüklendi: {path} (sürüm {cls._rules[2]})")
+        return True
+
+    @classmethod
+    def reload_if_changed(cls, path=None):
+        """
+        Dosyanın mtime/boyutu değiştiyse yeniden yükler (döngü başına tek stat).
+        Kurallar değiştiyse True. Hatalı dosyada eski kurallar korunur.
+        """
+        path = path or Config.RULES_FILE
+        cls._checked = True
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return False
+        if (st.st_mtime_ns, st.st_size) == cls._stamp: return False
+        try:
+            return cls.load(path)
+        except Exception as e:
+            # validate'in yakalamadığı bir biçim hatası da döngüyü durdurmasın; aynı bozuk
+            # dosya için her döngüde uyarı basma
+            cls._stamp = (st.st_mtime_ns, st.st_size)
+            logging.error(f"Kurallar yüklenemedi, önceki kurallar kullanılıyor: {path}: {e}")
+            return False
+
+class Clock:
+    """
+    V11: Veri yolunun saati (ilan damgaları, fiyat hızı, sayfa önbelleği, arşiv
+    kesimi). Varsayılan gerçek saattir; tekrar oynatmada kayıttaki döngü
+    zamanına sabitlenir, aynı kayıt her çalıştırmada aynı puanları üretir.
+    Zamanlayıcı, bildirim kuyruğu ve metrikler gerçek saatte kalır.
+    """
+    _frozen = None
+
+    @classmethod
+    def time(cls):
+        return time.time() if cls._frozen is None else cls._frozen
+
+    @classmethod
+    def now(cls):
+        return datetime.fromtimestamp(cls.time())
+
+    @classmethod
+    def freeze(cls, ts): cls._frozen = ts
+
+    @classmethod
+    def release(cls): cls._frozen = None
+
+# --- KAYIT TİPLERİ ---
+# İlan hattında taşınan kayıtlar. __slots__'lu dataclass: ilan başına sözlükten
+# çok daha az bellek, yanlış alan adı sessizce yeni anahtar açmak yerine hata verir.
+@dataclass(slots=True)
+class Listing:
+    """Sayfadan çıkarılan ilan (alan adları ilan tablosu kolonlarıyla aynı)."""
+    ilan_id: str
+    baslik: str
+    fiyat: float
+    currency: str
+    ilan_url: str
+
+@dataclass(slots=True)
+class TaxonomyResult:
+    """Başlığın sınıfı; dup_group_id upsert'te atanır (tekrar ilan grubu)."""
+    category: str = 'Diğer'
+    brand: str = 'Unknown'
+    tier: str = 'UNKNOWN'
+    cluster_key: str = 'generic'
+    dominant_spec: str = None
+    dup_group_id: str = None
+
+@dataclass(slots=True)
+class Decision:
+    """DecisionEngine.evaluate sonucu; comparables karar NEUTRAL değilse doldurulur."""
+    score: int
+    decision: str
+    z_score: float
+    stats: dict
+    flags: list
+    explanation: str
+    velocity: float
+    comparables: list = None
 
 class MathEngine:
     """
@@ -127,122 +414,1373 @@ class MathEngine:
             
         return val
 
-class TaxonomyEngine:
-    @staticmethod
-    def analyze(title):
-        conf = ConfigLoader.get_taxonomy()
-        t_low = title.lower()
-        res = {'category': 'Diğer', 'brand': 'Unknown', 'tier': 'UNKNOWN', 'cluster_key': 'generic'}
-        
+class SynonymAutomaton:
+    """
+    V11: Aho-Corasick otomatı. Başlık tek geçişte taranır; maliyet eşanlamlı
+    sayısından bağımsızdır. Her düğüm, o noktada biten eşleşmelerin en küçük
+    öncelik değerini (marka sırası) taşır.
+    """
+    def __init__(self, patterns):
+        # patterns: [(metin, öncelik), ...]
+        self.goto = [{}]
+        self.out = [math.inf]
+        for text, prio in patterns:
+            node = 0
+            for ch in text:
+                nxt = self.goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(self.goto)
+                    self.goto[node][ch] = nxt
+                    self.goto.append({})
+                    self.out.append(math.inf)
+                node = nxt
+            self.out[node] = min(self.out[node], prio)
+        self._build_links()
+
+    def _build_links(self):
+        self.fail = [0] * len(self.goto)
+        # Kök çıktısı (boş eşanlamlı) her düğüme miras kalır
+        queue = list(self.goto[0].values())
+        for node in queue: self.out[node] = min(self.out[node], self.out[0])
+        i = 0
+        while i < len(queue):
+            node = queue[i]; i += 1
+            for ch, nxt in self.goto[node].items():
+                f = self.fail[node]
+                while f and ch not in self.goto[f]: f = self.fail[f]
+                self.fail[nxt] = self.goto[f].get(ch, 0)
+                self.out[nxt] = min(self.out[nxt], self.out[self.fail[nxt]])
+                queue.append(nxt)
+
+    def best(self, text):
+        """Metinde geçen eşanlamlılar arasından en düşük önceliği döndürür (yoksa inf)."""
+        goto, fail, out = self.goto, self.fail, self.out
+        best = out[0]
+        node = 0
+        for ch in text:
+            while node and ch not in goto[node]: node = fail[node]
+            node = goto[node].get(ch, 0)
+            if out[node] < best:
+                best = out[node]
+                if best == 0: break # İlk markadan daha öncelikli eşleşme olamaz
+        return best
+
+class CompiledTaxonomy:
+    """
+    V11: Taksonomi sürümü başına bir kez derlenen eşleştirici.
+    Kategori/spec regexleri önceden derlenir, markalar tek otomatta toplanır.
+    """
+    def __init__(self, conf):
+        self.categories = []
         for cat, det in conf['CATEGORIES'].items():
-            if re.search(det['regex'], t_low):
-                res['category'] = cat
-                if 'dominant_spec' in det:
-                    spec_regex = conf['SPECS'][det['dominant_spec']]['regex']
-                    m = re.search(spec_regex, t_low)
-                    if m: res['dominant_spec'] = m.group(1)
+            spec = None
+            if 'dominant_spec' in det:
+                spec = re.compile(conf['SPECS'][det['dominant_spec']]['regex'])
+            self.categories.append((cat, re.compile(det['regex']), spec))
+
+        self.brands = list(conf['BRANDS'].items())
+        patterns = [(syn, i) for i, (_, det) in enumerate(self.brands) for syn in det['synonyms']]
+        self.automaton = SynonymAutomaton(patterns)
+
+    def analyze(self, title):
+        t_low = title.lower()
+        res = TaxonomyResult()
+
+        for cat, cat_re, spec_re in self.categories:
+            if cat_re.search(t_low):
+                res.category = cat
+                if spec_re is not None:
+                    m = spec_re.search(t_low)
+                    if m: res.dominant_spec = m.group(1)
                 break
-        
-        for br, det in conf['BRANDS'].items():
-            for syn in det['synonyms']:
-                if syn in t_low:
-                    res['brand'] = br
-                    res['tier'] = det['tier']
-                    break
-            if res['brand'] != 'Unknown': break
-            
+
+        idx = self.automaton.best(t_low)
+        if idx != math.inf:
+            br, det = self.brands[idx]
+            res.brand = br
+            res.tier = det['tier']
+
         parts = []
-        if res['brand'] != 'Unknown': parts.append(res['brand'].lower())
-        if res.get('dominant_spec'): parts.append(res.get('dominant_spec'))
-        if parts: res['cluster_key'] = "_".join(parts)
-        
+        if res.brand != 'Unknown': parts.append(res.brand.lower())
+        if res.dominant_spec: parts.append(res.dominant_spec)
+        if parts: res.cluster_key = "_".join(parts)
+
         return res
 
+class TaxonomyEngine:
+    @classmethod
+    def compiled(cls):
+        # ConfigLoader kural değişiminde derlenmiş matcher'ı da birlikte değiştirir
+        return ConfigLoader.compiled()
+
+    @classmethod
+    def analyze(cls, title):
+        return cls.compiled().analyze(title)
+
+    @classmethod
+    def analyze_many(cls, titles):
+        """Toplu analiz: derlenmiş matcher bir kez alınır, tüm başlıklara uygulanır."""
+        analyze = cls.compiled().analyze
+        return [analyze(t) for t in titles]
+
+    @staticmethod
+    def affected(old, new):
+        """
+        İki taksonomi arasındaki farktan yeniden sınıflanabilecek ilanların
+        (markalar, kategoriler) kümeleri. İlk eşleşen kategori / en öncelikli
+        marka kazandığı için değişen kuraldan sonra gelenler de adaydır.
+        """
+        def from_first_diff(a, b):
+            for i, (x, y) in enumerate(itertools.zip_longest(a, b)):
+                if x != y: return {k for k, _ in a[i:]} | {k for k, _ in b[i:]}
+            return set()
+
+        synonyms = lambda tax: [(k, v['synonyms']) for k, v in tax['BRANDS'].items()]
+        brands = from_first_diff(synonyms(old), synonyms(new))
+        # Sadece tier'ı değişen markalar
+        brands |= {k for k, v in new['BRANDS'].items() if k in old['BRANDS'] and old['BRANDS'][k]['tier'] != v['tier']}
+        if brands: brands.add('Unknown')
+
+        def cat_rules(tax):
+            spec = lambda det: det.get('dominant_spec') and tax['SPECS'][det['dominant_spec']]['regex']
+            return [(k, (v['regex'], spec(v))) for k, v in tax['CATEGORIES'].items()]
+        categories = from_first_diff(cat_rules(old), cat_rules(new))
+        if categories: categories.add('Diğer')
+        return brands, categories
+
+class StatsCache:
+    """
+    V11: Küme bazlı robust istatistik önbelleği.
+    get_prices'ın seviyeleri (cluster / marka / kategori) için sıralı fiyat
+    listeleri tutar. Döngü başında tek sorguyla kurulur, upsert ile artımlı
+    güncellenir; sonuçlar MathEngine.calc_robust_stats ile birebir aynıdır.
+    Tekrar ilan grupları (dup_group_id) her seviyede bir kez, grubun o
+    seviyedeki en düşük fiyatıyla sayılır.
+    """
+    def __init__(self, db):
+        self.db = db
+        self.loaded = False
+        self._groups = {}  # seviye anahtarı -> sıralı fiyat listesi (grup başına bir fiyat)
+        self._members = {} # (seviye anahtarı, grup) -> sıralı üye fiyatları
+        self._memo = {}    # seviye anahtarı -> hesaplanmış istatistik
+        self._rows = {}    # ilan_id -> (seviye anahtarları, fiyat, grup)
+
+    @staticmethod
+    def level_key(category, brand=None, cluster_key=None):
+        """get_prices ile aynı filtre seçimi."""
+        if cluster_key and cluster_key != 'generic': return ('cluster', category, cluster_key)
+        if brand and brand != 'Unknown': return ('brand', category, brand)
+        return ('cat', category)
+
+    @staticmethod
+    def _member_keys(category, brand, cluster_key):
+        keys = [('cat', category)]
+        if cluster_key and cluster_key != 'generic': keys.append(('cluster', category, cluster_key))
+        if brand and brand != 'Unknown': keys.append(('brand', category, brand))
+        return tuple(keys)
+
+    def rebuild(self):
+        self._groups, self._members, self._memo, self._rows = {}, {}, {}, {}
+        rows = self.db.conn.execute("""
+            SELECT ilan_id, category, brand, cluster_key, fiyat_norm, COALESCE(dup_group_id, ilan_id) AS grp FROM ilan
+            WHERE aktif_mi=1 AND fiyat_norm IS NOT NULL ORDER BY fiyat_norm
+        """)
+        for r in rows:
+            keys = self._member_keys(r['category'], r['brand'], r['cluster_key'])
+            price, grp = r['fiyat_norm'], r['grp']
+            self._rows[r['ilan_id']] = (keys, price, grp)
+            # Sorgu fiyata göre sıralı geldiği için append sıralamayı korur; grubun ilk fiyatı en düşüğüdür
+            for k in keys:
+                members = self._members.setdefault((k, grp), [])
+                if not members: self._groups.setdefault(k, []).append(price)
+                members.append(price)
+        self.loaded = True
+
+    def update(self, ilan_id, category, brand, cluster_key, price, group=None):
+        if not self.loaded: return
+        self.remove(ilan_id)
+        if price is None: return
+        keys = self._member_keys(category, brand, cluster_key)
+        grp = group or ilan_id
+        self._rows[ilan_id] = (keys, price, grp)
+        for k in keys:
+            members = self._members.setdefault((k, grp), [])
+            low = members[0] if members else None
+            bisect.insort(members, price)
+            if members[0] != low:
+                data = self._groups.setdefault(k, [])
+                if low is not None: del data[bisect.bisect_left(data, low)]
+                bisect.insort(data, price)
+            self._memo.pop(k, None)
+
+    def remove(self, ilan_id):
+        old = self._rows.pop(ilan_id, None)
+        if not old: return
+        keys, price, grp = old
+        for k in keys:
+            members = self._members[(k, grp)]
+            low = members[0]
+            del members[bisect.bisect_left(members, price)]
+            if not members: del self._members[(k, grp)]
+            if not members or members[0] != low:
+                data = self._groups[k]
+                del data[bisect.bisect_left(data, low)]
+                if members: bisect.insort(data, members[0])
+                if not data: del self._groups[k]
+            self._memo.pop(k, None)
+
+    def invalidate(self):
+        self.loaded = False
+        self._groups, self._members, self._memo, self._rows = {}, {}, {}, {}
+
+    def count(self, key): return len(self._groups.get(key, ()))
+
+    def median(self, key):
+        data = self._groups.get(key)
+        if not data: return None
+        i = len(data) // 2
+        return data[i] if len(data) % 2 else (data[i - 1] + data[i]) / 2
+
+    def resolve(self, category, brand, cluster_key):
+        """DecisionEngine'in L1/L2 fallback zinciri -> kullanılacak seviye anahtarı."""
+        if not self.loaded: self.rebuild()
+        key = self.level_key(category, brand, cluster_key)
+        if self.count(key) < Config.MIN_SAMPLE_SIZE:
+            key = self.level_key(category, brand=brand)
+        return key
+
+    def lookup(self, category, brand, cluster_key):
+        return self.stats(self.resolve(category, brand, cluster_key))
+
+    def stats(self, key):
+        if key not in self._memo:
+            self._memo[key] = self._robust(self._groups.get(key, []))
+        res = self._memo[key]
+        return dict(res) if res else None
+
+    @staticmethod
+    def _robust(data):
+        # Sıralı liste üzerinde calc_robust_stats: median O(1), MAD O(log n)
+        n = len(data)
+        if n < 2: return None
+        i = n // 2
+        median = data[i] if n % 2 else (data[i - 1] + data[i]) / 2
+
+        # |x - median| değerleri medianın solunda ve sağında iki artan dizi oluşturur
+        p = bisect.bisect_right(data, median)
+        na, nb = p, n - p
+        left = lambda j: median - data[p - 1 - j]
+        right = lambda j: data[p + j] - median
+
+        def kth(k):
+            lo, hi = max(0, k + 1 - nb), min(k + 1, na)
+            while lo < hi:
+                a = (lo + hi) // 2
+                b = k + 1 - a
+                if b > 0 and left(a) < right(b - 1): lo = a + 1
+                else: hi = a
+            a, b = lo, k + 1 - lo
+            return max(left(a - 1) if a > 0 else -math.inf, right(b - 1) if b > 0 else -math.inf)
+
+        mad = kth(i) if n % 2 else (kth(i - 1) + kth(i)) / 2
+        if mad == 0: mad = 0.001
+        return {'median': median, 'mad': mad, 'n': n}
+
+class MinHasher:
+    """
+    V11: Başlık MinHash imzaları (numpy). Normalize başlığın 4 baytlık
+    shingle'ları doğrudan 32 bit tamsayıdır; permütasyonlar sabit seed'den
+    üretilir: imzalar süreçler ve yeniden başlatmalar arasında aynıdır, DB'de saklanabilir.
+    """
+    PRIME = 4294967311 # 2^32'den büyük asal; (a*x + b) uint64'te taşmaz
+    SHINGLE = 4
+    BLOCK = 16384 # Hash matrisi blok başına en fazla bu kadar shingle: num_perm x BLOCK x 8 B (~8 MB)
+    MIX = np.uint64(0x100000001B3) # Band satırlarını tek kova anahtarına katlamak için (FNV asalı)
+
+    def __init__(self, num_perm=None, bands=None, seed=1):
+        self.num_perm = num_perm or Config.DUP_NUM_PERM
+        self.bands = bands or Config.DUP_BANDS
+        self.rows = self.num_perm // self.bands
+        rng = np.random.RandomState(seed)
+        self.a = rng.randint(1, 2**32, self.num_perm, dtype=np.uint64)
+        self.b = rng.randint(0, 2**32, self.num_perm, dtype=np.uint64)
+
+    @staticmethod
+    def normalize(title):
+        return " ".join(re.findall(r"\w+", (title or "").lower()))
+
+    def shingles(self, title):
+        data = np.frombuffer(self.normalize(title).encode(), dtype=np.uint8).astype(np.uint64)
+        k = self.SHINGLE
+        if len(data) < k: data = np.pad(data, (0, k - len(data)))
+        # Kayan pencere: ardışık k bayt tek tamsayıya paketlenir
+        x = data[:len(data) - k + 1].copy()
+        for i in range(1, k): x = (x << np.uint64(8)) | data[i:len(data) - k + 1 + i]
+        return x
+
+    def signature(self, title):
+        return self.signatures([title])[0]
+
+    def signatures(self, titles):
+        """
+        Toplu imza: shingle'lar BLOCK'luk bloklar halinde tek matriste hash'lenir,
+        başlık başına min (reduceat). Bellek batch boyundan bağımsız kalır.
+        """
+        parts = [self.shingles(t) for t in titles]
+        out = np.empty((len(parts), self.num_perm), dtype=np.uint32)
+        i = 0
+        while i < len(parts):
+            j, size = i + 1, len(parts[i])
+            while j < len(parts) and size + len(parts[j]) <= self.BLOCK: size += len(parts[j]); j += 1
+            starts = np.cumsum([0] + [len(x) for x in parts[i:j - 1]])
+            h = (np.outer(self.a, np.concatenate(parts[i:j])) + self.b[:, None]) % self.PRIME
+            out[i:j] = np.minimum.reduceat(h, starts, axis=1).T
+            i = j
+        return out
+
+    def band_keys(self, sigs, salts):
+        """
+        (n, num_perm) imzalar -> (n, bands) int64 kova anahtarları. `salts`
+        (ilan başına, ör. küme) anahtara katılır: farklı kümeler aynı kovaya düşmez.
+        """
+        v = sigs.reshape(len(sigs), self.bands, self.rows).astype(np.uint64)
+        h = np.repeat(np.asarray(salts, dtype=np.uint64)[:, None], self.bands, axis=1)
+        for r in range(self.rows): h = h * self.MIX + v[:, :, r] # uint64 taşması bilerek (mod 2^64)
+        return h.view(np.int64)
+
+    def similarity(self, a, b):
+        return np.count_nonzero(a == b) / self.num_perm
+
+class DuplicateIndex:
+    """
+    V11: Tekrar ilan (repost) indeksi. İmzalar ilan_minhash'te, LSH band
+    kovaları lsh_buckets'ta (band, kova) PK'sıyla tutulur; kova anahtarına
+    ilanın kümesi (tuz, imzayla birlikte saklanır) de katılır. Sınıfı değişen
+    ilan yeni kümesinin kovalarına taşınır (rebucket). Yeni ilan sadece kendi kovalarındaki (en fazla
+    bands x DUP_BUCKET_CAP) adaylarla karşılaştırılır; yakın fiyatlı ve en
+    benzer başlıklı adayın grubuna katılır, yoksa kendi grubunu açar
+    (dup_group_id = ilan_id).
+    """
+    def __init__(self, db):
+        self.db = db
+        self.hasher = MinHasher()
+
+    @staticmethod
+    def price_close(price, other):
+        return not (price and other) or abs(price - other) <= Config.DUP_PRICE_TOLERANCE * max(price, other)
+
+    @staticmethod
+    def salt(category, brand, cluster_key):
+        return zlib.crc32(f"{category}|{brand}|{cluster_key}".encode())
+
+    def match(self, sig, cls, price, candidates):
+        """
+        Adaylar [(sınıf, fiyat, grup, imza), ...]: aynı küme ve yakın fiyatlılar
+        arasında en benzerinin grubu (eşiğin altındaysa None). Benzerlik tek numpy işlemi.
+        """
+        cands = [c for c in candidates if c[0] == cls and self.price_close(price, c[1])]
+        if not cands: return None
+        sim = (np.stack([c[3] for c in cands]) == sig).sum(axis=1) / self.hasher.num_perm
+        best = int(sim.argmax())
+        return cands[best][2] if sim[best] >= Config.DUP_THRESHOLD else None
+
+    def _candidates(self, ids):
+        out = {}
+        ids = list(ids)
+        for i in range(0, len(ids), Config.DB_IN_CHUNK):
+            chunk = ids[i:i + Config.DB_IN_CHUNK]
+            for r in self.db.conn.execute(f"""
+                SELECT m.ilan_id, i.category, i.brand, i.cluster_key, i.fiyat_norm, i.dup_group_id, m.sig
+                FROM ilan_minhash m JOIN ilan i ON i.ilan_id = m.ilan_id
+                WHERE m.ilan_id IN ({','.join('?' * len(chunk))})
+            """, chunk):
+                out[r['ilan_id']] = ((r['category'], r['brand'], r['cluster_key']), r['fiyat_norm'],
+                                     r['dup_group_id'] or r['ilan_id'], np.frombuffer(r['sig'], dtype=np.uint32))
+        return out
+
+    def assign(self, items, updates=(), store_salt=True):
+        """
+        items: [(ilan_id, başlık, category, brand, cluster_key, fiyat_norm), ...] yeni ilanlar.
+        İmza ve kovaları çağıranın transaction'ında yazar; {ilan_id: dup_group_id} döndürür.
+        Batch içindeki önceki ilanlar da aday sayılır (sıralı eklemeyle aynı sonuç).
+        updates: [(önceki yeni ilan sayısı, ilan_id, sınıf, fiyat), ...] aynı batch'te
+        güncellenen mevcut ilanlar; aday olduklarında, batch sırasında o ana kadarki
+        fiyat ve sınıflarıyla karşılaştırılırlar (kova üyeliği son sınıfa göredir).
+        store_salt=False: tuz kolonu öncesi şema (göç v14 backfill'i; tuzu v17 yazar).
+        """
+        if not items: return {}
+        conn = self.db.conn
+        sigs = self.hasher.signatures([it[1] for it in items])
+        keys = self.hasher.band_keys(sigs, [self.salt(*it[2:5]) for it in items]).tolist()
+        # Tüm kovalar tek sorguda: geçici tablo + PK join. CROSS JOIN sırayı sabitler;
+        # istatistiksiz planlayıcı aksi halde lsh_buckets'ı baştan sona tarıyor
+        conn.execute("CREATE TEMP TABLE IF NOT EXISTS lsh_probe (band INTEGER, bucket INTEGER, PRIMARY KEY (band, bucket)) WITHOUT ROWID")
+        conn.execute("DELETE FROM temp.lsh_probe")
+        conn.executemany("INSERT OR IGNORE INTO temp.lsh_probe VALUES (?,?)",
+                         ((b, k) for row in keys for b, k in enumerate(row)))
+        buckets = {}
+        for band, bucket, ilan_id in conn.execute("""
+            SELECT b.band, b.bucket, b.ilan_id FROM temp.lsh_probe p
+            CROSS JOIN lsh_buckets b ON b.band = p.band AND b.bucket = p.bucket
+        """):
+            buckets.setdefault((band, bucket), []).append(ilan_id)
+        known = self._candidates({i for ids in buckets.values() for i in ids})
+
+        groups, new_rows = {}, []
+        pending = iter(sorted(updates, key=lambda u: u[0]))
+        upd = next(pending, None)
+        for n, ((ilan_id, _, category, brand, cluster_key, price), sig, row) in enumerate(zip(items, sigs, keys)):
+            while upd and upd[0] <= n:
+                if upd[1] in known: known[upd[1]] = (upd[2], upd[3]) + known[upd[1]][2:]
+                upd = next(pending, None)
+            cands = {cid for b, k in enumerate(row) for cid in buckets.get((b, k), ())}
+            cands.discard(ilan_id)
+            cls = (category, brand, cluster_key)
+            group = self.match(sig, cls, price, [known[c] for c in sorted(cands) if c in known]) or ilan_id
+            for b, k in enumerate(row):
+                members = buckets.setdefault((b, k), [])
+                if len(members) < Config.DUP_BUCKET_CAP and ilan_id not in members:
+                    members.append(ilan_id)
+                    new_rows.append((b, k, ilan_id))
+            groups[ilan_id] = group
+            known[ilan_id] = (cls, price, group, sig)
+        if store_salt:
+            conn.executemany("INSERT OR REPLACE INTO ilan_minhash (ilan_id, sig, salt) VALUES (?,?,?)",
+                             [(it[0], sig.tobytes(), self.salt(*it[2:5])) for it, sig in zip(items, sigs)])
+        else:
+            conn.executemany("INSERT OR REPLACE INTO ilan_minhash (ilan_id, sig) VALUES (?,?)",
+                             [(it[0], sig.tobytes()) for it, sig in zip(items, sigs)])
+        conn.executemany("INSERT OR IGNORE INTO lsh_buckets VALUES (?,?,?)", new_rows)
+        return groups
+
+    def _stored(self, ids):
+        """{ilan_id: (imza, tuz)}: kova anahtarları ilanın o anki sınıfından değil, yazıldığı tuzdan."""
+        out = {}
+        ids = list(ids)
+        for i in range(0, len(ids), Config.DB_IN_CHUNK):
+            chunk = ids[i:i + Config.DB_IN_CHUNK]
+            for r in self.db.conn.execute(
+                    f"SELECT ilan_id, sig, salt FROM ilan_minhash WHERE ilan_id IN ({','.join('?' * len(chunk))})", chunk):
+                out[r['ilan_id']] = (np.frombuffer(r['sig'], dtype=np.uint32), r['salt'])
+        return out
+
+    def _delete_buckets(self, stored):
+        ids = list(stored)
+        keys = self.hasher.band_keys(np.array([stored[i][0] for i in ids]), [stored[i][1] for i in ids]).tolist()
+        self.db.conn.executemany("DELETE FROM lsh_buckets WHERE band=? AND bucket=? AND ilan_id=?",
+                                 [(b, k, i) for i, row in zip(ids, keys) for b, k in enumerate(row)])
+
+    def rebucket(self, items):
+        """
+        items: [(ilan_id, category, brand, cluster_key), ...] sınıfı değişen ilanlar.
+        Eski kova kayıtları saklanan tuzla silinir, imza yeni kümenin kovalarına
+        (DUP_BUCKET_CAP'e kadar) yazılır; grup değişmez. Çağıranın transaction'ında.
+        Taşınan ilan sayısını döndürür.
+        """
+        salts = {it[0]: self.salt(*it[1:4]) for it in items}
+        stored = {i: v for i, v in self._stored(salts).items() if v[1] != salts[i]}
+        if not stored: return 0
+        self._delete_buckets(stored)
+        ids = list(stored)
+        keys = self.hasher.band_keys(np.array([stored[i][0] for i in ids]), [salts[i] for i in ids]).tolist()
+        self.db.conn.executemany("""
+            INSERT OR IGNORE INTO lsh_buckets SELECT ?1, ?2, ?3
+            WHERE (SELECT COUNT(*) FROM lsh_buckets WHERE band=?1 AND bucket=?2) < ?4
+        """, [(b, k, i, Config.DUP_BUCKET_CAP) for i, row in zip(ids, keys) for b, k in enumerate(row)])
+        self.db.conn.executemany("UPDATE ilan_minhash SET salt=? WHERE ilan_id=?", [(salts[i], i) for i in ids])
+        return len(ids)
+
+    def remove(self, ids):
+        """Arşivlenen ilanların imza ve kova kayıtlarını siler (kovalar imza + saklanan tuzdan yeniden hesaplanır)."""
+        ids = list(ids)
+        for i in range(0, len(ids), Config.DB_IN_CHUNK):
+            stored = self._stored(ids[i:i + Config.DB_IN_CHUNK])
+            if not stored: continue
+            self._delete_buckets(stored)
+            self.db.conn.executemany("DELETE FROM ilan_minhash WHERE ilan_id=?", [(x,) for x in stored])
+
+    def rebuild_buckets(self, batch=5000):
+        """
+        Kovaları imzalardan, ilanların güncel sınıfıyla ve ilk görülme sırasıyla
+        baştan kurar; sınıfı değişmiş ilanlardan kalan eski kova kayıtları gider (göç v17).
+        """
+        conn = self.db.conn
+        conn.execute("DELETE FROM ilan_minhash WHERE ilan_id NOT IN (SELECT ilan_id FROM ilan)")
+        conn.execute("DELETE FROM lsh_buckets")
+        rows = conn.execute("""
+            SELECT m.ilan_id, m.sig, i.category, i.brand, i.cluster_key
+            FROM ilan_minhash m JOIN ilan i ON i.ilan_id = m.ilan_id ORDER BY i.first_seen, i.ilan_id
+        """).fetchall()
+        counts = {}
+        for i in range(0, len(rows), batch):
+            chunk = rows[i:i + batch]
+            sigs = np.array([np.frombuffer(r['sig'], dtype=np.uint32) for r in chunk])
+            salts = [self.salt(r['category'], r['brand'], r['cluster_key']) for r in chunk]
+            new_rows = []
+            for r, row in zip(chunk, self.hasher.band_keys(sigs, salts).tolist()):
+                for b, k in enumerate(row):
+                    if counts.get((b, k), 0) < Config.DUP_BUCKET_CAP:
+                        counts[(b, k)] = counts.get((b, k), 0) + 1
+                        new_rows.append((b, k, r['ilan_id']))
+            conn.executemany("INSERT OR IGNORE INTO lsh_buckets VALUES (?,?,?)", new_rows)
+            conn.executemany("UPDATE ilan_minhash SET salt=? WHERE ilan_id=?", [(s, r['ilan_id']) for s, r in zip(salts, chunk)])
+        logging.info(f"LSH kovaları yeniden kuruldu: {len(rows)} ilan")
+
+    def backfill(self, batch=5000):
+        """Mevcut ilanları ilk görülme sırasıyla indeksler (göç v14)."""
+        rows = self.db.conn.execute("""
+            SELECT ilan_id, baslik, category, brand, cluster_key, fiyat_norm FROM ilan ORDER BY first_seen, ilan_id
+        """).fetchall()
+        grouped = 0
+        for i in range(0, len(rows), batch):
+            groups = self.assign([tuple(r) for r in rows[i:i + batch]], store_salt=False)
+            self.db.conn.executemany("UPDATE ilan SET dup_group_id=? WHERE ilan_id=?", [(g, k) for k, g in groups.items()])
+            grouped += sum(1 for k, g in groups.items() if g != k)
+        logging.info(f"Tekrar ilan indeksi kuruldu: {len(rows)} ilan, {grouped} tekrar")
+
+class TokenIndex:
+    """
+    V11: Başlık token'larından ilanlara ters indeks (ilan_tokens, (token,
+    ilan_id) PK'sı). Model numaraları (3080, 27gl850) ve seri adları token
+    olur; harf/rakam bitişik token'lar parçalarıyla da indekslenir (rtx3080 ->
+    rtx, 3080). Emsal araması token başına PK aralığı okur: en nadir token'dan
+    başlayarak toplam TOKEN_MAX_POSTINGS posting'e kadar; sık token'lar hem
+    ayırt edici değil hem de sorguyu yavaşlatır.
+    """
+    def __init__(self, db):
+        self.db = db
+
+    @staticmethod
+    def tokens(title):
+        out = set()
+        for w in MinHasher.normalize(title).split():
+            parts = re.findall(r"[^\W\d_]+|\d+", w)
+            out.update(t for t in [w] + (parts if len(parts) > 1 else []) if len(t) > 1)
+        return out
+
+    def add(self, rows):
+        """rows: [(ilan_id, başlık), ...] (çağıranın transaction'ında)"""
+        self.db.conn.executemany("INSERT OR IGNORE INTO ilan_tokens VALUES (?,?)",
+                                 [(t, ilan_id) for ilan_id, title in rows for t in self.tokens(title)])
+
+    def remove(self, rows):
+        self.db.conn.executemany("DELETE FROM ilan_tokens WHERE token=? AND ilan_id=?",
+                                 [(t, ilan_id) for ilan_id, title in rows for t in self.tokens(title)])
+
+    def backfill(self, batch=5000):
+        rows = self.db.conn.execute("SELECT ilan_id, baslik FROM ilan").fetchall()
+        for i in range(0, len(rows), batch): self.add([tuple(r) for r in rows[i:i + batch]])
+        logging.info(f"Token indeksi kuruldu: {len(rows)} ilan")
+
+    def weights(self, tokens):
+        """{token: idf}: nadirden sıka, toplam posting bütçeyi aşana kadar."""
+        cap = Config.TOKEN_MAX_POSTINGS
+        dfs = sorted((self.db.conn.execute("SELECT COUNT(*) FROM ilan_tokens WHERE token=?", (t,)).fetchone()[0], t)
+                     for t in tokens)
+        out, used = {}, 0
+        for df, t in dfs:
+            if not df: continue
+            used += df
+            if used > cap and out: break # En nadir token her zaman girer
+            out[t] = math.log(1 + cap / df)
+        return out
+
+    def find(self, listing, k=None):
+        """
+        Aynı kategorideki aktif ilanlar arasında ortak token ağırlığı en yüksek k
+        ilan (eşitlikte fiyatı yakın olan önce). Kendisi ve tekrar ilan grubu hariç.
+        -> [{'ilan_id', 'baslik', 'fiyat_norm', 'ilan_url', 'sim'}, ...]
+        """
+        k = k or Config.COMPARABLES_K
+        weights = self.weights(self.tokens(listing['baslik']))
+        if not weights: return []
+        total = sum(weights.values())
+        values = ",".join("(?,?)" for _ in weights)
+        rows = self.db.conn.execute(f"""
+            WITH q(token, w) AS (VALUES {values})
+            SELECT i.ilan_id, i.baslik, i.fiyat_norm, i.ilan_url, SUM(q.w) AS score
+            FROM q CROSS JOIN ilan_tokens t ON t.token = q.token
+            CROSS JOIN ilan i ON i.ilan_id = t.ilan_id -- Sıra sabit: kategoriyi taramak yerine posting'lerden git
+            WHERE i.aktif_mi = 1 AND i.category = ? AND i.ilan_id != ? AND i.dup_group_id IS NOT ?
+            GROUP BY i.ilan_id
+            ORDER BY score DESC, ABS(i.fiyat_norm - ?), i.ilan_id
+            LIMIT ?
+        """, [x for item in weights.items() for x in item] + [
+            listing['category'], listing['ilan_id'], listing.get('dup_group_id') or listing['ilan_id'],
+            listing.get('fiyat_norm') or 0, k]).fetchall()
+        return [{'ilan_id': r['ilan_id'], 'baslik': r['baslik'], 'fiyat_norm': r['fiyat_norm'],
+                 'ilan_url': r['ilan_url'], 'sim': round(r['score'] / total, 3)} for r in rows]
+
+# --- ŞEMA GÖÇLERİ ---
+# (user_version, açıklama, adımlar). Adım bir SQL metni ya da db alan bir fonksiyondur.
+# Uygulanmış göçler değiştirilmez; yeni şema değişiklikleri listenin sonuna eklenir.
+MIGRATIONS = [
+    (1, "ilan tablosu", [
+        """
+        CREATE TABLE IF NOT EXISTS ilan (
+            ilan_id TEXT PRIMARY KEY,
+            baslik TEXT,
+            category TEXT, brand TEXT, cluster_key TEXT,
+            ilan_url TEXT, fiyat REAL, para_birimi TEXT, fiyat_norm REAL,
+            
+            -- Zaman ve Hız (V11)
+            first_seen DATETIME,
+            last_seen DATETIME,
+            initial_price REAL,
+            price_change_count INTEGER DEFAULT 0,
+            hourly_velocity REAL DEFAULT 0.0, -- Saatteki fiyat değişim oranı
+            
+            -- Karar Matrisi
+            opportunity_score INTEGER DEFAULT 0,
+            risk_flags TEXT,
+            decision_label TEXT, -- V11: "Hidden Gem", "Toxic" vb.
+            
+            aktif_mi INTEGER DEFAULT 1
+        )
+        """,
+    ]),
+    (2, "istatistik ve dashboard indeksleri", [
+        # get_prices seviyeleri için kapsayan indeksler (kategori seviyesi ön ekten yararlanır)
+        "CREATE INDEX IF NOT EXISTS idx_ilan_cluster_stats ON ilan(category, cluster_key, aktif_mi, fiyat_norm)",
+        "CREATE INDEX IF NOT EXISTS idx_ilan_brand_stats ON ilan(category, brand, aktif_mi, fiyat_norm)",
+        # Dashboard: WHERE aktif_mi = 1
+        "CREATE INDEX IF NOT EXISTS idx_ilan_aktif ON ilan(aktif_mi)",
+    ]),
+    (3, "tier ve explanation kolonları", [
+        lambda db: db.add_column('ilan', 'tier', 'TEXT'),
+        lambda db: db.add_column('ilan', 'explanation', 'TEXT'),
+    ]),
+    (4, "artımlı tarama sayfa önbelleği", [
+        """
+        CREATE TABLE IF NOT EXISTS page_cache (
+            url TEXT PRIMARY KEY,
+            etag TEXT, last_modified TEXT, -- Koşullu istek başlıkları
+            content_hash TEXT,             -- Gövde değişmediyse parse atlanır
+            ilan_ids TEXT,                 -- Son parse'ta görülen ilanlar (JSON)
+            fetched_at REAL
+        )
+        """,
+    ]),
+    (5, "kalıcı bildirim kuyruğu", [
+        """
+        CREATE TABLE IF NOT EXISTS notification_queue (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            ilan_id TEXT, decision TEXT,
+            payload TEXT,    -- Discord embed (JSON)
+            created_at REAL,
+            sent_at REAL     -- NULL = bekliyor
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_notify_dedupe ON notification_queue(ilan_id, decision, created_at)",
+        "CREATE INDEX IF NOT EXISTS idx_notify_pending ON notification_queue(sent_at, id)",
+    ]),
+    (6, "append-only fiyat geçmişi", [
+        # Sadece fiyat değiştiğinde satır eklenir; (ilan_id, ts) PK'sı tek indeks olarak yeterli
+        """
+        CREATE TABLE IF NOT EXISTS ilan_price_history (
+            ilan_id TEXT NOT NULL,
+            ts INTEGER NOT NULL, -- epoch saniye
+            fiyat_norm REAL,
+            PRIMARY KEY (ilan_id, ts)
+        ) WITHOUT ROWID
+        """,
+        lambda db: db.add_column('ilan', 'recent_velocity', 'REAL DEFAULT 0.0'),
+        lambda db: db.backfill_price_history(),
+    ]),
+    (7, "pasifleştirme için kaçırılan tarama sayacı", [
+        lambda db: db.add_column('ilan', 'missed_cycles', 'INTEGER DEFAULT 0'),
+    ]),
+    (8, "dashboard artımlı yükleme damgası", [
+        # Her yazım (upsert, karar, pasifleştirme) damgayı günceller; dashboard sadece değişenleri çeker
+        lambda db: db.add_column('ilan', 'updated_at', 'REAL'),
+        lambda db: db.conn.executemany("UPDATE ilan SET updated_at=? WHERE ilan_id=?", [
+            (db.epoch(r['last_seen']), r['ilan_id'])
+            for r in db.conn.execute("SELECT ilan_id, last_seen FROM ilan WHERE last_seen IS NOT NULL").fetchall()]),
+        "CREATE INDEX IF NOT EXISTS idx_ilan_updated ON ilan(updated_at)",
+    ]),
+    (9, "dashboard akış ve filtre indeksleri", [
+        # Keyset sayfalama: ORDER BY opportunity_score DESC, ilan_id
+        "CREATE INDEX IF NOT EXISTS idx_ilan_feed ON ilan(aktif_mi, opportunity_score DESC, ilan_id)",
+        # Sidebar seçenekleri (DISTINCT category/brand) indeksten okunur
+        "CREATE INDEX IF NOT EXISTS idx_ilan_filters ON ilan(aktif_mi, category, brand)",
+    ]),
+    (10, "piyasa özeti tablosu", [
+        # scope: all | category | brand | cluster; key: marka ya da küme anahtarı
+        """
+        CREATE TABLE IF NOT EXISTS market_summary (
+            ts INTEGER NOT NULL,
+            scope TEXT NOT NULL,
+            category TEXT NOT NULL DEFAULT '',
+            key TEXT NOT NULL DEFAULT '',
+            n_active INTEGER,
+            n_gem INTEGER,
+            n_good INTEGER,
+            n_spec INTEGER,
+            avg_velocity REAL,
+            min_velocity REAL,
+            max_velocity REAL,
+            median_price REAL,
+            PRIMARY KEY (scope, category, key, ts)
+        ) WITHOUT ROWID
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_summary_ts ON market_summary(ts)",
+    ]),
+    (11, "döngü metrikleri", [
+        """
+        CREATE TABLE IF NOT EXISTS cycle_metrics (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            started_at REAL,
+            duration REAL,
+            full INTEGER,
+            pages INTEGER,
+            listings INTEGER,
+            evaluated INTEGER,
+            deactivated INTEGER,
+            listings_per_sec REAL,
+            cache_hit_rate REAL,  -- NULL = sayfa önbelleğine hiç bakılmadı
+            notify_pending INTEGER,
+            stages TEXT,          -- {aşama: saniye} (JSON)
+            counters TEXT         -- {"isim{etiket}": değer} (JSON)
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_cycle_metrics_started ON cycle_metrics(started_at)",
+    ]),
+    (12, "motor durum tablosu", [
+        # Anahtar/değer: ör. 'taxonomy' = ilanların en son sınıflandığı taksonomi (JSON)
+        "CREATE TABLE IF NOT EXISTS engine_state (key TEXT PRIMARY KEY, value TEXT) WITHOUT ROWID",
+    ]),
+    (13, "çok hedefli tarama", [
+        """
+        CREATE TABLE IF NOT EXISTS crawl_targets (
+            url TEXT PRIMARY KEY,
+            interval REAL,      -- uyarlanmış tarama aralığı (saniye)
+            next_due REAL,      -- sonraki çalışma zamanı (epoch)
+            last_run REAL,
+            last_duration REAL,
+            churn REAL,         -- döngü başına değişim EWMA'sı
+            cycles INTEGER DEFAULT 0
+        )
+        """,
+        # Pasifleştirme hedef bazında: ilan hangi hedefin taramasında görüldü
+        lambda db: db.add_column('ilan', 'target', 'TEXT'),
+        # Eski DB'ler tek hedefle (TARGET_URL) taranmıştı
+        lambda db: db.conn.execute("UPDATE ilan SET target=? WHERE target IS NULL", (Config.BASE_URL,)),
+        "CREATE INDEX IF NOT EXISTS idx_ilan_target ON ilan(target, aktif_mi)",
+        lambda db: db.add_column('cycle_metrics', 'target', 'TEXT'),
+    ]),
+    (14, "tekrar ilan (MinHash-LSH) indeksi", [
+        "CREATE TABLE IF NOT EXISTS ilan_minhash (ilan_id TEXT PRIMARY KEY, sig BLOB) WITHOUT ROWID",
+        """
+        CREATE TABLE IF NOT EXISTS lsh_buckets (
+            band INTEGER, bucket INTEGER, ilan_id TEXT,
+            PRIMARY KEY (band, bucket, ilan_id)
+        ) WITHOUT ROWID
+        """,
+        lambda db: db.add_column('ilan', 'dup_group_id', 'TEXT'),
+        lambda db: db.dups.backfill(),
+        # İstatistik sorguları grup başına tek fiyat alır; indeksler dup_group_id ile kapsayan kalır
+        "DROP INDEX IF EXISTS idx_ilan_cluster_stats",
+        "DROP INDEX IF EXISTS idx_ilan_brand_stats",
+        "CREATE INDEX IF NOT EXISTS idx_ilan_cluster_stats ON ilan(category, cluster_key, aktif_mi, fiyat_norm, dup_group_id)",
+        "CREATE INDEX IF NOT EXISTS idx_ilan_brand_stats ON ilan(category, brand, aktif_mi, fiyat_norm, dup_group_id)",
+        # Bildirim tekrarı grup bazında elenir
+        lambda db: db.add_column('notification_queue', 'group_id', 'TEXT'),
+        "UPDATE notification_queue SET group_id = ilan_id WHERE group_id IS NULL",
+        "DROP INDEX IF EXISTS idx_notify_dedupe",
+        "CREATE INDEX IF NOT EXISTS idx_notify_dedupe ON notification_queue(group_id, decision, created_at)",
+    ]),
+    (15, "emsal ilan token indeksi", [
+        "CREATE TABLE IF NOT EXISTS ilan_tokens (token TEXT, ilan_id TEXT, PRIMARY KEY (token, ilan_id)) WITHOUT ROWID",
+        lambda db: db.tokens.backfill(),
+        lambda db: db.add_column('ilan', 'comparables', 'TEXT'), # Son karardaki emsaller (JSON)
+    ]),
+    (16, "filtre indeksi istatistik sorgularını kapsar", [
+        # ANALYZE sonrası planlayıcı kategori seviyesi get_prices/StatsCache sorgusu için
+        # (aktif_mi, category) eşitliğiyle idx_ilan_filters'ı seçer; fiyat ve grup
+        # kolonları eklenince satır başına tablo okuması kalkar. Sidebar DISTINCT'i aynı ön ekten okur
+        "DROP INDEX IF EXISTS idx_ilan_filters",
+        "CREATE INDEX IF NOT EXISTS idx_ilan_filters ON ilan(aktif_mi, category, brand, fiyat_norm, dup_group_id)",
+    ]),
+    (17, "LSH kova tuzu imzayla birlikte", [
+        # Kova anahtarı ilanın kümesiyle tuzlanır; sınıf değişince eski kova kayıtları
+        # silinemiyordu. Tuz artık saklanır, kovalar güncel sınıflarla baştan kurulur
+        lambda db: db.add_column('ilan_minhash', 'salt', 'INTEGER'),
+        lambda db: db.dups.rebuild_buckets(),
+    ]),
+]
+
 class DatabaseManager:
     def __init__(self, db_name):
-        self.conn = sqlite3.connect(db_name)
+        self.db_name = db_name
+        self.conn = sqlite3.connect(db_name, timeout=Config.DB_BUSY_TIMEOUT)
         self.conn.row_factory = sqlite3.Row
+        # Yeni DB'lerde silinen sayfalar arşivden sonra dosyaya iade edilebilsin (tablo yokken etkili)
+        self.conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        # WAL: Dashboard okuyucuları yazıcıyı bloklamaz, yazıcı da onları
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(f"PRAGMA busy_timeout={int(Config.DB_BUSY_TIMEOUT * 1000)}")
+        self.conn.execute("PRAGMA synchronous=NORMAL") # WAL ile güvenli, commit başına fsync yok
+        self.conn.execute("PRAGMA cache_size=-20000")  # ~20 MB sayfa önbelleği
+        self.conn.execute("PRAGMA temp_store=MEMORY")
         self.cursor = self.conn.cursor()
+        self.dups = DuplicateIndex(self)
+        self.tokens = TokenIndex(self)
         self.migrate()
+        self.stats = StatsCache(self)
+        # Batch içi tekrarlarda sahte "mevcut satır" üretmek için kolon varsayılanları
+        self._row_defaults = {
+            c['name']: self.conn.execute(f"SELECT {c['dflt_value']}").fetchone()[0] if c['dflt_value'] is not None else None
+            for c in self.conn.execute("PRAGMA table_info(ilan)").fetchall()
+        }
 
     def migrate(self):
-        self.cursor.execute("""
-            CREATE TABLE IF NOT EXISTS ilan (
-                ilan_id TEXT PRIMARY KEY,
-                baslik TEXT,
-                category TEXT, brand TEXT, cluster_key TEXT,
-                ilan_url TEXT, fiyat REAL, para_birimi TEXT, fiyat_norm REAL,
-                
-                -- Zaman ve Hız (V11)
-                first_seen DATETIME,
-                last_seen DATETIME,
-                initial_price REAL,
-                price_change_count INTEGER DEFAULT 0,
-                hourly_velocity REAL DEFAULT 0.0, -- Saatteki fiyat değişim oranı
-                
-                -- Karar Matrisi
-                opportunity_score INTEGER DEFAULT 0,
-                risk_flags TEXT,
-                decision_label TEXT, -- V11: "Hidden Gem", "Toxic" vb.
-                
-                aktif_mi INTEGER DEFAULT 1
-            )
-        """)
-        self.conn.commit()
+        """
+        Sürümlü göç çalıştırıcısı: PRAGMA user_version'dan sonraki göçleri
+        sırayla, her birini kendi transaction'ında uygular.
+        """
+        current = self.conn.execute("PRAGMA user_version").fetchone()[0]
+        applied = False
+        for version, desc, steps in MIGRATIONS:
+            if version <= current: continue
+            try:
+                self.conn.execute("BEGIN")
+                for step in steps:
+                    if callable(step): step(self)
+                    else: self.conn.execute(step)
+                self.conn.execute(f"PRAGMA user_version={version}")
+                self.conn.commit()
+            except Exception:
+                self.conn.rollback()
+                raise
+            logging.info(f"DB göçü uygulandı: v{version} ({desc})")
+            applied = True
+        if applied: self.check_indexes()
 
-    def get_prices(self, category, brand=None, cluster_key=None):
-        q = "SELECT fiyat_norm FROM ilan WHERE category=? AND aktif_mi=1 AND fiyat_norm IS NOT NULL"
+    def add_column(self, table, column, decl):
+        # Eski DB'lerde kolon elle eklenmiş olabilir; ALTER tekrarında hata vermesin
+        cols = {r['name'] for r in self.conn.execute(f"PRAGMA table_info({table})")}
+        if column not in cols:
+            self.conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {decl}")
+
+    def backfill_price_history(self):
+        # Mevcut ilanlar için bilinen iki nokta: ilk görülme fiyatı ve (farklıysa) son fiyat
+        rows = []
+        for r in self.conn.execute("SELECT ilan_id, first_seen, last_seen, initial_price, fiyat_norm FROM ilan"):
+            if not r['first_seen']: continue
+            rows.append((r['ilan_id'], self.epoch(r['first_seen']), r['initial_price']))
+            if r['last_seen'] and r['fiyat_norm'] != r['initial_price']:
+                rows.append((r['ilan_id'], self.epoch(r['last_seen']), r['fiyat_norm']))
+        self.conn.executemany("INSERT OR IGNORE INTO ilan_price_history VALUES (?,?,?)", rows)
+
+    @staticmethod
+    def epoch(value):
+        if isinstance(value, str): value = datetime.fromisoformat(value)
+        return int(value.timestamp())
+
+    def check_indexes(self):
+        """
+        İstatistik sorgularının (get_prices seviyeleri) planlarını {seviye: plan}
+        olarak döndürür. Kapsayan indeks kullanmayan seviye uyarı olarak loglanır;
+        açılış bu yüzden durmaz (plan ANALYZE istatistiklerine göre değişebilir).
+        """
+        probes = {
+            'cluster': ('Monitor', 'Asus', 'asus_144hz'),
+            'brand': ('Monitor', 'Asus', None),
+            'category': ('Monitor', None, None),
+        }
+        plans = {}
+        for level, args in probes.items():
+            q, p = self._prices_query(*args)
+            detail = " | ".join(r['detail'] for r in self.conn.execute("EXPLAIN QUERY PLAN " + q, p))
+            if "USING COVERING INDEX idx_ilan_" not in detail:
+                logging.warning(f"{level} istatistik sorgusu kapsayan indeks kullanmıyor: {detail}")
+            plans[level] = detail
+        return plans
+
+    @staticmethod
+    def _prices_query(category, brand=None, cluster_key=None):
+        # Tekrar ilan grubu bir kez sayılır (grubun bu seviyedeki en düşük fiyatı).
+        # dup_group_id her satırda dolu (v14 göçü / upsert); kapsayan indeks ilan_id içermez
+        q = "SELECT MIN(fiyat_norm) AS fiyat_norm FROM ilan WHERE category=? AND aktif_mi=1 AND fiyat_norm IS NOT NULL"
         p = [category]
         if cluster_key and cluster_key != 'generic':
             q += " AND cluster_key=?"; p.append(cluster_key)
         elif brand and brand != 'Unknown':
             q += " AND brand=?"; p.append(brand)
+        return q + " GROUP BY dup_group_id", p
+
+    def get_prices(self, category, brand=None, cluster_key=None):
+        q, p = self._prices_query(category, brand, cluster_key)
         self.cursor.execute(q, p)
         return [r['fiyat_norm'] for r in self.cursor.fetchall()]
 
     def upsert(self, ad):
-        now = datetime.now()
-        # Basit kur (V10'dan)
-        rate = 34.5 if ad['currency'] == 'USD' else 1.0
-        norm_price = ad['fiyat'] * rate
-        meta = TaxonomyEngine.analyze(ad['baslik'])
-        
-        ex = self.cursor.execute("SELECT * FROM ilan WHERE ilan_id=?", (ad['ilan_id'],)).fetchone()
-        
-        if ex:
-            # Velocity Hesaplama (Saat Bazlı)
-            first_seen = datetime.fromisoformat(ex['first_seen'])
-            hours_on_market = (now - first_seen).total_seconds() / 3600
-            hours_on_market = max(0.1, hours_on_market) # Zero div koruması
-            
-            init_price = ex['initial_price']
-            # Toplam düşüş yüzdesi / Saat -> Saatteki kayıp hızı
-            # Pozitif değer = Fiyat düşüyor (İyi veya Panik)
-            velocity = 0.0
-            if init_price > 0:
-                velocity = ((init_price - norm_price) / init_price) / hours_on_market
-
-            changes = ex['price_change_count']
-            if ex['fiyat'] != ad['fiyat']: changes += 1
-            
-            self.cursor.execute("""
-                UPDATE ilan SET fiyat=?, fiyat_norm=?, last_seen=?, 
-                price_change_count=?, hourly_velocity=?, category=?, brand=?, cluster_key=?, aktif_mi=1
+        return self.upsert_many([ad])[0]
+
+    def _fetch_existing(self, ids):
+        existing = {}
+        ids = list(ids)
+        for i in range(0, len(ids), Config.DB_IN_CHUNK):
+            chunk = ids[i:i + Config.DB_IN_CHUNK]
+            q = f"SELECT * FROM ilan WHERE ilan_id IN ({','.join('?' * len(chunk))})"
+            for r in self.cursor.execute(q, chunk): existing[r['ilan_id']] = r
+        return existing
+
+    def upsert_many(self, ads, metas=None, target=None):
+        """
+        Bir sayfa/döngünün ilanlarını tek transaction'da yazar.
+        Her ilan için upsert ile aynı (ex, meta, norm_price, hours, velocity) döner.
+        `metas` verilirse (önceden hesaplanmış taksonomi) tekrar analiz edilmez.
+        `target`: ilanın görüldüğü tarama hedefi (hedef bazlı pasifleştirme için).
+        """
+        ads = list(ads)
+        if not ads: return []
+        now = Clock.now()
+        now_ts = self.epoch(now)
+        stamp = now.timestamp()
+        existing = self._fetch_existing({ad.ilan_id for ad in ads})
+        anchors = self._window_anchors(existing.keys(), now_ts)
+        if metas is None: metas = TaxonomyEngine.analyze_many([ad.baslik for ad in ads])
+
+        inserts, updates, history, results, rebucket, moved = [], [], [], [], [], []
+        for ad, meta in zip(ads, metas):
+            # Basit kur (V10'dan)
+            rate = 34.5 if ad.currency == 'USD' else 1.0
+            norm_price = ad.fiyat * rate
+            ex = existing.get(ad.ilan_id)
+
+            if ex:
+                # Velocity Hesaplama (Saat Bazlı)
+                first_seen = datetime.fromisoformat(ex['first_seen'])
+                hours_on_market = (now - first_seen).total_seconds() / 3600
+                hours_on_market = max(0.1, hours_on_market) # Zero div koruması
+
+                init_price = ex['initial_price']
+                # Toplam düşüş yüzdesi / Saat -> Saatteki kayıp hızı
+                # Pozitif değer = Fiyat düşüyor (İyi veya Panik)
+                velocity = 0.0
+                if init_price > 0:
+                    velocity = ((init_price - norm_price) / init_price) / hours_on_market
+
+                changes = ex['price_change_count']
+                recent = self._windowed_velocity(anchors.get(ad.ilan_id), norm_price, now_ts)
+                if ex['fiyat'] != ad.fiyat:
+                    changes += 1
+                    self._add_history(history, anchors, ad.ilan_id, now_ts, norm_price)
+
+                updates.append((ad.fiyat, norm_price, now, stamp, changes, velocity, recent,
+                                meta.category, meta.brand, meta.tier, meta.cluster_key, target, ad.ilan_id))
+                if (ex['category'], ex['brand'], ex['cluster_key']) != (meta.category, meta.brand, meta.cluster_key):
+                    rebucket.append((ad.ilan_id, meta.category, meta.brand, meta.cluster_key))
+                # Sonraki yeni ilanlar bu ilanı güncel fiyat/sınıfıyla aday görsün
+                moved.append((len(inserts), ad.ilan_id, (meta.category, meta.brand, meta.cluster_key), norm_price))
+                results.append((ex, meta, norm_price, hours_on_market, velocity))
+                meta.dup_group_id = ex['dup_group_id']
+                # Aynı batch'te tekrar gelirse sıralı upsert ile aynı durumu görsün
+                row = dict(ex)
+                row.update(fiyat=ad.fiyat, fiyat_norm=norm_price, last_seen=now.isoformat(" "), updated_at=stamp,
+                           price_change_count=changes, hourly_velocity=velocity, recent_velocity=recent,
+                           aktif_mi=1, missed_cycles=0)
+            else:
+                inserts.append((ad.ilan_id, ad.baslik, meta.category, meta.brand, meta.tier, meta.cluster_key,
+                                ad.ilan_url, ad.fiyat, ad.currency, norm_price, now, now, norm_price, stamp, target))
+                self._add_history(history, anchors, ad.ilan_id, now_ts, norm_price)
+                results.append((None, meta, norm_price, 0.0, 0.0))
+                row = dict(self._row_defaults)
+                row.update(ilan_id=ad.ilan_id, baslik=ad.baslik, ilan_url=ad.ilan_url,
+                           fiyat=ad.fiyat, para_birimi=ad.currency, fiyat_norm=norm_price,
+                           first_seen=now.isoformat(" "), last_seen=now.isoformat(" "),
+                           initial_price=norm_price, aktif_mi=1, updated_at=stamp)
+            row.update(category=meta.category, brand=meta.brand, tier=meta.tier, cluster_key=meta.cluster_key)
+            row.setdefault('dup_group_id', None)
+            if target: row['target'] = target
+            existing[ad.ilan_id] = row
+
+        with self.conn:
+            # Sınıfı değişen ilanlar yeni kümelerinin kovalarına (yeni ilanlar onları aday olarak görsün)
+            self.dups.rebucket(rebucket)
+            # Tekrar ilan tespiti: yeni ilanlar sadece kendi LSH kovalarındaki adaylarla karşılaştırılır
+            groups = self.dups.assign([(t[0], t[1], t[2], t[3], t[5], t[9]) for t in inserts], moved)
+            for ad, meta in zip(ads, metas):
+                if meta.dup_group_id is None: meta.dup_group_id = groups.get(ad.ilan_id, ad.ilan_id)
+            # INSERT'ler önce: batch içinde yeni eklenip tekrar görülen ilanın UPDATE'i ardından gelir
+            self.cursor.executemany("""
+                INSERT INTO ilan (ilan_id, baslik, category, brand, tier, cluster_key, ilan_url, 
+                fiyat, para_birimi, fiyat_norm, first_seen, last_seen, initial_price, updated_at, target, dup_group_id, aktif_mi)
+                VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,1)
+            """, [t + (groups[t[0]],) for t in inserts])
+            # Başlık değişmez: token'lar sadece ilk eklemede yazılır
+            self.tokens.add([(t[0], t[1]) for t in inserts])
+            self.cursor.executemany("""
+                UPDATE ilan SET fiyat=?, fiyat_norm=?, last_seen=?, updated_at=?,
+                price_change_count=?, hourly_velocity=?, recent_velocity=?, category=?, brand=?, tier=?, cluster_key=?,
+                target=COALESCE(?, target), aktif_mi=1, missed_cycles=0
                 WHERE ilan_id=?
-            """, (ad['fiyat'], norm_price, now, changes, velocity, 
-                  meta['category'], meta['brand'], meta['cluster_key'], ad['ilan_id']))
-            self.conn.commit()
-            
-            return ex, meta, norm_price, hours_on_market, velocity
-        else:
-            self.cursor.execute("""
-                INSERT INTO ilan (ilan_id, baslik, category, brand, cluster_key, ilan_url, 
-                fiyat, para_birimi, fiyat_norm, first_seen, last_seen, initial_price, aktif_mi)
-                VALUES (?,?,?,?,?,?,?,?,?,?,?,?,1)
-            """, (ad['ilan_id'], ad['baslik'], meta['category'], meta['brand'], meta['cluster_key'], 
-                  ad['ilan_url'], ad['fiyat'], ad['currency'], norm_price, now, now, norm_price))
-            self.conn.commit()
-            return None, meta, norm_price, 0.0, 0.0
+            """, updates)
+            # Aynı saniyede iki değişimde son fiyat kalır
+            self.cursor.executemany("INSERT OR REPLACE INTO ilan_price_history VALUES (?,?,?)", history)
+
+        for ad, (_, meta, norm_price, _, _) in zip(ads, results):
+            self.stats.update(ad.ilan_id, meta.category, meta.brand, meta.cluster_key, norm_price,
+                              meta.dup_group_id)
+        return results
+
+    @staticmethod
+    def _add_history(history, anchors, ilan_id, ts, price):
+        history.append((ilan_id, ts, price))
+        # Batch içi tekrarlar sıralı yazımla aynı çapayı görsün (aynı saniyede REPLACE)
+        if ilan_id not in anchors or anchors[ilan_id][1] == ts: anchors[ilan_id] = (price, ts)
+
+    def _window_anchors(self, ids, now_ts, window_hours=None):
+        """
+        Pencere başındaki geçerli fiyat: pencere başından önceki son kayıt,
+        yoksa ilanın ilk kaydı. Tek sorgu, (ilan_id, ts) PK'sı üzerinden.
+        -> {ilan_id: (fiyat, ts)}
+        """
+        start = now_ts - int((window_hours or Config.VELOCITY_WINDOW_HOURS) * 3600)
+        anchors = {}
+        ids = list(ids)
+        for i in range(0, len(ids), Config.DB_IN_CHUNK):
+            chunk = ids[i:i + Config.DB_IN_CHUNK]
+            q = f"""
+                SELECT h.ilan_id, h.fiyat_norm, h.ts FROM ilan_price_history h
+                WHERE h.ilan_id IN ({','.join('?' * len(chunk))}) AND h.ts = COALESCE(
+                    (SELECT MAX(p.ts) FROM ilan_price_history p WHERE p.ilan_id = h.ilan_id AND p.ts <= ?),
+                    (SELECT MIN(p.ts) FROM ilan_price_history p WHERE p.ilan_id = h.ilan_id))
+            """
+            for r in self.conn.execute(q, chunk + [start]): anchors[r['ilan_id']] = (r['fiyat_norm'], r['ts'])
+        return anchors
+
+    @staticmethod
+    def _windowed_velocity(anchor, norm_price, now_ts, window_hours=None):
+        # hourly_velocity ile aynı işaret: pozitif = fiyat düşüyor
+        if not anchor or not anchor[0]: return 0.0
+        price0, ts0 = anchor
+        start = now_ts - (window_hours or Config.VELOCITY_WINDOW_HOURS) * 3600
+        hours = max(0.1, (now_ts - max(ts0, start)) / 3600)
+        return ((price0 - norm_price) / price0) / hours
+
+    def windowed_velocity(self, ilan_id, norm_price, now=None, window_hours=None):
+        """Son `window_hours` saatteki fiyat eğimi (saatlik oran)."""
+        now_ts = self.epoch(now or Clock.now())
+        anchor = self._window_anchors([ilan_id], now_ts, window_hours).get(ilan_id)
+        return self._windowed_velocity(anchor, norm_price, now_ts, window_hours)
+
+    def get_price_history(self, ilan_id, since=None):
+        """[(ts, fiyat_norm), ...] zaman sırasıyla; since epoch saniye."""
+        return [tuple(r) for r in self.conn.execute(
+            "SELECT ts, fiyat_norm FROM ilan_price_history WHERE ilan_id=? AND ts>=? ORDER BY ts",
+            (ilan_id, since or 0))]
+
+    def known_prices(self, ids):
+        """Aktif ilanların kayıtlı fiyatları (artımlı taramada 'değişmemiş' kontrolü)."""
+        known = {}
+        ids = list(ids)
+        for i in range(0, len(ids), Config.DB_IN_CHUNK):
+            chunk = ids[i:i + Config.DB_IN_CHUNK]
+            q = f"SELECT ilan_id, fiyat FROM ilan WHERE aktif_mi=1 AND ilan_id IN ({','.join('?' * len(chunk))})"
+            for r in self.conn.execute(q, chunk): known[r['ilan_id']] = r['fiyat']
+        return known
+
+    def get_page_cache(self, urls):
+        urls = list(urls)
+        if not urls: return {}
+        q = f"SELECT * FROM page_cache WHERE url IN ({','.join('?' * len(urls))})"
+        return {r['url']: r for r in self.conn.execute(q, urls)}
+
+    def save_page_cache(self, rows):
+        # rows: [(url, etag, last_modified, content_hash, ilan_ids_json, fetched_at), ...]
+        with self.conn:
+            self.conn.executemany("INSERT OR REPLACE INTO page_cache VALUES (?,?,?,?,?,?)", rows)
+
+    def sweep_unseen(self, seen_ids, grace=None, target=None):
+        """
+        Döngü sonu pasifleştirme: bu taramada görülmeyen aktif ilanların
+        sayacını artırır, `grace` taramadır görülmeyenleri tek UPDATE ile
+        pasife alır. `target` verilirse sadece o hedefin ilanlarına bakılır.
+        Pasifleştirilen ilan sayısını döndürür.
+        """
+        grace = grace or Config.DEACTIVATE_AFTER_MISSES
+        scope, params = ("AND target=?", (target,)) if target else ("", ())
+        with self.conn:
+            self.conn.execute("CREATE TEMP TABLE IF NOT EXISTS seen_ids (ilan_id TEXT PRIMARY KEY) WITHOUT ROWID")
+            self.conn.execute("DELETE FROM temp.seen_ids")
+            self.conn.executemany("INSERT OR IGNORE INTO temp.seen_ids VALUES (?)", ((i,) for i in seen_ids))
+            # Parse edilmeden atlanan (304/aynı içerik) sayfalardaki ilanlar upsert'ten geçmez
+            self.conn.execute("""
+                UPDATE ilan SET missed_cycles=0
+                WHERE missed_cycles>0 AND ilan_id IN (SELECT ilan_id FROM temp.seen_ids)
+            """)
+            self.conn.execute(f"""
+                UPDATE ilan SET missed_cycles=missed_cycles+1
+                WHERE aktif_mi=1 {scope} AND ilan_id NOT IN (SELECT ilan_id FROM temp.seen_ids)
+            """, params)
+            gone = [r[0] for r in self.conn.execute(
+                f"SELECT ilan_id FROM ilan WHERE aktif_mi=1 {scope} AND missed_cycles>=?", params + (grace,))]
+            self.conn.execute(f"UPDATE ilan SET aktif_mi=0, updated_at=? WHERE aktif_mi=1 {scope} AND missed_cycles>=?",
+                              (Clock.time(),) + params + (grace,))
+        for i in gone: self.stats.remove(i)
+        return len(gone)
+
+    def refresh_market_summary(self, now=None, min_interval=None):
+        """
+        Döngü sonu piyasa özeti: genel, kategori, marka ve küme başına karar
+        sayıları, hız aggregate'leri ve median fiyat. Her çağrı aynı zaman
+        damgalı yeni satırlar ekler (trend serisi). `min_interval` verilirse son
+        anlık görüntü bundan yeniyse atlanır. Yazılan satır sayısını döndürür.
+        """
+        ts = int(now or Clock.time())
+        if min_interval:
+            last = self.conn.execute("SELECT MAX(ts) FROM market_summary").fetchone()[0]
+            if last is not None and ts - last < min_interval: return 0
+        if not self.stats.loaded: self.stats.rebuild()
+        groups = {}
+        for r in self.conn.execute("""
+            SELECT COALESCE(category, '') AS category, COALESCE(brand, '') AS brand,
+                   COALESCE(cluster_key, '') AS cluster_key, COUNT(*) AS n,
+                   SUM(decision_label IS '💎 HIDDEN GEM') AS gem, SUM(decision_label IS '✅ GOOD DEAL') AS good,
+                   SUM(decision_label IS '🎲 SPECULATIVE') AS spec, SUM(hourly_velocity) AS v_sum,
+                   MIN(hourly_velocity) AS v_min, MAX(hourly_velocity) AS v_max
+            FROM ilan WHERE aktif_mi=1 GROUP BY 1, 2, 3
+        """):
+            cat = r['category']
+            scopes = [('all', '', ''), ('category', cat, ''), ('brand', cat, r['brand'])]
+            if r['cluster_key'] != 'generic': scopes.append(('cluster', cat, r['cluster_key']))
+            for sk in scopes:
+                g = groups.setdefault(sk, [0, 0, 0, 0, 0.0, None, None])
+                g[0] += r['n']; g[1] += r['gem']; g[2] += r['good']; g[3] += r['spec']
+                g[4] += r['v_sum'] or 0.0
+                if r['v_min'] is not None: g[5] = r['v_min'] if g[5] is None else min(g[5], r['v_min'])
+                if r['v_max'] is not None: g[6] = r['v_max'] if g[6] is None else max(g[6], r['v_max'])
+
+        # Median fiyatlar döngü boyunca güncel tutulan StatsCache listelerinden
+        level = {'category': lambda c, k: ('cat', c), 'brand': lambda c, k: ('brand', c, k),
+                 'cluster': lambda c, k: ('cluster', c, k)}
+        rows = []
+        for (scope, cat, key), (n, gem, good, spec, v_sum, v_min, v_max) in groups.items():
+            median = self.stats.median(level[scope](cat, key)) if scope in level else None
+            rows.append((ts, scope, cat, key, n, gem, good, spec, v_sum / n, v_min, v_max, median))
+        with self.conn:
+            self.conn.executemany("INSERT OR REPLACE INTO market_summary VALUES (?,?,?,?,?,?,?,?,?,?,?,?)", rows)
+            self.conn.execute("DELETE FROM market_summary WHERE ts < ?", (ts - Config.MARKET_SUMMARY_RETENTION,))
+        return len(rows)
+
+    def prune_market_summary(self, now=None):
+        """
+        MARKET_SUMMARY_FULL_RES'ten eski anlık görüntüleri gün başına sonuncuya
+        indirir (bir anlık görüntünün tüm satırları aynı ts'i taşır, kapsamlar
+        birlikte kalır ya da gider). Silinen satır sayısını döndürür.
+        """
+        cutoff = int(now or Clock.time()) - Config.MARKET_SUMMARY_FULL_RES
+        with self.conn:
+            cur = self.conn.execute("""
+                DELETE FROM market_summary WHERE ts < :cutoff AND ts NOT IN (
+                    SELECT MAX(ts) FROM market_summary WHERE ts < :cutoff GROUP BY ts / 86400)
+            """, {'cutoff': cutoff})
+        return cur.rowcount
+
+    def load_targets(self):
+        return {r['url']: dict(r) for r in self.conn.execute("SELECT * FROM crawl_targets")}
+
+    def save_target(self, state):
+        with self.conn:
+            self.conn.execute("""
+                INSERT OR REPLACE INTO crawl_targets (url, interval, next_due, last_run, last_duration, churn, cycles)
+                VALUES (:url, :interval, :next_due, :last_run, :last_duration, :churn, :cycles)
+            """, state)
+
+    def get_state(self, key):
+        row = self.conn.execute("SELECT value FROM engine_state WHERE key=?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_state(self, key, value):
+        with self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO engine_state VALUES (?,?)", (key, value))
+
+    def recluster(self, old, new):
+        """
+        Taksonomi değişiminde sadece etkilenebilecek ilanları (TaxonomyEngine.affected)
+        yeni kurallarla yeniden sınıflar. Sınıfı değişen ilan sayısını döndürür.
+        """
+        brands, categories = TaxonomyEngine.affected(old, new)
+        if not brands and not categories: return 0
+        where, params = [], []
+        for col, values in (('brand', brands), ('category', categories)):
+            if values:
+                where.append(f"{col} IN ({','.join('?' * len(values))})"); params += sorted(values)
+        rows = self.conn.execute(f"""
+            SELECT ilan_id, baslik, category, brand, tier, cluster_key, fiyat_norm, aktif_mi, dup_group_id
+            FROM ilan WHERE {' OR '.join(where)}
+        """, params).fetchall()
+
+        analyze = CompiledTaxonomy(new).analyze
+        stamp = Clock.time()
+        changed = []
+        for r in rows:
+            meta = analyze(r['baslik'] or "")
+            new_cls = (meta.category, meta.brand, meta.tier, meta.cluster_key)
+            if new_cls != (r['category'], r['brand'], r['tier'], r['cluster_key']):
+                changed.append((r, meta, new_cls))
+        with self.conn:
+            self.conn.executemany("""
+                UPDATE ilan SET category=?, brand=?, tier=?, cluster_key=?, updated_at=? WHERE ilan_id=?
+            """, [c + (stamp, r['ilan_id']) for r, _, c in changed])
+            self.dups.rebucket([(r['ilan_id'], m.category, m.brand, m.cluster_key) for r, m, _ in changed])
+        for r, meta, _ in changed:
+            if r['aktif_mi']:
+                self.stats.update(r['ilan_id'], meta.category, meta.brand, meta.cluster_key, r['fiyat_norm'],
+                                  r['dup_group_id'])
+        logging.info(f"Yeniden kümeleme: {len(rows)} aday, {len(changed)} ilanın sınıfı değişti")
+        return len(changed)
+
+    def save_cycle_metrics(self, row):
+        cols = list(row)
+        with self.conn:
+            self.conn.execute(f"INSERT INTO cycle_metrics ({','.join(cols)}) VALUES ({','.join('?' * len(cols))})",
+                              [row[c] for c in cols])
+            self.conn.execute("DELETE FROM cycle_metrics WHERE started_at < ?",
+                              (time.time() - Config.CYCLE_METRICS_RETENTION,))
+
+    def archive_inactive(self, archive, days=None, now=None, batch=None):
+        """
+        `days` günden uzun süredir pasif ilanları ve fiyat geçmişlerini
+        arşive yazar, sonra sıcak tablolardan siler ve boşalan sayfaları
+        incremental_vacuum ile dosyaya iade eder. Dosya yazımı silmeden
+        önce olduğundan kesinti en kötü ihtimalle arşivde tekrar bırakır.
+        {'listings', 'history', 'freed_pages'} döndürür.
+        """
+        days = Config.ARCHIVE_AFTER_DAYS if days is None else days
+        batch = batch or Config.ARCHIVE_BATCH
+        cutoff = ((now or Clock.now()) - timedelta(days=days)).isoformat(" ")
+        moved = {'listings': 0, 'history': 0}
+        while True:
+            rows = self.conn.execute(
+                "SELECT * FROM ilan WHERE aktif_mi=0 AND last_seen < ? ORDER BY ilan_id LIMIT ?", (cutoff, batch)).fetchall()
+            if not rows: break
+            ids = [r['ilan_id'] for r in rows]
+            titles = {r['ilan_id']: r['baslik'] for r in rows}
+            history = []
+            for i in range(0, len(ids), Config.DB_IN_CHUNK):
+                chunk = ids[i:i + Config.DB_IN_CHUNK]
+                history += self.conn.execute(
+                    f"SELECT * FROM ilan_price_history WHERE ilan_id IN ({','.join('?' * len(chunk))})", chunk).fetchall()
+            # Bölüm tarihi: ilanın son görüldüğü gün; geçmiş satırları ilanıyla aynı bölüme gider
+            day = {r['ilan_id']: (r['last_seen'] or '')[:10] or 'unknown' for r in rows}
+            archive.write('ilan', rows, lambda r: day[r['ilan_id']])
+            archive.write('ilan_price_history', history, lambda r: day[r['ilan_id']])
+            with self.conn:
+                for i in range(0, len(ids), Config.DB_IN_CHUNK):
+                    chunk = [(x,) for x in ids[i:i + Config.DB_IN_CHUNK]]
+                    self.dups.remove(x for (x,) in chunk)
+                    self.tokens.remove([(x, titles[x]) for (x,) in chunk])
+                    self.conn.executemany("DELETE FROM ilan_price_history WHERE ilan_id=?", chunk)
+                    self.conn.executemany("DELETE FROM ilan WHERE ilan_id=?", chunk)
+            moved['listings'] += len(rows)
+            moved['history'] += len(history)
+        moved['freed_pages'] = self.incremental_vacuum() if moved['listings'] else 0
+        return moved
+
+    def incremental_vacuum(self):
+        """
+        Boş sayfaları dosyaya iade eder; iade edilen sayfa sayısını döndürür.
+        auto_vacuum'suz eski DB'ler ilk seferde bir kez tam VACUUM ile çevrilir.
+        """
+        if self.conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+            logging.info("DB auto_vacuum=INCREMENTAL moduna çevriliyor (tek seferlik VACUUM)")
+            before = self.conn.execute("PRAGMA page_count").fetchone()[0]
+            self.conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+            self.conn.execute("VACUUM")
+            return max(before - self.conn.execute("PRAGMA page_count").fetchone()[0], 0)
+        free = self.conn.execute("PRAGMA freelist_count").fetchone()[0]
+        # execute() pragmayı tek adım çalıştırır (tek sayfa); executescript tamamlanana kadar yürütür
+        self.conn.executescript("PRAGMA incremental_vacuum;")
+        self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        return free
+
+    def find_comparables(self, listing, k=None):
+        """
+        `listing`: ilan_id ya da ilan_id/baslik/category (+ dup_group_id, fiyat_norm)
+        içeren kayıt. En yakın k aktif emsal ilan (TokenIndex.find).
+        """
+        if isinstance(listing, str):
+            listing = self.conn.execute("SELECT * FROM ilan WHERE ilan_id=?", (listing,)).fetchone()
+            if listing is None: return []
+        return self.tokens.find(dict(listing), k)
+
+    def save_comparables(self, rows):
+        """rows: [(emsaller_json, ilan_id), ...]"""
+        with self.conn:
+            self.conn.executemany("UPDATE ilan SET comparables=? WHERE ilan_id=?", rows)
+
+    def save_decisions(self, rows):
+        """rows: [(score, decision, risk_flags_json, explanation, ilan_id), ...] tek transaction."""
+        stamp = Clock.time()
+        with self.conn:
+            self.conn.executemany("""
+                UPDATE ilan SET opportunity_score=?, decision_label=?, risk_flags=?, explanation=?, updated_at=?
+                WHERE ilan_id=?
+            """, [r[:4] + (stamp,) + r[4:] for r in rows])
+
+    def deactivate(self, ilan_ids):
+        ids = list(ilan_ids)
+        stamp = Clock.time()
+        self.cursor.executemany("UPDATE ilan SET aktif_mi=0, updated_at=? WHERE ilan_id=?", [(stamp, i) for i in ids])
+        self.conn.commit()
+        for i in ids: self.stats.remove(i)
+        return len(ids)
+
+class ColdArchive:
+    """
+    V11: Pasif ilanların soğuk deposu. Tablo başına tarih bölümlü gzip NDJSON
+    dosyaları: <kök>/<tablo>/dt=YYYY-MM-DD/part-<damga>.ndjson.gz. Dosyalar
+    geçici adla yazılıp atomik olarak yerine konur. Bot sadece yazar; okuma
+    (analist modu, betikler) istek üzerine, sıcak yoldan bağımsızdır.
+    """
+    def __init__(self, root=None):
+        self.root = root or Config.ARCHIVE_DIR
+
+    def write(self, table, rows, partition):
+        """Satırları partition(satır) -> 'YYYY-MM-DD' bölümlerine yazar; yazılan dosya yolları."""
+        groups = {}
+        for r in rows: groups.setdefault(partition(r), []).append(dict(r))
+        stamp = time.strftime("%Y%m%dT%H%M%S")
+        paths = []
+        for day, items in sorted(groups.items()):
+            folder = os.path.join(self.root, table, f"dt={day}")
+            os.makedirs(folder, exist_ok=True)
+            path = os.path.join(folder, f"part-{stamp}-{hashlib.sha1(items[0]['ilan_id'].encode()).hexdigest()[:8]}.ndjson.gz")
+            tmp = path + ".tmp"
+            with gzip.open(tmp, "wt", encoding="utf-8") as f:
+                for item in items: f.write(json.dumps(item, ensure_ascii=False) + "\n")
+            os.replace(tmp, path)
+            paths.append(path)
+        return paths
+
+    def partitions(self, table, since=None, until=None):
+        """[(gün, dosya yolu), ...]; since/until 'YYYY-MM-DD' (dahil)."""
+        base = os.path.join(self.root, table)
+        if not os.path.isdir(base): return []
+        out = []
+        for folder in sorted(os.listdir(base)):
+            if not folder.startswith("dt="): continue
+            day = folder[3:]
+            if (since and day < since) or (until and day > until): continue
+            for name in sorted(os.listdir(os.path.join(base, folder))):
+                if name.endswith(".ndjson.gz"): out.append((day, os.path.join(base, folder, name)))
+        return out
+
+    def read(self, table, since=None, until=None, where=None):
+        """Bölümleri sırayla okuyan üreteç; `where(satır)` süzgeci opsiyonel."""
+        for _, path in self.partitions(table, since, until):
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                for line in f:
+                    row = json.loads(line)
+                    if where is None or where(row): yield row
+
+    def history(self, ilan_id, since=None, until=None):
+        """Arşivlenmiş ilanın fiyat geçmişi [(ts, fiyat_norm), ...]"""
+        return sorted((r['ts'], r['fiyat_norm']) for r in
+                      self.read('ilan_price_history', since, until, lambda r: r['ilan_id'] == ilan_id))
 
 class DecisionEngine:
     """
@@ -251,12 +1789,8 @@ class DecisionEngine:
     def __init__(self, db): self.db = db
 
     def evaluate(self, meta, norm_price, hours, velocity, existing_record):
-        # 1. Veri Çekme (L1/L2)
-        prices = self.db.get_prices(meta['category'], meta['brand'], meta['cluster_key'])
-        if len(prices) < Config.MIN_SAMPLE_SIZE:
-             prices = self.db.get_prices(meta['category'], brand=meta['brand'])
-        
-        stats = MathEngine.calc_robust_stats(prices)
+        # 1. Veri Çekme (L1/L2) - önbellekten, get_prices + calc_robust_stats ile aynı sonuç
+        stats = self.db.stats.lookup(meta.category, meta.brand, meta.cluster_key)
         if not stats or stats['n'] < 5: return None
 
         z_score = MathEngine.mod_zscore(norm_price, stats)
@@ -267,8 +1801,8 @@ class DecisionEngine:
         
         # Marka Puanı (Max 30)
         brand_score = 0
-        if meta['tier'] == 'TIER_1': brand_score = 30
-        elif meta['tier'] == 'TIER_2': brand_score = 15
+        if meta.tier == 'TIER_1': brand_score = 30
+        elif meta.tier == 'TIER_2': brand_score = 15
         
         # Hız ve Tazelik (Max 20)
         freshness_score = 0
@@ -291,7 +1825,7 @@ class DecisionEngine:
         if velocity > 0.10: # Saatte %10 düşüş (Çok ani)
             flags.append("PANIC_SELL")
             
-        if meta['tier'] == 'UNKNOWN' and price_score > 40:
+        if meta.tier == 'UNKNOWN' and price_score > 40:
             flags.append("BRAND_MISMATCH") # Bilinmeyen marka, premium fiyat analizi
             total_score -= 20
             
@@ -313,35 +1847,780 @@ class DecisionEngine:
         if price_score > 40: reasons.append("Fiyat mükemmel")
         elif price_score > 25: reasons.append("Fiyat makul")
         
-        if meta['tier'] == 'TIER_1': reasons.append("marka premium")
-        elif meta['tier'] == 'UNKNOWN': reasons.append("marka belirsiz")
+        if meta.tier == 'TIER_1': reasons.append("marka premium")
+        elif meta.tier == 'UNKNOWN': reasons.append("marka belirsiz")
         
         if "PANIC_SELL" in flags: reasons.append("ani fiyat kırılması var")
         
         explanation = ", ".join(reasons)
             
-        return {
-            'score': final_score,
-            'decision': decision,
-            'z_score': z_score,
-            'stats': stats,
-            'flags': flags,
-            'explanation': explanation,
-            'velocity': velocity
+        return Decision(score=final_score, decision=decision, z_score=z_score, stats=stats,
+                        flags=flags, explanation=explanation, velocity=velocity)
+
+class BulkScorer:
+    """
+    V11: DecisionEngine.evaluate'in toplu (vektörize) hali.
+    İstatistikler küme başına bir kez alınır; puan, bayrak ve kararlar tüm
+    aktif ilanlar için NumPy ile tek seferde hesaplanıp toplu UPDATE ile yazılır.
+    """
+    DECISIONS = ["💎 HIDDEN GEM", "🎲 SPECULATIVE", "✅ GOOD DEAL", "💀 TOXIC"]
+
+    def __init__(self, db): self.db = db
+
+    def load(self):
+        rows = self.db.conn.execute("""
+            SELECT ilan_id, category, brand, cluster_key, fiyat_norm, first_seen, hourly_velocity
+            FROM ilan WHERE aktif_mi=1 AND fiyat_norm IS NOT NULL
+        """).fetchall()
+        self.db.stats.rebuild()
+        return rows
+
+    def score(self, rows, now=None):
+        """rows -> (ilan_id'ler, sonuç sözlüğü); istatistiği yetersiz ilanlar atlanır."""
+        now = now or Clock.now()
+        brands = ConfigLoader.get_taxonomy()['BRANDS']
+        stats = self.db.stats
+
+        # Küme başına tek istatistik
+        group_stats, ids, median, mad, price, hours, velocity, tier = {}, [], [], [], [], [], [], []
+        for r in rows:
+            key = stats.resolve(r['category'], r['brand'], r['cluster_key'])
+            if key not in group_stats: group_stats[key] = stats.stats(key)
+            st = group_stats[key]
+            if not st or st['n'] < 5: continue
+            ids.append(r['ilan_id'])
+            median.append(st['median']); mad.append(st['mad'])
+            price.append(r['fiyat_norm'])
+            hours.append((now - datetime.fromisoformat(r['first_seen'])).total_seconds() / 3600)
+            velocity.append(r['hourly_velocity'] or 0.0)
+            tier.append(brands.get(r['brand'], {}).get('tier', 'UNKNOWN'))
+        if not ids: return [], {}
+
+        median, mad, price = np.array(median), np.array(mad), np.array(price)
+        hours, velocity, tier = np.array(hours), np.array(velocity), np.array(tier)
+
+        z = 0.6745 * (price - median) / mad
+        with np.errstate(over='ignore'):
+            price_score = 50 / (1 + np.exp(-Config.SIGMOID_SLOPE * (-z - Config.SIGMOID_CENTER)))
+
+        brand_score = np.select([tier == 'TIER_1', tier == 'TIER_2'], [30, 15], 0)
+        freshness = np.select([hours < 24, hours > 720], [10, -10], 0)
+        freshness = freshness + np.where((velocity > 0.001) & (velocity < 0.05), 10, 0)
+        total = price_score + brand_score + freshness
+
+        outlier = z < Config.CRITICAL_LOW_Z
+        total = np.where(outlier, np.minimum(total, 40), total)
+        panic = velocity > 0.10
+        mismatch = (tier == 'UNKNOWN') & (price_score > 40)
+        total = np.where(mismatch, total - 20, total)
+        final = np.clip(total, 0, 100).astype(int)
+
+        flagged = outlier | panic | mismatch
+        decision = np.select([(final >= 85) & ~flagged, (final >= 80) & flagged, final >= 70, (final < 40) & flagged],
+                             self.DECISIONS, "NEUTRAL")
+
+        reason_price = np.select([price_score > 40, price_score > 25], ["Fiyat mükemmel", "Fiyat makul"], "")
+        reason_tier = np.select([tier == 'TIER_1', tier == 'UNKNOWN'], ["marka premium", "marka belirsiz"], "")
+        reason_panic = np.where(panic, "ani fiyat kırılması var", "")
+
+        return ids, {
+            'score': final, 'decision': decision, 'z_score': z, 'price_score': price_score,
+            'outlier': outlier, 'panic': panic, 'mismatch': mismatch,
+            'reasons': (reason_price, reason_tier, reason_panic),
         }
 
-class BotEngineV11:
+    @staticmethod
+    def rows_for_db(ids, res):
+        names = ("EXTREME_OUTLIER", "PANIC_SELL", "BRAND_MISMATCH")
+        masks = (res['outlier'], res['panic'], res['mismatch'])
+        out = []
+        for i, ilan_id in enumerate(ids):
+            flags = [n for n, m in zip(names, masks) if m[i]]
+            explanation = ", ".join(r[i] for r in res['reasons'] if r[i])
+            out.append((int(res['score'][i]), str(res['decision'][i]), json.dumps(flags), explanation, ilan_id))
+        return out
+
+    def rescore(self, now=None, batch_size=5000):
+        ids, res = self.score(self.load(), now)
+        if not ids: return 0
+        rows = self.rows_for_db(ids, res)
+        for i in range(0, len(rows), batch_size):
+            self.db.save_decisions(rows[i:i + batch_size])
+        return len(rows)
+
+class TokenBucket:
+    """Basit token bucket: saniyede `rate` jeton, en fazla `burst` birikir."""
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.capacity = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+class RateLimiter:
+    """Host başına ayrı token bucket."""
+    def __init__(self, rate=None, burst=None):
+        self.rate = rate or Config.RATE_LIMIT_PER_SEC
+        self.burst = burst or Config.RATE_LIMIT_BURST
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, url):
+        host = urlparse(url).netloc
+        with self._lock:
+            bucket = self._buckets.get(host)
+            if bucket is None:
+                bucket = self._buckets[host] = TokenBucket(self.rate, self.burst)
+        bucket.acquire()
+
+class PageFetcher:
+    """
+    V11: Eşzamanlı sayfa indirici.
+    Havuzlu tek session üzerinde sınırlı thread paralelliği, host başına
+    hız limiti, 429/5xx için jitter'lı geri çekilme ve User-Agent rotasyonu.
+    """
+    def __init__(self, session=None, concurrency=None, limiter=None, recorder=None):
+        self.concurrency = concurrency or Config.FETCH_CONCURRENCY
+        self.session = session or self.build_session(self.concurrency)
+        self.limiter = limiter or RateLimiter()
+        self.recorder = recorder # CaptureRecorder: her ham yanıt (retry'lar dahil) kayda eklenir
+        self._agents = itertools.cycle(Config.USER_AGENTS)
+        self._agents_lock = threading.Lock()
+
+    @staticmethod
+    def build_session(pool_size):
+        session = requests.Session()
+        # Bağlantı hatalarını adapter dener; 429/5xx geri çekilmesi fetch'te
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size,
+                              max_retries=Retry(total=3, respect_retry_after_header=False))
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
+
+    @staticmethod
+    def page_urls(base_url, max_pages):
+        """İlk sayfa + pagingOffset ile sonraki sayfalar."""
+        parts = urlparse(base_url)
+        query = [(k, v) for k, v in parse_qsl(parts.query) if k != 'pagingOffset']
+        urls = [base_url]
+        for page in range(1, max_pages):
+            q = urlencode(query + [('pagingOffset', page * Config.PAGE_SIZE)])
+            urls.append(urlunparse(parts._replace(query=q)))
+        return urls
+
+    def next_user_agent(self):
+        with self._agents_lock: return next(self._agents)
+
+    @staticmethod
+    def backoff_delay(attempt, resp=None):
+        delay = min(Config.BACKOFF_MAX, Config.BACKOFF_BASE * (2 ** attempt))
+        delay = delay / 2 + random.uniform(0, delay / 2) # Eşit jitter
+        retry_after = resp.headers.get('Retry-After') if resp is not None else None
+        if retry_after:
+            try: delay = max(delay, min(Config.BACKOFF_MAX, float(retry_after)))
+            except ValueError: pass
+        return delay
+
+    def fetch(self, url, headers=None):
+        """Tek sayfa; başarısızlıkta son yanıtı (veya None) döndürür."""
+        resp = None
+        for attempt in range(Config.FETCH_MAX_RETRIES + 1):
+            self.limiter.acquire(url)
+            h = {'User-Agent': self.next_user_agent()}
+            if headers: h.update(headers)
+            try:
+                resp = self.session.get(url, headers=h, timeout=Config.FETCH_TIMEOUT)
+            except requests.RequestException as e:
+                logging.warning(f"İstek hatası ({url}): {e}")
+                resp = None
+                if self.recorder: self.recorder.response(url, None)
+            else:
+                if self.recorder: self.recorder.response(url, resp)
+                if resp.status_code != 429 and resp.status_code < 500: return resp
+                logging.warning(f"HTTP {resp.status_code} ({url}), deneme {attempt + 1}")
+            if attempt < Config.FETCH_MAX_RETRIES:
+                time.sleep(self.backoff_delay(attempt, resp))
+        return resp
+
+    def fetch_iter(self, urls, headers=None):
+        """
+        Yanıtları URL sırasıyla üretir; uçuşta en fazla `concurrency` istek
+        (kayan pencere). Tüketici yavaşlarsa yeni istek açılmaz (geri basınç);
+        üretici erken kapatılırsa başlamamış istekler iptal edilir.
+        """
+        jobs = zip(urls, headers or [None] * len(urls))
+        pool = ThreadPoolExecutor(max_workers=self.concurrency)
+        window = [pool.submit(self.fetch, u, h) for u, h in itertools.islice(jobs, self.concurrency)]
+        try:
+            while window:
+                yield window.pop(0).result()
+                # Yeni istek ancak tüketici sonraki sayfayı isteyince: erken durmada fazladan istek uçmaz
+                for u, h in itertools.islice(jobs, 1): window.append(pool.submit(self.fetch, u, h))
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+class CaptureRecorder:
+    """
+    V11: Tarama trafiğinin kaydı. Her satır bir JSON kaydı: döngü başlangıcı
+    ({'type': 'cycle', 't', 'target', 'index', 'full'}) ya da ham yanıt ({'type':
+    'response', 't', 'url', 'status', 'headers', 'encoding', 'body' | 'body_b64'}).
+    Dosya gzip ve sadece eklenir: her açılış yeni bir gzip üyesi başlatır,
+    döngü sonlarında flush edildiğinden çökmede en fazla son döngü kaybolur.
+    """
+    def __init__(self, path):
+        self.path = path
+        self._f = gzip.open(path, "at", encoding="utf-8")
+        self._lock = threading.Lock() # fetch_iter thread'leri aynı dosyaya yazar
+
+    def _write(self, rec, flush=False):
+        line = json.dumps(rec, ensure_ascii=False) + "\n"
+        with self._lock:
+            self._f.write(line)
+            if flush: self._f.flush()
+
+    def cycle(self, target, index, full):
+        self._write({'type': 'cycle', 't': Clock.time(), 'target': target, 'index': index, 'full': full}, flush=True)
+
+    def response(self, url, resp):
+        rec = {'type': 'response', 't': Clock.time(), 'url': url, 'status': None}
+        if resp is not None:
+            rec.update(status=resp.status_code, headers=dict(resp.headers), encoding=resp.encoding)
+            try: rec['body'] = resp.content.decode("utf-8")
+            except UnicodeDecodeError: rec['body_b64'] = base64.b64encode(resp.content).decode("ascii")
+        self._write(rec)
+
+    def close(self):
+        with self._lock: self._f.close()
+
+    @staticmethod
+    def read(path):
+        """Kayıtları sırayla üretir; yarım kalmış son gzip üyesi (çökme) sessizce kesilir."""
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                for line in f:
+                    if line.endswith("\n"): yield json.loads(line)
+        except (EOFError, gzip.BadGzipFile) as e:
+            logging.warning(f"Kayıt dosyası yarım bitiyor ({path}): {e}")
+
+class ReplayAdapter(BaseAdapter):
+    """
+    V11: Kayıttan yanıt veren requests transport'u (ağa çıkmaz). Her URL'nin
+    kayıtlı yanıtları sırayla döner; kayıtta 304 olup istek koşulsuzsa (boş
+    önbellekli DB) aynı URL'nin son 200 gövdesi verilir. Kayıtta karşılığı
+    kalmayan istek 404 alır: tarama o döngüyü eksik sayar.
+    """
+    def __init__(self):
+        super().__init__()
+        self._queues = {}  # url -> [kayıt, ...]
+        self._bodies = {}  # url -> son 200 kaydı
+        self._lock = threading.Lock()
+
+    def load(self, records):
+        with self._lock:
+            for rec in records: self._queues.setdefault(rec['url'], []).append(rec)
+
+    def reset(self):
+        """Kullanılmayan yanıtları atar (sonraki döngüye taşmasın); atılan sayıyı döndürür."""
+        with self._lock:
+            n = sum(len(q) for q in self._queues.values())
+            self._queues.clear()
+        return n
+
+    def send(self, request, **kwargs):
+        with self._lock:
+            q = self._queues.get(request.url)
+            rec = q.pop(0) if q else None
+            if rec and rec['status'] == 200: self._bodies[request.url] = rec
+            conditional = 'If-None-Match' in request.headers or 'If-Modified-Since' in request.headers
+            if rec and rec['status'] == 304 and not conditional: rec = self._bodies.get(request.url, rec)
+        if rec is not None and rec['status'] is None:
+            raise requests.ConnectionError(f"Kayıtta bağlantı hatası: {request.url}", request=request)
+        resp = requests.Response()
+        resp.url, resp.request = request.url, request
+        if rec is None:
+            resp.status_code, resp._content = 404, b""
+            return resp
+        resp.status_code = rec['status']
+        resp.headers = CaseInsensitiveDict(rec.get('headers') or {})
+        resp.encoding = rec.get('encoding')
+        if 'body_b64' in rec: resp._content = base64.b64decode(rec['body_b64'])
+        else: resp._content = (rec.get('body') or "").encode("utf-8")
+        return resp
+
+    def close(self): pass
+
+class ListingExtractor:
+    """
+    V11: SELECTORS stratejileriyle sayfadan ilan kayıtları çıkarır.
+    Sayfanın tamamı yerine sadece sonuç kapsayıcıları ağaca alınır (SoupStrainer).
+    Hedef başına son başarılı strateji hatırlanır ve önce o denenir; verim
+    düşerse diğerlerine geçilir.
+    """
+    def __init__(self):
+        self._last = {} # hedef -> (strateji adı, ilan sayısı)
+        self._strainers = {}
+
+    @staticmethod
+    def _strainer(selector):
+        # Basit "tag", "tag.class" veya ".class" seçicileri için SoupStrainer; karmaşık seçicide None
+        m = re.fullmatch(r'([a-zA-Z][\w-]*)?(?:\.([\w-]+))?', selector.strip())
+        if not m or not (m.group(1) or m.group(2)): return None
+        tag, cls = m.group(1), m.group(2)
+        if not cls: return SoupStrainer(tag)
+        # Çok sınıflı öğeleri de yakala (class="x search-result-item")
+        return SoupStrainer(tag, class_=lambda c: c is not None and cls in c.split())
+
+    def _parse(self, html, strat, base_url):
+        key = strat['container']
+        if key not in self._strainers: self._strainers[key] = self._strainer(key)
+        soup = BeautifulSoup(html, HTML_PARSER, parse_only=self._strainers[key])
+        return [ad for ad in (self._record(c, strat, base_url) for c in soup.select(key)) if ad]
+
+    def extract(self, html, base_url='', target=None):
+        target = target or base_url
+        hint = self.hint(target)
+        best_name, best = self.select(html, base_url, hint)
+        self.remember(target, hint, best_name, len(best))
+        return best
+
+    def hint(self, target):
+        """Hedef için son başarılı (strateji adı, ilan sayısı)."""
+        return self._last.get(target, (None, 0))
+
+    def remember(self, target, hint, name, count):
+        if not count: return
+        if name != hint[0] and hint[0] is not None:
+            logging.info(f"Selector stratejisi değişti ({target}): {hint[0]} -> {name}")
+        self._last[target] = (name, count)
+
+    def select(self, html, base_url, hint=(None, 0)):
+        """Verilen ipucuyla stratejileri dener: (strateji adı, ilanlar). Durum değiştirmez."""
+        last_name, last_yield = hint
+        ordered = sorted(ConfigLoader.get_selectors(), key=lambda st: st['name'] != last_name)
+
+        best_name, best = None, []
+        for strat in ordered:
+            ads = self._parse(html, strat, base_url)
+            if len(ads) > len(best): best_name, best = strat['name'], ads
+            # Bilinen strateji beklenen verimi veriyorsa diğerlerini hiç parse etme
+            if best and strat['name'] == last_name and len(ads) >= last_yield * Config.STRATEGY_YIELD_DROP: break
+            if best and last_name is None: break
+        return best_name, best
+
+    @staticmethod
+    def parse_price(text):
+        # "12.500 TL", "1.250,50 TL", "$500" -> (değer, para birimi)
+        t = text.upper()
+        currency = 'USD' if ('USD' in t or '$' in t) else 'TL'
+        digits = re.sub(r'[^\d,]', '', t) # Nokta binlik ayırıcıdır
+        if not digits: return None, currency
+        try: return float(digits.replace(',', '.')), currency
+        except ValueError: return None, currency
+
+    def _record(self, node, strat, base_url):
+        ilan_id = node.get(strat['id'])
+        title = node.select_one(strat['title'])
+        price = node.select_one(strat['price'])
+        if not ilan_id or title is None or price is None: return None
+        fiyat, currency = self.parse_price(price.get_text())
+        if fiyat is None: return None
+        link = node.select_one(strat['link'])
+        href = link.get('href', '') if link is not None else ''
+        return Listing(str(ilan_id), title.get_text(strip=True), fiyat, currency, urljoin(base_url, href))
+
+def parse_page(extractor, content, encoding, url, hint):
+    """
+    Tek sayfa: ham bayt -> (strateji adı, ilanlar, taksonomi sonuçları).
+    Süreç havuzu da tek süreçli yol da bunu çağırır; çıktı aynıdır.
+    """
+    html = content.decode(encoding, errors='replace') if encoding else content
+    name, ads = extractor.select(html, url, hint)
+    return name, ads, TaxonomyEngine.analyze_many([ad.baslik for ad in ads])
+
+_worker_extractor = None
+
+def _parse_worker_init(rules, version):
+    global _worker_extractor
+    logging.getLogger().handlers.clear() # Worker'lar log dosyasına yazmaz
+    ConfigLoader.install(rules, version)
+    _worker_extractor = ListingExtractor()
+
+def _parse_worker(jobs):
+    return [parse_page(_worker_extractor, *job) for job in jobs]
+
+class PageParser:
+    """
+    V11: Parse + sınıflandırma aşaması. BeautifulSoup ve taksonomi saf Python
+    CPU işidir ve GIL'i tutar; workers > 0 ise ham sayfa baytları
+    ProcessPoolExecutor'a PARSE_CHUNK'lık gruplar halinde gönderilir. Her
+    worker derlenmiş taksonomiyi bir kez kurar ve sadece ilan + sınıf
+    kayıtlarını döndürür; DB'ye tek yazıcı (ana süreç) yazar. Kurallar
+    değişince havuz yeni kurallarla yeniden başlatılır. workers=0 aynı
+    fonksiyonu süreç içinde çalıştırır (aynı çıktı).
+    """
+    def __init__(self, extractor, workers=None, chunk=None, metrics=None):
+        self.extractor = extractor
+        self.workers = Config.PARSE_WORKERS if workers is None else workers
+        self.chunk = max(1, chunk or Config.PARSE_CHUNK)
+        self.metrics = metrics # Sadece parse işi ölçülür (üst akışı bekleme hariç)
+        self._pool = None
+        self._version = None
+
+    def _executor(self):
+        rules, version = ConfigLoader.snapshot()
+        if self._pool is not None and version != self._version: self.close()
+        if self._pool is None:
+            # spawn: ana süreçte çalışan thread'ler (bildirim, metrik sunucusu) fork'a taşınmasın
+            self._pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"),
+                                             initializer=_parse_worker_init, initargs=(rules, version))
+            self._version = version
+        return self._pool
+
+    def _stage(self):
+        return self.metrics.stage('parse') if self.metrics else contextlib.nullcontext()
+
+    def parse_iter(self, pages):
+        """
+        pages: (anahtar, (içerik baytları, kodlama, url, ipucu)) akışı ->
+        sırayla (anahtar, (strateji, ilanlar, metalar)). Havuzda en fazla
+        `workers` grup uçuşta; üst akıştan ancak sonuçlar tüketildikçe sayfa çekilir.
+        """
+        if not self.workers:
+            for key, job in pages:
+                with self._stage(): parsed = parse_page(self.extractor, *job)
+                yield key, parsed
+            return
+        pages, window = iter(pages), []
+        while True:
+            chunk = list(itertools.islice(pages, self.chunk))
+            if chunk: window.append(([k for k, _ in chunk], self._executor().submit(_parse_worker, [j for _, j in chunk])))
+            if not window: return
+            if len(window) < self.workers and chunk: continue
+            keys, future = window.pop(0)
+            with self._stage(): parsed = future.result()
+            yield from zip(keys, parsed)
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+
+class NotificationDispatcher:
+    """
+    V11: Engellemeyen Discord bildirim kuyruğu.
+    Bildirimler önce SQLite'a yazılır, sonra sınırlı bellek kuyruğuna konur;
+    arka plandaki işçi mesaj başına 10 embed paketleyerek gönderir ve
+    429/retry_after ile rate-limit başlıklarına uyar. Gönderilemeyenler
+    DB'de bekler ve yeniden başlatmada kuyruğa geri yüklenir.
+    """
+    def __init__(self, db, webhook_url, session=None, metrics=None):
+        self.db = db
+        self.webhook_url = webhook_url
+        self.metrics = metrics
+        self.session = session or PageFetcher.build_session(1)
+        self.queue = queue.Queue(maxsize=Config.NOTIFY_QUEUE_SIZE)
+        self._inflight = set() # Bellek kuyruğundaki kayıt id'leri
+        self._overflow = False
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._refill(self.db.conn)
+        self._thread = threading.Thread(target=self._run, name="notify-worker", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=10):
+        """Kuyruğu boşaltmayı dener; kalanlar DB'de bekler."""
+        self._stop.set()
+        if self._thread: self._thread.join(timeout)
+
+    def pending(self): return self.queue.qsize()
+
+    def enqueue(self, ilan_id, decision, embed, group=None):
+        """
+        Ana thread. Cooldown içindeki tekrarları eler; True = kuyruğa alındı.
+        `group`: tekrar ilan grubu; aynı ürünün yeniden ilanı ayrıca bildirilmez.
+        """
+        now = time.time()
+        conn = self.db.conn
+        group = group or ilan_id
+        dup = conn.execute("""
+            SELECT 1 FROM notification_queue WHERE group_id=? AND decision=? AND created_at>? LIMIT 1
+        """, (group, decision, now - Config.NOTIFY_COOLDOWN)).fetchone()
+        if dup:
+            if self.metrics: self.metrics.inc('notifications_total', result='deduped')
+            return False
+        if self.metrics: self.metrics.inc('notifications_total', result='queued')
+        with self._lock:
+            with conn:
+                row_id = conn.execute("""
+                    INSERT INTO notification_queue (ilan_id, decision, payload, created_at, group_id) VALUES (?,?,?,?,?)
+                """, (ilan_id, decision, json.dumps(embed), now, group)).lastrowid
+            self._put(row_id, embed)
+        return True
+
+    def _put(self, row_id, embed):
+        try:
+            self.queue.put_nowait((row_id, embed))
+            self._inflight.add(row_id)
+        except queue.Full:
+            if not self._overflow: logging.warning("Bildirim kuyruğu dolu; yeni kayıtlar DB'de bekliyor")
+            self._overflow = True
+
+    def _refill(self, conn):
+        # Bekleyen (gönderilmemiş ve bellekte olmayan) kayıtları kuyruğa yükle
+        with self._lock:
+            self._overflow = False
+            rows = conn.execute("SELECT id, payload FROM notification_queue WHERE sent_at IS NULL ORDER BY id")
+            for row_id, payload in rows:
+                if row_id in self._inflight: continue
+                self._put(row_id, json.loads(payload))
+                if self._overflow: break # Kuyruk yine doldu; kalanlar sonraki turda
+
+    def _run(self):
+        # İşçi kendi bağlantısını kullanır (sqlite3 bağlantıları thread'ler arası paylaşılmaz)
+        self._conn = sqlite3.connect(self.db.db_name, timeout=Config.DB_BUSY_TIMEOUT)
+        with self._conn:
+            self._conn.execute("DELETE FROM notification_queue WHERE sent_at IS NOT NULL AND created_at<?",
+                               (time.time() - Config.NOTIFY_RETENTION,))
+        try:
+            while True:
+                try:
+                    batch = [self.queue.get(timeout=0.5)]
+                except queue.Empty:
+                    if self._stop.is_set(): break
+                    if self._overflow: self._refill(self._conn)
+                    continue
+                while len(batch) < Config.NOTIFY_BATCH:
+                    try: batch.append(self.queue.get_nowait())
+                    except queue.Empty: break
+                if not self._deliver(batch): break
+        finally:
+            self._conn.close()
+
+    def _deliver(self, batch):
+        """Paketi gönderir; durdurulursa False (kayıtlar DB'de bekler)."""
+        payload = {"embeds": [embed for _, embed in batch]}
+        attempt = 0
+        while True:
+            t = time.perf_counter()
+            try:
+                resp = self.session.post(self.webhook_url, json=payload, timeout=Config.NOTIFY_TIMEOUT)
+            except requests.RequestException as e:
+                logging.warning(f"Webhook hatası: {e}")
+                resp = None
+            if self.metrics:
+                self.metrics.observe('webhook', time.perf_counter() - t)
+                self.metrics.inc('webhook_responses_total', status=resp.status_code if resp is not None else 'error')
+
+            if resp is not None and resp.status_code == 429:
+                wait = self._retry_after(resp)
+                logging.warning(f"Webhook rate-limit: {wait:.2f} sn bekleniyor")
+            elif resp is not None and resp.status_code < 500:
+                if resp.status_code >= 400:
+                    # Kalıcı hata (bozuk payload vb.): tekrar denemek döngüye sokar
+                    logging.error(f"Webhook bildirimi reddetti ({resp.status_code}): {resp.text[:200]}")
+                self._mark_sent(batch)
+                self._respect_bucket(resp)
+                return True
+            else:
+                wait = PageFetcher.backoff_delay(attempt)
+                attempt += 1
+            if self._stop.wait(wait): return False
+
+    @staticmethod
+    def _retry_after(resp):
+        try: return float(resp.json().get('retry_after'))
+        except (ValueError, TypeError, AttributeError): pass
+        try: return float(resp.headers.get('Retry-After', 1))
+        except ValueError: return 1.0
+
+    def _respect_bucket(self, resp):
+        # Kova tükendiyse sıfırlanana kadar bekle
+        if resp.headers.get('X-RateLimit-Remaining') == '0':
+            try: self._stop.wait(float(resp.headers.get('X-RateLimit-Reset-After', 1)))
+            except ValueError: pass
+
+    def _mark_sent(self, batch):
+        ids = [row_id for row_id, _ in batch]
+        with self._conn:
+            self._conn.executemany("UPDATE notification_queue SET sent_at=? WHERE id=?",
+                                   [(time.time(), i) for i in ids])
+        with self._lock:
+            self._inflight.difference_update(ids)
+
+class CycleMetrics:
+    """
+    V11: Hafif döngü enstrümantasyonu. Aşama süreleri histogram olarak,
+    sayaçlar ve göstergeler süreç boyunca birikir (Prometheus); her döngünün
+    özeti ayrıca cycle_metrics tablosuna yazılır. Bildirim işçisi de aynı
+    nesneye yazdığı için erişim kilitlidir.
+    """
+    BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+    PREFIX = "prosearcher"
+
     def __init__(self):
-        self.db = DatabaseManager(Config.DB_NAME)
+        self._lock = threading.Lock()
+        self.hist = {}     # aşama -> [kümülatif bucket sayıları, toplam süre, adet]
+        self.counters = {} # (isim, etiketler) -> değer (süreç boyunca)
+        self.gauges = {}
+        self.cycle = {}    # bu döngü: aşama -> toplam süre
+        self.cycle_counters = {}
+        self._started = self._t0 = None
+
+    def begin_cycle(self):
+        with self._lock: self.cycle, self.cycle_counters = {}, {}
+        self._started, self._t0 = time.time(), time.perf_counter()
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        t = time.perf_counter()
+        try: yield
+        finally: self.observe(name, time.perf_counter() - t)
+
+    def timed(self, iterable, name):
+        """Kaynak akışın (üst akışı olmayan üretici) her elemanı için bekleme süresi `name` aşamasına yazılır."""
+        it = iter(iterable)
+        while True:
+            t = time.perf_counter()
+            item = next(it, StopIteration)
+            self.observe(name, time.perf_counter() - t)
+            if item is StopIteration: return
+            yield item
+
+    def observe(self, name, seconds):
+        with self._lock:
+            h = self.hist.get(name)
+            if h is None: h = self.hist[name] = [[0] * len(self.BUCKETS), 0.0, 0]
+            for i in range(bisect.bisect_left(self.BUCKETS, seconds), len(self.BUCKETS)): h[0][i] += 1
+            h[1] += seconds; h[2] += 1
+            self.cycle[name] = self.cycle.get(name, 0.0) + seconds
+
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+            self.cycle_counters[key] = self.cycle_counters.get(key, 0) + value
+
+    def set(self, name, value):
+        with self._lock: self.gauges[name] = value
+
+    def cycle_count(self, name, **labels):
+        return self.cycle_counters.get((name, tuple(sorted(labels.items()))), 0)
+
+    def end_cycle(self, crawl, listings, evaluated, pending):
+        """Döngü özetini (cycle_metrics satırı) üretir ve göstergeleri günceller."""
+        duration = time.perf_counter() - self._t0
+        hits, misses = self.cycle_count('page_cache_total', result='hit'), self.cycle_count('page_cache_total', result='miss')
+        row = {
+            'started_at': self._started, 'duration': duration, 'full': int(crawl['full']),
+            'pages': crawl['pages'], 'listings': listings, 'evaluated': evaluated,
+            'deactivated': crawl.get('deactivated', 0), 'target': crawl.get('target'),
+            'listings_per_sec': listings / duration if duration > 0 else None,
+            'cache_hit_rate': hits / (hits + misses) if hits + misses else None,
+            'notify_pending': pending,
+            'stages': json.dumps({k: round(v, 6) for k, v in self.cycle.items()}),
+            'counters': json.dumps({self._series(n, l): v for (n, l), v in self.cycle_counters.items()}),
+        }
+        self.inc('cycles_total')
+        self.set('last_cycle_duration_seconds', duration)
+        self.set('last_cycle_timestamp_seconds', self._started + duration)
+        self.set('listings_per_second', row['listings_per_sec'] or 0.0)
+        self.set('notify_queue_depth', pending)
+        return row
+
+    def _series(self, name, labels):
+        if not labels: return name
+        return name + "{" + ",".join(f'{k}="{v}"' for k, v in labels) + "}"
+
+    def to_prometheus(self):
+        """Prometheus metin formatı (exposition format 0.0.4)."""
+        p = self.PREFIX
+        with self._lock:
+            lines = [f"# HELP {p}_stage_seconds Döngü aşaması süresi", f"# TYPE {p}_stage_seconds histogram"]
+            for name, (buckets, total, count) in sorted(self.hist.items()):
+                for le, c in zip(self.BUCKETS, buckets):
+                    lines.append(f'{p}_stage_seconds_bucket{{stage="{name}",le="{le}"}} {c}')
+                lines.append(f'{p}_stage_seconds_bucket{{stage="{name}",le="+Inf"}} {count}')
+                lines.append(f'{p}_stage_seconds_sum{{stage="{name}"}} {total:.6f}')
+                lines.append(f'{p}_stage_seconds_count{{stage="{name}"}} {count}')
+            typed = set()
+            for (name, labels), v in sorted(self.counters.items(), key=lambda kv: (kv[0][0], kv[0][1])):
+                if name not in typed:
+                    lines.append(f"# TYPE {p}_{name} counter"); typed.add(name)
+                lines.append(f"{p}_{self._series(name, labels)} {v}")
+            for name, v in sorted(self.gauges.items()):
+                lines += [f"# TYPE {p}_{name} gauge", f"{p}_{name} {v}"]
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path):
+        # Atomik yazım: collector yarım dosya okumasın
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f: f.write(self.to_prometheus())
+        os.replace(tmp, path)
+
+    def serve(self, port, host="127.0.0.1"):
+        """Yerel /metrics uç noktası (daemon thread). Sunucuyu döndürür."""
+        metrics = self
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404); return
+                body = metrics.to_prometheus().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            def log_message(self, *args): pass # Scrape'ler bot_v11.log'u doldurmasın
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+        logging.info(f"Metrik uç noktası: http://{host}:{server.server_port}/metrics")
+        return server
+
+class BotEngineV11:
+    def __init__(self, db_name=None, base_url=None, session=None):
+        self.db = DatabaseManager(db_name or Config.DB_NAME)
         self.brain = DecisionEngine(self.db)
-        self.session = requests.Session()
-        self.session.mount('https://', HTTPAdapter(max_retries=Retry(total=3)))
+        self.base_url = base_url or Config.BASE_URL
+        self.recorder = CaptureRecorder(Config.CAPTURE_FILE) if Config.CAPTURE_FILE else None
+        self.fetcher = PageFetcher(session=session, recorder=self.recorder)
+        self.session = self.fetcher.session
+        self.extractor = ListingExtractor()
+        self.metrics = CycleMetrics()
+        self.parser = PageParser(self.extractor, metrics=self.metrics)
+        self.metrics_server = None
+        if Config.METRICS_PORT:
+            self.metrics_server = self.metrics.serve(Config.METRICS_PORT, Config.METRICS_HOST)
+        self.dispatcher = None
+        if Config.DISCORD_WEBHOOK_URL:
+            self.dispatcher = NotificationDispatcher(self.db, Config.DISCORD_WEBHOOK_URL, metrics=self.metrics)
+            self.dispatcher.start()
+        self.cycle_count = 0
+        self._rules_version = None # İlanların senkronlandığı kural sürümü
+        self.last_crawl = None
+        self.archive = ColdArchive()
+        self.last_changes = {'new': 0, 'changed': 0} # Son taramanın özeti (tam tarama mı, eksiksiz mi, görülen ilanlar)
 
     def notify(self, ad, meta, res, change_type, old_price=0):
-        if not Config.DISCORD_WEBHOOK_URL: return
+        if not self.dispatcher: return
         
         # Matris Filtreleme: Toxic ve Neutral'ı bildirme
-        if res['decision'] in ["NEUTRAL", "💀 TOXIC"] and not "PANIC_SELL" in res['flags']:
+        if res.decision in ["NEUTRAL", "💀 TOXIC"] and not "PANIC_SELL" in res.flags:
             return
 
         # Renk Kodları
@@ -351,36 +2630,527 @@ class BotEngineV11:
             "✅ GOOD DEAL": 5763719,    # Yeşil
             "💀 TOXIC": 10038562        # Koyu Kırmızı
         }
-        color = colors.get(res['decision'], 5814783)
+        color = colors.get(res.decision, 5814783)
         
-        title = f"{res['decision']} ({res['score']}) - {meta['brand']} {meta['category']}"
+        title = f"{res.decision} ({res.score}) - {meta.brand} {meta.category}"
         
-        desc = f"**{ad['baslik']}**\n"
-        desc += f"💰 **{ad['fiyat']:,.0f} {ad['currency']}**"
+        desc = f"**{ad.baslik}**\n"
+        desc += f"💰 **{ad.fiyat:,.0f} {ad.currency}**"
         if change_type == 'PRICE_CHANGE': desc += f" (📉 {old_price:,.0f})"
         
         desc += f"\n\n🤖 **Yapay Zeka Görüşü:**\n"
-        desc += f"*\"{res['explanation'].capitalize()}.\"*\n"
+        desc += f"*\"{res.explanation.capitalize()}.\"*\n"
         
         desc += f"\n📊 **Analitik Veriler:**\n"
-        desc += f"• **Z-Score:** {res['z_score']:.2f} (Sigmoid Puan: {math.ceil(MathEngine.sigmoid_score(res['z_score']))}/50)\n"
-        desc += f"• **Piyasa Medyanı:** {res['stats']['median']:,.0f} TL\n"
+        desc += f"• **Z-Score:** {res.z_score:.2f} (Sigmoid Puan: {math.ceil(MathEngine.sigmoid_score(res.z_score))}/50)\n"
+        desc += f"• **Piyasa Medyanı:** {res.stats['median']:,.0f} TL\n"
         
-        if res['velocity'] > 0:
-            desc += f"• **Volatilite:** Saatte %{res['velocity']*100:.2f} erime\n"
+        if res.velocity > 0:
+            desc += f"• **Volatilite:** Saatte %{res.velocity*100:.2f} erime\n"
         
-        if res['flags']:
-            desc += f"\n🚩 **Risk Faktörleri:** " + ", ".join([f"`{f}`" for f in res['flags']])
+        if res.flags:
+            desc += f"\n🚩 **Risk Faktörleri:** " + ", ".join([f"`{f}`" for f in res.flags])
+
+        if res.comparables:
+            desc += "\n\n🔎 **Emsal İlanlar:**\n"
+            desc += "".join(f"• [{c['baslik'][:60]}]({c['ilan_url']}) — {c['fiyat_norm']:,.0f} TL\n" for c in res.comparables)
+
+        group = meta.dup_group_id
+        if group and group != ad.ilan_id: desc += f"\n♻️ Tekrar ilan (ilk ilan: {group})"
+
+        # Gönderim arka planda: tarama döngüsü webhook'u beklemez
+        self.dispatcher.enqueue(ad.ilan_id, res.decision,
+                                {"title": title, "description": desc, "color": color, "url": ad.ilan_url}, group)
+
+    def run_cycle(self, base_url=None, cycle_index=None, full=None):
+        """
+        Tek hedef için bir döngü. `cycle_index` hedefin döngü sayacıdır (tam
+        tarama sıklığı buna göre); verilmezse botun kendi sayacı kullanılır.
+        `full` verilirse (tekrar oynatma) tarama türü sayaçtan hesaplanmaz.
+        """
+        base_url = base_url or self.base_url
+        if cycle_index is None:
+            cycle_index = self.cycle_count
+            self.cycle_count += 1
+        if full is None: full = not Config.INCREMENTAL_CRAWL or cycle_index % Config.FULL_SWEEP_EVERY == 0
+        if self.recorder: self.recorder.cycle(base_url, cycle_index, full)
+        m = self.metrics
+        m.begin_cycle()
+        with m.stage('rules'): self.sync_rules()
+        # İstatistik önbelleği döngü başında tek sorguyla kurulur
+        with m.stage('stats'): self.db.stats.rebuild()
+
+        # Akış: her sayfa parse edilir edilmez yazılır, puanlanır ve bildirilir;
+        # döngü boyunca bellekte sadece uçuştaki sayfalar bulunur
+        processed = listings = 0
+        changes = {'new': 0, 'changed': 0}
+        for page_ads, page_metas in self.crawl(base_url, full):
+            processed += self.process(page_ads, target=base_url, metas=page_metas)
+            listings += len(page_ads)
+            for k in changes: changes[k] += self.last_changes[k]
+        self.last_changes = changes
+        crawl = self.last_crawl
+        crawl.update(changes)
+
+        # Pasifleştirme sadece eksiksiz tam taramada: artımlı tarama sayfaların bir kısmını görmez,
+        # alınamayan sayfadaki ilanlar da görülmemiş sayılıp kaçırma sayacı artmasın
+        crawl['deactivated'] = 0
+        if full and crawl['seen'] and crawl['complete']:
+            with m.stage('sweep'): crawl['deactivated'] = self.db.sweep_unseen(crawl['seen'], target=base_url)
+        elif full and not crawl['complete']:
+            logging.warning(f"Tam tarama eksik [{urlparse(base_url).path}]: alınamayan sayfa var, pasifleştirme atlandı")
+        # Dashboard nabzı her oturumda tüm tabloyu toplamak yerine bu özeti okur; hedef sayısından
+        # bağımsız en fazla MARKET_SUMMARY_EVERY'de bir anlık görüntü (zamanlayıcı saatte çok döngü çalıştırır)
+        with m.stage('summary'): self.db.refresh_market_summary(min_interval=Config.MARKET_SUMMARY_EVERY)
+        self.record_metrics(crawl, listings, processed)
+        logging.info(f"Döngü tamam [{urlparse(base_url).path}] ({'tam' if full else 'artımlı'}): {crawl['pages']} sayfa, "
+                     f"{crawl['skipped']} atlandı, {listings} ilan, {processed} değerlendirme, "
+                     f"{crawl['deactivated']} pasifleştirildi")
+        return processed
+
+    def sync_rules(self):
+        """
+        rules.json değiştiyse yeniden yükler. DB'deki ilanların sınıflandığı
+        taksonomi güncel kurallardan farklıysa sadece etkilenen ilanları
+        yeniden kümeler ve puanları tazeler. Sınıfı değişen ilan sayısını döndürür.
+        """
+        ConfigLoader.reload_if_changed()
+        version = ConfigLoader.get_version()
+        if version == self._rules_version: return 0
+        self._rules_version = version
+
+        new = ConfigLoader.get_taxonomy()
+        stored = self.db.get_state('taxonomy')
+        # Durum kaydı olmayan DB'ler gömülü varsayılan taksonomiyle sınıflanmıştır
+        old = json.loads(stored) if stored else ConfigLoader.default_taxonomy()
+        changed = 0
+        if old != new:
+            changed = self.db.recluster(old, new)
+            # Küme istatistikleri değişti: aktif ilanların kararları toplu yenilenir
+            if changed: BulkScorer(self.db).rescore()
+        self.db.set_state('taxonomy', json.dumps(new, ensure_ascii=False))
+        return changed
+
+    def maybe_archive(self, now=None):
+        """
+        ARCHIVE_EVERY'de bir bakım işi (son çalışma engine_state'te): piyasa özeti
+        seyreltilir, ARCHIVE_AFTER_DAYS açıksa soğuk arşiv çalışır. Arşiv sonucunu
+        ya da None döndürür.
+        """
+        now = now or time.time()
+        last = float(self.db.get_state('archive_last_run') or 0)
+        if now - last < Config.ARCHIVE_EVERY: return None
+        with self.metrics.stage('summary'): pruned = self.db.prune_market_summary(now)
+        if pruned: logging.info(f"Piyasa özeti seyreltildi: {pruned} satır silindi")
+        moved = None
+        if Config.ARCHIVE_AFTER_DAYS:
+            with self.metrics.stage('archive'): moved = self.db.archive_inactive(self.archive)
+            logging.info(f"Arşiv: {moved['listings']} ilan, {moved['history']} fiyat noktası taşındı, "
+                         f"{moved['freed_pages']} sayfa iade edildi")
+        self.db.set_state('archive_last_run', str(now))
+        return moved
+
+    def record_metrics(self, crawl, listings, evaluated):
+        """Döngü özetini cycle_metrics'e yazar, Prometheus dosyasını yeniler."""
+        pending = self.dispatcher.pending() if self.dispatcher else 0
+        row = self.metrics.end_cycle(crawl, listings, evaluated, pending)
+        self.db.save_cycle_metrics(row)
+        if Config.METRICS_FILE: self.metrics.write_textfile(Config.METRICS_FILE)
+        stages = ", ".join(f"{k} {v:.2f}s" for k, v in sorted(self.metrics.cycle.items(), key=lambda kv: -kv[1]))
+        logging.info(f"Döngü süresi {row['duration']:.2f} sn ({stages})")
+        return row
+
+    def crawl(self, base_url, full=True):
+        """
+        Sayfa akışı: fetch -> parse + sınıflandırma; sayfa grupları için
+        (ilanlar, metalar) üretir. Aşamalar sınırlı pencerelerle çalışır (uçuşta en fazla
+        FETCH_CONCURRENCY istek, PARSE_WORKERS grup); tüketici (yazma, puanlama,
+        bildirim) yavaşlarsa yeni sayfa indirilmez, bellek sayfa sayısından bağımsızdır.
+        Artımlı modda koşullu istek gönderilir, içeriği değişmeyen sayfa parse
+        edilmez ve sayfa çoğunlukla değişmemiş ilanlardan oluşuyorsa akış durur.
+        Tam taramada (full) önbellek kullanılmaz, tüm sayfalar baştan okunur.
+        Özet (görülen ilanlar, sayfa sayıları, eksiksiz mi) self.last_crawl'dadır.
+        """
+        urls = self.fetcher.page_urls(base_url, Config.MAX_PAGES)
+        m = self.metrics
+        with m.stage('db'): cache = {} if full else self.db.get_page_cache(urls)
+        headers = [self._conditional_headers(cache.get(u)) for u in urls]
+        crawl = self.last_crawl = {'target': base_url, 'full': full, 'complete': True, 'seen': set(),
+                                   'pages': 0, 'skipped': 0}
+
+        fresh = self._fresh_pages(urls, headers, cache, crawl)
+        # İpucu iş parse'a girerken alınır: önceki sayfanın hatırlanan stratejisi kullanılır
+        jobs = ((page, (page[1].content, page[1].encoding, page[0], self.extractor.hint(base_url))) for page in fresh)
+        parsed = self.parser.parse_iter(jobs)
+        # Sayfalar WRITE_BATCH_PAGES'lik gruplar halinde verilir: commit başına sabit maliyet
+        # (WAL'e yazılan indeks sayfaları) her sayfada ödenmez, bellek yine sınırlı kalır
+        ads, metas, updates = [], [], []
+        try:
+            for (url, resp, digest), (name, page_ads, page_metas) in parsed:
+                self.extractor.remember(base_url, self.extractor.hint(base_url), name, len(page_ads))
+                m.inc('listings_total', len(page_ads))
+                ids = [ad.ilan_id for ad in page_ads]
+                crawl['seen'].update(ids)
+
+                stop = not page_ads # Sonuçların sonu
+                if page_ads and not full:
+                    with m.stage('db'): known = self.db.known_prices(ids)
+                    unchanged = sum(1 for ad in page_ads if known.get(ad.ilan_id) == ad.fiyat)
+                    stop = unchanged / len(page_ads) >= Config.INCREMENTAL_STOP_RATIO
+                ads += page_ads
+                metas += page_metas
+                updates.append((url, resp.headers.get('ETag'), resp.headers.get('Last-Modified'),
+                                digest, json.dumps(ids), Clock.time()))
+                last = stop and not full
+                if last or len(updates) >= Config.WRITE_BATCH_PAGES:
+                    yield ads, metas
+                    # Önbellek sayfalar yazıldıktan sonra: yarıda kesilen döngü sayfayı "görülmüş" bırakmaz
+                    with m.stage('db'): self.db.save_page_cache(updates)
+                    ads, metas, updates = [], [], []
+                if last: break
+            if updates:
+                yield ads, metas
+                with m.stage('db'): self.db.save_page_cache(updates)
+        finally:
+            parsed.close()
+
+    def _fresh_pages(self, urls, headers, cache, crawl):
+        """Yanıt akışı -> parse edilecek (url, yanıt, özet); alınamayan ve değişmeyen sayfalar burada elenir."""
+        m = self.metrics
+        for url, resp in zip(urls, m.timed(self.fetcher.fetch_iter(urls, headers), 'fetch')):
+            crawl['pages'] += 1
+            cached = cache.get(url)
+            m.inc('http_responses_total', status=resp.status_code if resp is not None else 'error')
+            if resp is None or resp.status_code not in (200, 304) or (resp.status_code == 304 and not cached):
+                logging.warning(f"Sayfa alınamadı: {url}")
+                crawl['complete'] = False
+                continue
+
+            digest = hashlib.sha1(resp.content).hexdigest() if resp.status_code == 200 else None
+            if resp.status_code == 304 or (cached and cached['content_hash'] == digest):
+                # Sayfa önceki döngüyle aynı (sadece artımlı tarama): ilanlar görülmüş say, parse etme, akış durur
+                crawl['seen'].update(json.loads(cached['ilan_ids']))
+                crawl['skipped'] += 1
+                m.inc('page_cache_total', result='hit')
+                return
+            if not crawl['full']: m.inc('page_cache_total', result='miss')
+            yield url, resp, digest
+
+    @staticmethod
+    def _conditional_headers(cached):
+        if not cached: return None
+        h = {}
+        if cached['etag']: h['If-None-Match'] = cached['etag']
+        if cached['last_modified']: h['If-Modified-Since'] = cached['last_modified']
+        return h or None
+
+    def close(self):
+        self.parser.close()
+        if self.dispatcher: self.dispatcher.stop()
+        if self.recorder: self.recorder.close()
+        if self.metrics_server:
+            self.metrics_server.shutdown(); self.metrics_server.server_close()
+
+    def process(self, ads, target=None, metas=None):
+        """
+        Yeni ve fiyatı değişen ilanları puanlar, kararları yazar ve bildirir.
+        `metas` parse aşamasında hesaplanmışsa taksonomi tekrar çalışmaz.
+        """
+        m = self.metrics
+        evaluated, decisions, comparables = 0, [], []
+        changes = {'new': 0, 'changed': 0}
+        if metas is None or len(metas) != len(ads):
+            with m.stage('taxonomy'): metas = TaxonomyEngine.analyze_many([ad.baslik for ad in ads])
+        with m.stage('upsert'): results = self.db.upsert_many(ads, metas, target=target)
+        for ad, (ex, meta, norm_price, hours, velocity) in zip(ads, results):
+            if ex is None:
+                change_type, old_price = 'NEW', 0
+                if meta.dup_group_id != ad.ilan_id: m.inc('reposts_total')
+            elif ex['fiyat'] != ad.fiyat: change_type, old_price = 'PRICE_CHANGE', ex['fiyat']
+            else: continue
+            changes['new' if ex is None else 'changed'] += 1
+
+            with m.stage('score'): res = self.brain.evaluate(meta, norm_price, hours, velocity, ex)
+            if not res: continue
+            evaluated += 1
+            m.inc('decisions_total', decision=res.decision)
+            decisions.append((res.score, res.decision, json.dumps(res.flags), res.explanation, ad.ilan_id))
+            if res.decision != "NEUTRAL":
+                # Açıklama hangi ilanlarla kıyaslandığını gösterebilsin (embed + dashboard)
+                with m.stage('comparables'):
+                    res.comparables = self.db.find_comparables(
+                        {'ilan_id': ad.ilan_id, 'baslik': ad.baslik, 'category': meta.category,
+                         'dup_group_id': meta.dup_group_id, 'fiyat_norm': norm_price})
+                comparables.append((json.dumps(res.comparables, ensure_ascii=False), ad.ilan_id))
+            with m.stage('notify'): self.notify(ad, meta, res, change_type, old_price)
+        with m.stage('db'):
+            self.db.save_decisions(decisions)
+            self.db.save_comparables(comparables)
+        self.last_changes = changes # Zamanlayıcı hedef aralığını buna göre uyarlar
+        return evaluated
+
+class CrawlScheduler:
+    """
+    V11: Çok hedefli tarama zamanlayıcısı. Hedefler sonraki çalışma zamanına
+    göre bir min-heap'te bekler; zamanı gelen hedef çalıştırılır, aralığı
+    gözlenen değişime (yeni + fiyatı değişen ilan) göre uyarlanır ve ancak
+    döngüsü bittikten sonra heap'e geri konur: aynı hedefin döngüleri çakışmaz.
+    Hedefler tek DB bağlantısı üzerinden sırayla çalışır (SQLite tek yazıcı);
+    paralellik sayfa indirme katmanındadır. Durum crawl_targets tablosunda
+    tutulur, yeniden başlatmada kalınan yerden devam edilir.
+    """
+    def __init__(self, bot, targets=None):
+        self.bot = bot
+        self.db = bot.db
+        self.targets = list(dict.fromkeys(targets or Config.TARGETS))
+        self.state = {}
+        self._heap = []
+        self._stop = threading.Event()
+
+    def load(self):
+        now = time.time()
+        saved = self.db.load_targets()
+        self.state, self._heap = {}, []
+        for url in self.targets:
+            st = saved.get(url) or {'url': url, 'interval': float(Config.CHECK_INTERVAL), 'next_due': now,
+                                    'last_run': None, 'last_duration': None, 'churn': None, 'cycles': 0}
+            st['interval'] = self.clamp(st['interval'])
+            self.state[url] = st
+            self._heap.append((st['next_due'], url))
+        heapq.heapify(self._heap)
+        overdue = sum(1 for due, _ in self._heap if due <= now)
+        logging.info(f"Zamanlayıcı: {len(self.targets)} hedef ({overdue} tanesinin zamanı gelmiş)")
+
+    @staticmethod
+    def clamp(interval):
+        return min(max(interval, Config.MIN_CHECK_INTERVAL), Config.MAX_CHECK_INTERVAL)
+
+    @classmethod
+    def adapt(cls, interval, churn, changes):
+        """
+        Değişim EWMA'sı TARGET_CHURN'ün üstündeyse aralık kısalır, altındaysa
+        uzar; tek döngüde en fazla yarıya iner / 1.5 katına çıkar.
+        """
+        a = Config.CHURN_SMOOTHING
+        churn = changes if churn is None else (1 - a) * churn + a * changes
+        factor = min(max((Config.TARGET_CHURN + 1) / (churn + 1), 0.5), 1.5)
+        return cls.clamp(interval * factor), churn
+
+    def stop(self, *_):
+        """Sinyal işleyicisi olarak da kullanılır: süren döngü bitince çıkılır."""
+        if not self._stop.is_set(): logging.info("Kapanış istendi; süren döngü tamamlanınca çıkılacak")
+        self._stop.set()
+
+    def run(self):
+        self.load()
+        while not self._stop.is_set() and self._heap:
+            due, url = self._heap[0]
+            wait = due - time.time()
+            if wait > 0:
+                self._stop.wait(wait)
+                continue
+            heapq.heappop(self._heap)
+            st = self.run_target(url)
+            heapq.heappush(self._heap, (st['next_due'], url))
+            # Hedefler arasında: arşiv işi tarama döngüsüyle aynı yazıcıda, çakışmadan
+            try: self.bot.maybe_archive()
+            except Exception: logging.exception("Arşiv işi başarısız")
+        logging.info("Zamanlayıcı durdu")
+
+    def run_target(self, url):
+        st = self.state[url]
+        started = time.time()
+        try:
+            self.bot.run_cycle(url, st['cycles'])
+            changes = self.bot.last_changes['new'] + self.bot.last_changes['changed']
+            st['interval'], st['churn'] = self.adapt(st['interval'], st['churn'], changes)
+        except Exception:
+            # Hatalı hedef diğerlerini durdurmaz; aynı aralıkla tekrar denenir
+            logging.exception(f"Döngü hatası: {url}")
+        st['cycles'] += 1
+        st['last_run'] = started
+        st['last_duration'] = time.time() - started
+        st['next_due'] = time.time() + st['interval']
+        self.db.save_target(st)
+        logging.info(f"Sonraki tarama [{urlparse(url).path}]: {st['interval']:.0f} sn sonra "
+                     f"(değişim ort. {st['churn'] or 0:.1f})")
+        return st
+
+class CrawlReplayer:
+    """
+    V11: Kayıt dosyasındaki döngüleri BotEngineV11 üzerinden yeniden oynatır:
+    fetch (ReplayAdapter), parse, taksonomi, DB ve puanlama gerçek kodla
+    çalışır. Saat her döngüde kaydın zamanına sabitlenir; `speed` 1 gerçek
+    hız, N N kat hızlı, 0 beklemesiz. Sonuçta throughput ve DB'deki kararların
+    özeti (digest) döner: iki sürüm aynı kayıtla karşılaştırılabilir.
+    """
+    def __init__(self, bot, adapter, path, speed=0):
+        self.bot = bot
+        self.adapter = adapter
+        self.path = path
+        self.speed = speed
+
+    def cycles(self):
+        """(döngü kaydı, yanıtlar) çiftleri; ilk döngüden önceki yanıtlar atlanır."""
+        marker, responses = None, []
+        for rec in CaptureRecorder.read(self.path):
+            if rec['type'] == 'cycle':
+                if marker: yield marker, responses
+                marker, responses = rec, []
+            elif marker: responses.append(rec)
+        if marker: yield marker, responses
+
+    def run(self):
+        started, first, out = time.perf_counter(), None, []
+        try:
+            for marker, responses in self.cycles():
+                first = first if first is not None else marker['t']
+                if self.speed:
+                    wait = (marker['t'] - first) / self.speed - (time.perf_counter() - started)
+                    if wait > 0: time.sleep(wait)
+                Clock.freeze(marker['t'])
+                self.adapter.load(responses)
+                t = time.perf_counter()
+                evaluated = self.bot.run_cycle(marker['target'], marker['index'], marker['full'])
+                out.append({'target': marker['target'], 'index': marker['index'], 'responses': len(responses),
+                            'evaluated': evaluated, 'unused': self.adapter.reset(),
+                            'seconds': round(time.perf_counter() - t, 4)})
+        finally:
+            Clock.release()
+        seconds = time.perf_counter() - started
+        m = self.bot.metrics
+        listings = sum(v for (name, _), v in m.counters.items() if name == 'listings_total')
+        return {
+            'capture': self.path, 'cycles': len(out), 'seconds': round(seconds, 3), 'listings': listings,
+            'listings_per_sec': round(listings / seconds, 1) if seconds else None,
+            'stages': {k: round(h[1], 4) for k, h in sorted(m.hist.items())},
+            'digest': self.digest(), 'per_cycle': out,
+        }
+
+    def digest(self):
+        """İlan durumu + kararların sha1'i (sıra ve zamandan bağımsız karşılaştırma anahtarı)."""
+        h = hashlib.sha1()
+        for row in self.bot.db.conn.execute("""
+            SELECT ilan_id, fiyat_norm, category, brand, cluster_key, aktif_mi, dup_group_id,
+                   opportunity_score, decision_label, risk_flags
+            FROM ilan ORDER BY ilan_id"""):
+            h.update(json.dumps(tuple(row), ensure_ascii=False).encode("utf-8"))
+        return h.hexdigest()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="ProSearcher V11 Cognitive Engine")
+    sub = parser.add_subparsers(dest="command")
+
+    p = sub.add_parser("rescore", help="Aktif ilanları güncel parametrelerle toplu yeniden puanla")
+    p.add_argument("--db", default=Config.DB_NAME)
+    p.add_argument("--sigmoid-center", type=float, help="Config.SIGMOID_CENTER geçersiz kıl")
+    p.add_argument("--sigmoid-slope", type=float, help="Config.SIGMOID_SLOPE geçersiz kıl")
+    p.add_argument("--critical-low-z", type=float, help="Config.CRITICAL_LOW_Z geçersiz kıl")
+
+    p = sub.add_parser("cycle", help="Tek bir tarama döngüsü çalıştır (isteğe bağlı cProfile dökümü)")
+    p.add_argument("--db", default=Config.DB_NAME)
+    p.add_argument("--url", default=Config.BASE_URL)
+    p.add_argument("--profile", metavar="DOSYA", help="Döngüyü cProfile ile çalıştır, pstats dökümünü yaz")
+    p.add_argument("--record", metavar="DOSYA", help="Ham yanıtları bu kayıt dosyasına ekle (CAPTURE_FILE)")
+
+    p = sub.add_parser("archive", help="Pasif ilanları soğuk arşive taşı ve DB'yi küçült")
+    p.add_argument("--db", default=Config.DB_NAME)
+    p.add_argument("--days", type=int, default=Config.ARCHIVE_AFTER_DAYS or 30, help="Bu kadar gündür pasif ilanlar")
+    p.add_argument("--dir", default=Config.ARCHIVE_DIR, help="Arşiv kök dizini")
+
+    p = sub.add_parser("run", help="Zamanlayıcıyı başlat: tüm hedefleri uyarlanan aralıklarla sürekli tara")
+    p.add_argument("--db", default=Config.DB_NAME)
+    p.add_argument("--targets", nargs="+", help="Hedef URL'ler (varsayılan: TARGET_URLS / TARGET_URL)")
+    p.add_argument("--record", metavar="DOSYA", help="Ham yanıtları bu kayıt dosyasına ekle (CAPTURE_FILE)")
+
+    p = sub.add_parser("replay", help="Kayıt dosyasındaki döngüleri çevrimdışı oynat (yük testi / sürüm karşılaştırma)")
+    p.add_argument("capture", help="--record / CAPTURE_FILE ile yazılmış kayıt")
+    p.add_argument("--db", default="replay.db", help="Oynatma DB'si (canlı DB'den ayrı)")
+    p.add_argument("--fresh", action="store_true", help="DB varsa silip boş başla")
+    p.add_argument("--speed", type=float, default=0, help="1 = kayıttaki hız, N = N kat hızlı, 0 = beklemesiz")
+    p.add_argument("--profile", metavar="DOSYA", help="Oynatmayı cProfile ile çalıştır, pstats dökümünü yaz")
+    p.add_argument("-o", "--output", help="Rapor JSON dosyası (verilmezse stdout)")
+
+    args = parser.parse_args(argv)
+    if getattr(args, "record", None): Config.CAPTURE_FILE = args.record
+    if args.command in (None, "run"):
+        print("V11 Cognitive Engine Hazır: Sigmoid Scoring, Karar Matrisi ve Açıklanabilirlik Aktif.")
+        bot = BotEngineV11(db_name=getattr(args, "db", None))
+        scheduler = CrawlScheduler(bot, getattr(args, "targets", None))
+        # SIGINT/SIGTERM: süren döngü yarıda kesilmez, bildirim kuyruğu boşaltılır
+        signal.signal(signal.SIGINT, scheduler.stop)
+        signal.signal(signal.SIGTERM, scheduler.stop)
+        try:
+            scheduler.run()
+        finally:
+            bot.close()
+        return
+
+    if args.command == "cycle":
+        bot = BotEngineV11(db_name=args.db, base_url=args.url)
+        try:
+            if not args.profile:
+                bot.run_cycle()
+                return
+            prof = cProfile.Profile()
+            prof.runcall(bot.run_cycle)
+            prof.dump_stats(args.profile)
+            logging.info(f"Profil yazıldı: {args.profile} (python -m pstats / snakeviz ile açılabilir)")
+            pstats.Stats(prof).sort_stats("cumulative").print_stats(20)
+        finally:
+            bot.close()
+        return
+
+    if args.command == "replay":
+        # Oynatma dışarı çıkmaz: bildirim, metrik sunucusu ve yeni kayıt kapalı; hız limiti ve geri çekilme yok
+        Config.DISCORD_WEBHOOK_URL = Config.CAPTURE_FILE = None
+        Config.METRICS_PORT, Config.METRICS_FILE = 0, None
+        Config.BACKOFF_BASE = 0
+        if args.fresh:
+            for suffix in ("", "-wal", "-shm"):
+                with contextlib.suppress(FileNotFoundError): os.remove(args.db + suffix)
+        adapter = ReplayAdapter()
+        session = requests.Session()
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        bot = BotEngineV11(db_name=args.db, session=session)
+        bot.fetcher.limiter = RateLimiter(rate=1e9, burst=1e9)
+        replayer = CrawlReplayer(bot, adapter, args.capture, args.speed)
+        try:
+            if args.profile:
+                prof = cProfile.Profile()
+                report = prof.runcall(replayer.run)
+                prof.dump_stats(args.profile)
+                pstats.Stats(prof).sort_stats("cumulative").print_stats(20)
+            else:
+                report = replayer.run()
+        finally:
+            bot.close()
+        text = json.dumps(report, indent=2, ensure_ascii=False)
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as f: f.write(text + "\n")
+        else:
+            print(text)
+        logging.info(f"Oynatma: {report['cycles']} döngü, {report['listings']} ilan, {report['seconds']} sn "
+                     f"({report['listings_per_sec']} ilan/sn), digest {report['digest'][:12]}")
+        return
 
-        requests.post(Config.DISCORD_WEBHOOK_URL, json={
-            "embeds": [{"title": title, "description": desc, "color": color, "url": ad['ilan_url']}]
-        })
+    if args.command == "archive":
+        db = DatabaseManager(args.db)
+        size = os.path.getsize(args.db)
+        moved = db.archive_inactive(ColdArchive(args.dir), days=args.days)
+        logging.info(f"Arşiv: {moved['listings']} ilan, {moved['history']} fiyat noktası -> {args.dir}; "
+                     f"DB {size / 1e6:.1f} MB -> {os.path.getsize(args.db) / 1e6:.1f} MB")
+        db.conn.close()
+        return
 
-    def run_cycle(self):
-        # ... (Scraping mantığı V10 ile aynı, sadece notify çağrısı güncel)
-        # Simülasyon:
-        pass
+    if args.command == "rescore":
+        if args.sigmoid_center is not None: Config.SIGMOID_CENTER = args.sigmoid_center
+        if args.sigmoid_slope is not None: Config.SIGMOID_SLOPE = args.sigmoid_slope
+        if args.critical_low_z is not None: Config.CRITICAL_LOW_Z = args.critical_low_z
+        t0 = time.perf_counter()
+        n = BulkScorer(DatabaseManager(args.db)).rescore()
+        logging.info(f"Yeniden puanlama: {n} ilan, {time.perf_counter() - t0:.2f} sn")
 
 if __name__ == "__main__":
-    print("V11 Cognitive Engine Hazır: Sigmoid Scoring, Karar Matrisi ve Açıklanabilirlik Aktif.")
-    # bot = BotEngineV11()
\ No newline at end of file
+    main()
@@ -3,11 +3,36 @@ import sqlite3
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
-from datetime import datetime, timedelta
+from plotly.subplots import make_subplots
+import numpy as np
+from datetime import datetime
 import os
+import json
+import threading
 
 # --- KONFİGÜRASYON ---
 DB_NAME = "ilan_takip_v11_cognitive.db"  # V11 Botunun oluşturduğu DB
+MIN_SCHEMA_VERSION = 8  # updated_at damgası (bot göçü v8) olmadan artımlı yükleme yapılamaz
+SUMMARY_SCHEMA_VERSION = 10  # market_summary tablosu (bot göçü v10)
+METRICS_SCHEMA_VERSION = 11  # cycle_metrics tablosu (bot göçü v11)
+COMPARABLES_SCHEMA_VERSION = 15  # ilan.comparables (emsal ilanlar, bot göçü v15)
+HEALTH_CYCLES = 50           # Motor sağlığı panelinde gösterilen son döngü sayısı
+FEED_LABELS = ["💎 HIDDEN GEM", "✅ GOOD DEAL", "🎲 SPECULATIVE"]  # Aksiyon alınabilir kararlar
+FEED_PAGE_SIZE = 24  # Sayfa başına kart (3 kolonlu ızgara)
+WEBGL_THRESHOLD = 5_000      # Bu satır sayısının üstünde scatter WebGL (Scattergl) ile çizilir
+AGGREGATE_THRESHOLD = 100_000  # Bunun üstünde nokta yerine 2-B yoğunluk (bin) gösterilir
+SCATTER_SAMPLE = 20_000      # WebGL modunda tabakalı örneklem büyüklüğü
+RAW_PAGE_SIZE = 200          # Ham veri sekmesi sayfa boyu (SQL LIMIT/OFFSET)
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", "archive")  # Botun soğuk arşivi (gzip NDJSON, dt=YYYY-MM-DD bölümleri)
+RARE_LABELS = ["💎 HIDDEN GEM"]  # Örneklemede asla atılmayan nadir etiketler
+UNSCORED_LABEL = "UNSCORED"  # decision_label NULL: istatistiği yetersiz, hiç puanlanmamış ilan
+LABEL_COLORS = {
+    "💎 HIDDEN GEM": "#00b4d8",
+    "✅ GOOD DEAL": "#2a9d8f",
+    "🎲 SPECULATIVE": "#e9c46a",
+    "NEUTRAL": "#888888",
+    UNSCORED_LABEL: "#cccccc"
+}
 PAGE_TITLE = "ProSearcher V11 | Cognitive Radar"
 PAGE_ICON = "🧠"
 
@@ -59,39 +84,111 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # --- VERİ KATMANI ---
-@st.cache_data(ttl=60) # 1 dakikada bir cache temizle (Canlıya yakın)
-def load_data():
-    if not os.path.exists(DB_NAME):
-        return pd.DataFrame()
-    
-    conn = sqlite3.connect(DB_NAME)
-    # V11 Şemasına uygun sorgu
-    query = """
-        SELECT 
-            ilan_id, baslik, category, brand, tier, cluster_key,
-            fiyat, para_birimi, fiyat_norm,
-            first_seen, last_seen, initial_price,
-            hourly_velocity, opportunity_score, risk_flags, decision_label,
-            ilan_url
-        FROM ilan
-        WHERE aktif_mi = 1
+LISTING_QUERY = """
+    SELECT 
+        ilan_id, baslik, category, brand, tier, cluster_key,
+        fiyat, para_birimi, fiyat_norm,
+        first_seen, last_seen, initial_price,
+        hourly_velocity, opportunity_score, risk_flags, decision_label, explanation,
+        ilan_url, aktif_mi, updated_at
+    FROM ilan
+"""
+
+@st.cache_resource
+def get_connection():
+    """Tüm oturumların paylaştığı salt-okunur bağlantı (WAL: bot yazarken bloklamaz)."""
+    return sqlite3.connect(f"file:{DB_NAME}?mode=ro", uri=True, timeout=10, check_same_thread=False)
+
+class IncrementalLoader:
     """
-    try:
-        df = pd.read_sql(query, conn)
-        
-        # Tarih dönüşümleri
+    Süreç başına tek taban DataFrame. Her yenilemede sadece `updated_at`
+    damgası watermark'tan yeni olan satırlar çekilip ilan_id ile birleştirilir.
+    Şema sürümü değişirse baştan yüklenir.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.df = pd.DataFrame()
+        self.watermark = None
+        self.schema_version = None
+
+    @staticmethod
+    def _read(conn, where, params=()):
+        df = pd.read_sql(LISTING_QUERY + where, conn, params=params)
+        # Tarih dönüşümleri (sadece yeni gelen satırlar için)
         df['first_seen'] = pd.to_datetime(df['first_seen'])
         df['last_seen'] = pd.to_datetime(df['last_seen'])
-        
-        # Tier bilgisi bazen JSON içinde olabilir, V11 DB yapısına göre adjust etmek gerekebilir.
-        # Şimdilik varsayılan kolonlardan okuyoruz.
-        
         return df
+
+    def load(self, conn):
+        with self.lock:
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            if version < MIN_SCHEMA_VERSION:
+                raise RuntimeError(f"DB şeması eski (v{version}); botu bir kez çalıştırıp göçleri uygulayın.")
+
+            if version != self.schema_version or self.watermark is None:
+                self.df = self._read(conn, "WHERE aktif_mi = 1")
+                self.schema_version = version
+            else:
+                # Eşit damgalı satırlar tekrar gelebilir; ilan_id ile birleştirme tekilleştirir
+                delta = self._read(conn, "WHERE updated_at >= ?", (self.watermark,))
+                if not delta.empty:
+                    base = self.df[~self.df['ilan_id'].isin(delta['ilan_id'])]
+                    self.df = pd.concat([base, delta[delta['aktif_mi'] == 1]], ignore_index=True)
+
+            if not self.df.empty:
+                self.watermark = max(self.watermark or 0, self.df['updated_at'].max())
+            return self.df
+
+@st.cache_resource
+def get_loader():
+    return IncrementalLoader()
+
+def build_filters(category, brand):
+    """Sidebar seçimlerini parametreli SQL koşuluna çevirir (aktif ilanlar)."""
+    where, params = ["aktif_mi = 1"], []
+    if category != "Tümü":
+        where.append("category = ?"); params.append(category)
+    if brand != "Tümü":
+        where.append("brand = ?"); params.append(brand)
+    return " AND ".join(where), params
+
+def distinct_values(conn, column, category=None):
+    # idx_ilan_filters (aktif_mi, category, brand, ...) ön ekinden, tabloya dokunmadan
+    q = f"SELECT DISTINCT {column} FROM ilan WHERE aktif_mi = 1 AND {column} IS NOT NULL"
+    params = []
+    if category:
+        q += " AND category = ?"; params.append(category)
+    return [r[0] for r in conn.execute(q + f" ORDER BY {column}", params)]
+
+def fetch_feed(conn, where, params, cursor=None, limit=FEED_PAGE_SIZE):
+    """
+    Keyset sayfalama: (opportunity_score DESC, ilan_id ASC) sırasında `cursor`dan
+    sonraki `limit` ilan. Sonraki sayfa olup olmadığını anlamak için bir fazla çekilir.
+    """
+    q = LISTING_QUERY + f" WHERE {where} AND decision_label IN ({','.join('?' * len(FEED_LABELS))})"
+    p = list(params) + FEED_LABELS
+    if cursor is not None:
+        q += " AND (opportunity_score < ? OR (opportunity_score = ? AND ilan_id > ?))"
+        p += [cursor[0], cursor[0], cursor[1]]
+    q += " ORDER BY opportunity_score DESC, ilan_id ASC LIMIT ?"
+    df = pd.read_sql(q, conn, params=p + [limit + 1])
+    return df.head(limit), len(df) > limit
+
+def fetch_comparables(conn, ids):
+    """{ilan_id: [emsal, ...]}: botun karar anında bulduğu emsal ilanlar (sadece bu sayfa)."""
+    if not ids or conn.execute("PRAGMA user_version").fetchone()[0] < COMPARABLES_SCHEMA_VERSION: return {}
+    rows = conn.execute(f"SELECT ilan_id, comparables FROM ilan WHERE comparables IS NOT NULL "
+                        f"AND ilan_id IN ({','.join('?' * len(ids))})", ids).fetchall()
+    return {i: json.loads(c) for i, c in rows}
+
+def load_data():
+    if not os.path.exists(DB_NAME):
+        return pd.DataFrame()
+    try:
+        return get_loader().load(get_connection())
     except Exception as e:
         st.error(f"Veritabanı okuma hatası: {e}")
         return pd.DataFrame()
-    finally:
-        conn.close()
 
 # --- MOCK DATA GENERATOR (Eğer DB boşsa UI'yi görmek için) ---
 def generate_mock_data():
@@ -105,30 +202,80 @@ def generate_mock_data():
     ]
     return pd.DataFrame(data)
 
+@st.cache_resource
+def get_mock_connection():
+    """Mock veriyi bellek içi SQLite'a koyar; arayüz gerçek DB ile aynı sorgularla çalışır."""
+    df = generate_mock_data().assign(
+        tier=None, cluster_key="generic", first_seen=None, last_seen=None, initial_price=None,
+        explanation=None, aktif_mi=1, updated_at=0.0)
+    conn = sqlite3.connect(":memory:", check_same_thread=False)
+    df.to_sql("ilan", conn, index=False)
+    return conn
+
 # --- UI BİLEŞENLERİ ---
 
-def render_pulse_metrics(df):
+def summary_scope(category, brand):
+    """Sidebar seçimine karşılık gelen market_summary satırları için koşul."""
+    if brand != "Tümü":
+        where, params = "scope = 'brand' AND key = ?", [brand]
+        if category != "Tümü":
+            where += " AND category = ?"; params.append(category)
+        return where, params
+    if category != "Tümü": return "scope = 'category' AND category = ?", [category]
+    return "scope = 'all'", []
+
+def read_market_summary(conn, category, brand, limit=2):
+    """
+    Botun döngü sonunda yazdığı özetten son `limit` anlık görüntü (yeniden eskiye).
+    Marka tüm kategorilerde seçiliyse satırlar toplanır. Özet yoksa None.
+    """
+    if conn.execute("PRAGMA user_version").fetchone()[0] < SUMMARY_SCHEMA_VERSION: return None
+    where, params = summary_scope(category, brand)
+    rows = conn.execute(f"""
+        SELECT ts, SUM(n_active), SUM(n_gem), SUM(n_good), SUM(n_spec),
+               SUM(avg_velocity * n_active) / SUM(n_active)
+        FROM market_summary
+        WHERE {where} AND ts IN (SELECT DISTINCT ts FROM market_summary ORDER BY ts DESC LIMIT ?)
+        GROUP BY ts ORDER BY ts DESC
+    """, params + [limit]).fetchall()
+    return rows or None
+
+def render_pulse_metrics(conn, where, params, category="Tümü", brand="Tümü"):
     """Katman 1: Piyasa Nabzı (Pulse Screen)"""
-    if df.empty: return
+    # Önce botun özet tablosu (birkaç satır); yoksa (eski DB / mock) canlı aggregate
+    snapshots = read_market_summary(conn, category, brand)
+    if snapshots:
+        ts, total, gem_count, deal_count, spec_count, avg_velocity = snapshots[0]
+        prev = snapshots[1] if len(snapshots) > 1 else None
+    else:
+        total, gem_count, deal_count, spec_count, avg_velocity = conn.execute(f"""
+            SELECT COUNT(*),
+                   COALESCE(SUM(decision_label = '💎 HIDDEN GEM'), 0),
+                   COALESCE(SUM(decision_label = '✅ GOOD DEAL'), 0),
+                   COALESCE(SUM(decision_label = '🎲 SPECULATIVE'), 0),
+                   AVG(hourly_velocity)
+            FROM ilan WHERE {where}
+        """, params).fetchone()
+        ts = prev = None
+    if not total: return
     
     col1, col2, col3, col4 = st.columns(4)
     
-    gem_count = len(df[df['decision_label'] == '💎 HIDDEN GEM'])
-    deal_count = len(df[df['decision_label'] == '✅ GOOD DEAL'])
-    spec_count = len(df[df['decision_label'] == '🎲 SPECULATIVE'])
-    
     # Piyasa Ateşi (Son 24 saatteki ortalama velocity)
-    avg_velocity = df['hourly_velocity'].mean() * 100 # Yüzdeye çevir
+    avg_velocity = (avg_velocity or 0.0) * 100 # Yüzdeye çevir
     market_mood = "Sakin"
     if avg_velocity > 1.0: market_mood = "🔥 Yanıyor"
     elif avg_velocity > 0.5: market_mood = "🌊 Hareketli"
     
-    col1.metric("💎 Gizli Cevherler", gem_count, help="Kaçırılmayacak fırsatlar")
-    col2.metric("✅ İyi Fiyatlar", deal_count, help="Makul alım fırsatları")
-    col3.metric("🎲 Spekülatif", spec_count, help="Yüksek risk / Yüksek ödül")
+    # Önceki anlık görüntüye göre değişim (özet tablosundan, bedava)
+    delta = lambda i, cur: None if prev is None else int(cur - (prev[i] or 0))
+    col1.metric("💎 Gizli Cevherler", gem_count, delta(2, gem_count), help="Kaçırılmayacak fırsatlar")
+    col2.metric("✅ İyi Fiyatlar", deal_count, delta(3, deal_count), help="Makul alım fırsatları")
+    col3.metric("🎲 Spekülatif", spec_count, delta(4, spec_count), help="Yüksek risk / Yüksek ödül")
     col4.metric("🌡️ Piyasa Ateşi", market_mood, f"{avg_velocity:.2f}% / saat")
+    if ts: st.caption(f"Özet: {datetime.fromtimestamp(ts):%d.%m %H:%M} · {total:,} aktif ilan")
 
-def render_opportunity_card(row):
+def render_opportunity_card(row, comparables=None):
     """Katman 2 & 3: Akıllı İlan Kartı"""
     
     # CSS Sınıfı Belirleme
@@ -142,11 +289,14 @@ def render_opportunity_card(row):
         border_class = "border-spec"
         text_class = "text-spec"
     
-    # AI Yorumu Oluşturma (Eğer DB'de yoksa simüle et)
-    # V11'de bu 'explanation' kolonunda geliyor.
-    ai_reason = f"Fiyat piyasa medyanının altında."
-    if row['opportunity_score'] > 90: ai_reason = "Fiyat mükemmel ve marka güvenilirliği en üst seviyede."
-    elif "SPECULATIVE" in label: ai_reason = "Fiyat çok düşük ancak risk bayrakları var (Volatilite/Risk)."
+    # AI Yorumu: V11'de 'explanation' kolonunda geliyor, yoksa simüle et
+    ai_reason = row.get('explanation')
+    if not isinstance(ai_reason, str) or not ai_reason:
+        ai_reason = "Fiyat piyasa medyanının altında."
+        if row['opportunity_score'] > 90: ai_reason = "Fiyat mükemmel ve marka güvenilirliği en üst seviyede."
+        elif "SPECULATIVE" in label: ai_reason = "Fiyat çok düşük ancak risk bayrakları var (Volatilite/Risk)."
+    else:
+        ai_reason = ai_reason.capitalize() + "."
     
     # HTML Kart
     card_html = f"""
@@ -179,6 +329,12 @@ def render_opportunity_card(row):
                 st.success("Temiz (Risk Yok)")
             else:
                 st.warning(f"{flags}")
+
+        if comparables:
+            st.write("**🔎 Emsal İlanlar:**")
+            for c in comparables:
+                st.markdown(f"- [{c['baslik']}]({c['ilan_url']}) — {c['fiyat_norm']:,.0f} TL "
+                            f"<span style='color:#888'>(benzerlik %{c['sim'] * 100:.0f})</span>", unsafe_allow_html=True)
         
         # Geri Bildirim Butonları
         fb_col1, fb_col2, _ = st.columns([1, 1, 4])
@@ -189,87 +345,250 @@ def render_opportunity_card(row):
             if st.button("👎 Hatalı", key=f"down_{row['ilan_id']}"):
                 st.toast("Geri bildirim alındı: Threshold ayarlanacak.")
 
-def render_analyst_mode(df):
-    """Katman 4: Analist Modu (Detaylı Veriler)"""
-    st.markdown("---")
-    st.subheader("🧪 Analist Laboratuvarı")
-    
-    tab1, tab2 = st.tabs(["📊 Dağılım", "📄 Ham Veri"])
-    
-    with tab1:
-        # Fiyat vs Skor Dağılımı
+def stratified_sample(df, n, keep=RARE_LABELS):
+    """
+    Karar etiketine göre tabakalı örneklem: nadir etiketler (keep) tamamen kalır,
+    kalan bütçe diğer etiketlere oranlarıyla dağıtılır. Sabit seed: yeniden
+    çizimde noktalar zıplamaz.
+    """
+    if len(df) <= n: return df
+    # groupby NaN anahtarlı satırları atar: puanlanmamış ilanlar da kendi tabakasına girsin
+    labels = df['decision_label'].fillna(UNSCORED_LABEL)
+    rare = df[labels.isin(keep)]
+    rest = df[~labels.isin(keep)]
+    frac = max(n - len(rare), 0) / max(len(rest), 1)
+    sampled = rest.groupby(labels[rest.index], group_keys=False).sample(frac=min(frac, 1.0), random_state=0)
+    return pd.concat([rare, sampled])
+
+def render_distribution(df):
+    """Fiyat / Skor dağılımı: boyuta göre SVG → WebGL → 2-B yoğunluk"""
+    if df.empty:
+        st.info("Gösterilecek veri yok.")
+        return
+    n = len(df)
+    # NULL etiket sıralamayı (sorted) bozar ve grafikte kaybolur
+    df = df.assign(decision_label=df['decision_label'].fillna(UNSCORED_LABEL))
+    if n > AGGREGATE_THRESHOLD:
+        # Her etiket için ayrı 2-B histogram; binler sunucuda sayılır, tarayıcıya sadece sayılar gider
+        labels = sorted(df['decision_label'].unique())
+        x_edges = np.histogram_bin_edges(df['fiyat_norm'].dropna(), bins=60)
+        y_edges = np.linspace(0, 100, 26)
+        fig = make_subplots(rows=1, cols=len(labels), shared_yaxes=True, subplot_titles=labels)
+        for col, label in enumerate(labels, start=1):
+            pts = df[df['decision_label'] == label].dropna(subset=['fiyat_norm'])
+            counts, _, _ = np.histogram2d(pts['fiyat_norm'], pts['opportunity_score'], bins=[x_edges, y_edges])
+            fig.add_trace(go.Heatmap(
+                x=(x_edges[:-1] + x_edges[1:]) / 2, y=(y_edges[:-1] + y_edges[1:]) / 2,
+                z=np.where(counts.T > 0, counts.T, np.nan), coloraxis="coloraxis", name=label
+            ), row=1, col=col)
+            # Nadir fırsatlar yoğunlukta kaybolmasın: üstüne nokta olarak bindir
+            if label in RARE_LABELS:
+                fig.add_trace(go.Scattergl(
+                    x=pts['fiyat_norm'], y=pts['opportunity_score'], mode="markers", name=label,
+                    marker=dict(color=LABEL_COLORS.get(label), size=5), text=pts['baslik']
+                ), row=1, col=col)
+        fig.update_layout(title=f"Fiyat / Skor Yoğunluğu ({n:,} ilan)", coloraxis=dict(colorscale="Viridis"))
+        st.caption(f"{n:,} ilan: nokta yerine yoğunluk gösteriliyor.")
+    else:
+        plot_df = stratified_sample(df, SCATTER_SAMPLE) if n > WEBGL_THRESHOLD else df
         fig = px.scatter(
-            df, 
+            plot_df, 
             x="fiyat_norm", 
             y="opportunity_score", 
             color="decision_label",
             hover_data=["baslik", "brand"],
             title="Fiyat / Skor Dağılımı",
-            color_discrete_map={
-                "💎 HIDDEN GEM": "#00b4d8",
-                "✅ GOOD DEAL": "#2a9d8f",
-                "🎲 SPECULATIVE": "#e9c46a",
-                "NEUTRAL": "#888888"
-            }
+            color_discrete_map=LABEL_COLORS,
+            render_mode="webgl" if n > WEBGL_THRESHOLD else "svg"
         )
-        st.plotly_chart(fig, use_container_width=True)
+        if len(plot_df) < n:
+            st.caption(f"{n:,} ilandan {len(plot_df):,} tabakalı örnek (tüm HIDDEN GEM'ler dahil).")
+    st.plotly_chart(fig, use_container_width=True)
+
+def render_raw_data(conn, where, params):
+    """Ham veri: SQL'den sayfa sayfa (LIMIT/OFFSET, idx_ilan_feed sırası)"""
+    total = conn.execute(f"SELECT COUNT(*) FROM ilan WHERE {where}", params).fetchone()[0]
+    pages = max((total + RAW_PAGE_SIZE - 1) // RAW_PAGE_SIZE, 1)
+    page = st.number_input(f"Sayfa (toplam {pages}, {total:,} ilan)", min_value=1, max_value=pages, value=1)
+    df = pd.read_sql(
+        LISTING_QUERY + f" WHERE {where} ORDER BY opportunity_score DESC, ilan_id ASC LIMIT ? OFFSET ?",
+        conn, params=list(params) + [RAW_PAGE_SIZE, (page - 1) * RAW_PAGE_SIZE]
+    )
+    st.dataframe(df)
+
+def render_trend(conn, category, brand):
+    """Özet tablosunun zaman serisi: karar sayıları ve ortalama hız"""
+    snapshots = read_market_summary(conn, category, brand, limit=500)
+    if not snapshots:
+        st.info("Trend için botun piyasa özeti henüz yok.")
+        return
+    trend = pd.DataFrame(snapshots, columns=["ts", "Aktif", "💎 HIDDEN GEM", "✅ GOOD DEAL", "🎲 SPECULATIVE", "Hız"])
+    trend["ts"] = pd.to_datetime(trend["ts"], unit="s")
+    trend = trend.set_index("ts").sort_index()
+    st.line_chart(trend[["💎 HIDDEN GEM", "✅ GOOD DEAL", "🎲 SPECULATIVE"]])
+    st.line_chart(trend[["Hız"]] * 100)
+
+def archive_days(table="ilan"):
+    """Arşivdeki gün bölümleri (sadece dizin listesi, dosyalar okunmaz)"""
+    base = os.path.join(ARCHIVE_DIR, table)
+    if not os.path.isdir(base): return []
+    return sorted(d[3:] for d in os.listdir(base) if d.startswith("dt="))
+
+@st.cache_data(ttl=600, show_spinner="Arşiv okunuyor...")
+def read_archive(table, since, until):
+    """Gün aralığındaki arşiv bölümlerini okur; sıcak DB'ye hiç dokunmaz."""
+    frames = []
+    for day in archive_days(table):
+        if day < since or day > until: continue
+        folder = os.path.join(ARCHIVE_DIR, table, f"dt={day}")
+        for name in sorted(os.listdir(folder)):
+            if not name.endswith(".ndjson.gz"): continue
+            frames.append(pd.read_json(os.path.join(folder, name), lines=True, compression="gzip",
+                                       dtype={"ilan_id": str}, convert_dates=False))
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+def render_archive(category, brand):
+    """Arşivlenmiş (uzun süredir pasif) ilanlar: istek üzerine, seçilen gün aralığı"""
+    days = archive_days()
+    if not days:
+        st.info("Arşiv boş: bot henüz pasif ilan arşivlemedi.")
+        return
+    since, until = st.select_slider("Son görülme günü", options=days, value=(days[0], days[-1]))
+    if st.button("Arşivi sorgula"): st.session_state['archive_range'] = (since, until)
+    if st.session_state.get('archive_range') != (since, until): return
+
+    df = read_archive("ilan", since, until)
+    if category != "Tümü": df = df[df['category'] == category]
+    if brand != "Tümü": df = df[df['brand'] == brand]
+    st.caption(f"{len(df):,} arşiv ilanı ({since} – {until})")
+    if df.empty: return
+    st.dataframe(df.sort_values("last_seen", ascending=False).head(RAW_PAGE_SIZE))
+
+    ilan_id = st.selectbox("Fiyat geçmişi", df['ilan_id'].head(RAW_PAGE_SIZE),
+                           format_func=lambda i: f"{i} · {df.loc[df['ilan_id'] == i, 'baslik'].iloc[0]}")
+    history = read_archive("ilan_price_history", since, until)
+    if history.empty: return
+    history = history[history['ilan_id'] == ilan_id].sort_values("ts")
+    history["ts"] = pd.to_datetime(history["ts"], unit="s")
+    st.line_chart(history.set_index("ts")[["fiyat_norm"]])
+
+def render_analyst_mode(df, conn, where, params, category="Tümü", brand="Tümü"):
+    """Katman 4: Analist Modu (Detaylı Veriler)"""
+    st.markdown("---")
+    st.subheader("🧪 Analist Laboratuvarı")
+    
+    tab1, tab2, tab3, tab4 = st.tabs(["📊 Dağılım", "📄 Ham Veri", "📈 Trend", "🗄️ Arşiv"])
+    
+    with tab1:
+        render_distribution(df)
         
     with tab2:
-        st.dataframe(df)
+        render_raw_data(conn, where, params)
+
+    with tab3:
+        render_trend(conn, category, brand)
+
+    with tab4:
+        render_archive(category, brand)
+
+def render_feed(conn, where, params):
+    """Katman 2: Seçilmiş fırsatlar, sayfa sayfa (sadece mevcut sayfanın kartları çizilir)"""
+    # Filtre değişince ilk sayfaya dön; cursors: her sayfanın başlangıç anahtarı
+    state = st.session_state
+    if state.get('feed_filter') != (where, tuple(params)):
+        state['feed_filter'] = (where, tuple(params))
+        state['feed_cursors'] = [None]
+    cursors = state['feed_cursors']
+
+    page_df, has_next = fetch_feed(conn, where, params, cursors[-1])
+    if page_df.empty and len(cursors) == 1:
+        st.info("😴 Şu an piyasa sakin. Bakmaya değer bir anomali yok.")
+        return
+
+    comparables = fetch_comparables(conn, page_df['ilan_id'].tolist())
+
+    # Kartları 3 kolonlu ızgarada göster (Responsive)
+    cols = st.columns(3)
+    for idx, row in enumerate(page_df.to_dict('records')):
+        with cols[idx % 3]:
+            render_opportunity_card(row, comparables.get(row['ilan_id']))
+
+    nav_prev, nav_info, nav_next = st.columns([1, 2, 1])
+    if nav_prev.button("◀ Önceki", disabled=len(cursors) == 1):
+        cursors.pop()
+        st.rerun()
+    nav_info.caption(f"Sayfa {len(cursors)}")
+    if nav_next.button("Sonraki ▶", disabled=not has_next):
+        last = page_df.iloc[-1]
+        cursors.append((int(last['opportunity_score']), last['ilan_id']))
+        st.rerun()
+
+def render_engine_health(conn):
+    """Sidebar: Botun son döngü metrikleri (cycle_metrics)"""
+    if conn.execute("PRAGMA user_version").fetchone()[0] < METRICS_SCHEMA_VERSION: return
+    cycles = pd.read_sql(
+        "SELECT * FROM cycle_metrics ORDER BY id DESC LIMIT ?", conn, params=[HEALTH_CYCLES])
+    if cycles.empty: return
+
+    last = cycles.iloc[0]
+    with st.sidebar.expander("🩺 Motor Sağlığı", expanded=False):
+        age_min = (datetime.now().timestamp() - last['started_at'] - last['duration']) / 60
+        st.caption(f"Son döngü {age_min:.0f} dk önce ({'tam' if last['full'] else 'artımlı'} tarama)")
+        c1, c2 = st.columns(2)
+        c1.metric("Süre", f"{last['duration']:.1f} sn")
+        c2.metric("İlan / sn", f"{last['listings_per_sec'] or 0:.0f}")
+        hit = last['cache_hit_rate']
+        c1.metric("Önbellek", "-" if pd.isna(hit) else f"%{hit * 100:.0f}")
+        c2.metric("Bildirim kuyruğu", int(last['notify_pending'] or 0))
+
+        # Son döngünün aşama dağılımı ve döngü süresi trendi
+        stages = pd.Series(json.loads(last['stages'] or "{}"), name="sn").sort_values(ascending=False)
+        if not stages.empty: st.bar_chart(stages)
+        trend = cycles.assign(ts=pd.to_datetime(cycles['started_at'], unit="s")).set_index("ts")["duration"]
+        st.line_chart(trend.sort_index())
 
 # --- ANA UYGULAMA AKIŞI ---
 def main():
     # Sidebar: Filtreler ve Modlar
     st.sidebar.title("🧠 Cognitive Radar")
     
-    # Veri Yükleme
-    df = load_data()
-    if df.empty:
+    # Veri Kaynağı (DB yoksa mock veri aynı SQL yoluyla sunulur)
+    is_mock = not os.path.exists(DB_NAME)
+    if is_mock:
         st.sidebar.warning("Veritabanı boş veya bulunamadı. Mock veri gösteriliyor.")
-        df = generate_mock_data()
+        conn = get_mock_connection()
+    else:
+        conn = get_connection()
 
-    # Sidebar Filtreleri
-    categories = ["Tümü"] + list(df['category'].unique())
+    # Sidebar Filtreleri (seçenekler indeksten)
+    categories = ["Tümü"] + distinct_values(conn, 'category')
     selected_cat = st.sidebar.selectbox("Kategori", categories)
     
-    brands = ["Tümü"] + list(df['brand'].unique())
+    brands = ["Tümü"] + distinct_values(conn, 'brand', None if selected_cat == "Tümü" else selected_cat)
     selected_brand = st.sidebar.selectbox("Marka", brands)
     
     analyst_mode = st.sidebar.toggle("Analist Modu", value=False)
+    render_engine_health(conn)
     
-    # Filtreleme Mantığı
-    filtered_df = df.copy()
-    if selected_cat != "Tümü":
-        filtered_df = filtered_df[filtered_df['category'] == selected_cat]
-    if selected_brand != "Tümü":
-        filtered_df = filtered_df[filtered_df['brand'] == selected_brand]
+    # Filtreleme Mantığı: SQL'e itilir
+    where, params = build_filters(selected_cat, selected_brand)
 
     # --- KATMAN 1: PULSE (Nabız) ---
     st.title("Piyasa Bakışı")
-    render_pulse_metrics(filtered_df)
+    render_pulse_metrics(conn, where, params, selected_cat, selected_brand)
     st.markdown("---")
 
     # --- KATMAN 2: CURATED FEED (Seçilmiş Fırsatlar) ---
     st.subheader("🎯 Sizin İçin Seçilenler")
-    
-    # Sadece aksiyon alınabilir ilanları göster (Neutral'ı gizle)
-    actionable_df = filtered_df[filtered_df['decision_label'].isin(["💎 HIDDEN GEM", "✅ GOOD DEAL", "🎲 SPECULATIVE"])]
-    
-    if actionable_df.empty:
-        st.info("😴 Şu an piyasa sakin. Bakmaya değer bir anomali yok.")
-    else:
-        # İlanları Skor'a göre sırala (En yüksek en üstte)
-        actionable_df = actionable_df.sort_values(by="opportunity_score", ascending=False)
-        
-        # Kartları 3 kolonlu ızgarada göster (Responsive)
-        cols = st.columns(3)
-        for idx, (_, row) in enumerate(actionable_df.iterrows()):
-            with cols[idx % 3]:
-                render_opportunity_card(row)
+    render_feed(conn, where, params)
 
     # --- KATMAN 4: ANALİST MODU (Opsiyonel) ---
     if analyst_mode:
-        render_analyst_mode(filtered_df)
+        df = generate_mock_data() if is_mock else load_data()
+        if not df.empty:
+            if selected_cat != "Tümü": df = df[df['category'] == selected_cat]
+            if selected_brand != "Tümü": df = df[df['brand'] == selected_brand]
+        render_analyst_mode(df, conn, where, params, selected_cat, selected_brand)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,7 @@
+"""
+ProSearcher benchmark paketi (çevrimdışı, tekrarlanabilir).
+
+    python -m benchmarks.bench_pipeline      # taksonomi / DB / istatistik / karar
+    python -m benchmarks.bench_extractor     # HTML çıkarıcı
+    python -m benchmarks.bench_memory        # tarama döngüsü tepe RSS'i
+"""
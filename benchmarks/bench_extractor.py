@@ -0,0 +1,56 @@
+"""
+Mikro benchmark: ListingExtractor (SoupStrainer + strateji cache) vs düz BeautifulSoup.
+
+Kullanım: python benchmarks/bench_extractor.py [-n TEKRAR]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from bs4 import BeautifulSoup
+from ProSearcher_V11 import ConfigLoader, ListingExtractor, HTML_PARSER
+
+PAGES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "pages")
+
+
+def plain_extract(html, base_url):
+    # Eski yol: tüm sayfa ağacı + stratejileri sırayla dene
+    soup = BeautifulSoup(html, "html.parser")
+    ex = ListingExtractor()
+    for strat in ConfigLoader.get_selectors():
+        ads = [ad for ad in (ex._record(c, strat, base_url) for c in soup.select(strat["container"])) if ad]
+        if ads: return ads
+    return []
+
+
+def bench(fn, n):
+    best = float("inf")
+    for _ in range(n):
+        t = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - t)
+    return best, out
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("-n", type=int, default=20, help="Sayfa başına tekrar (en iyi süre raporlanır)")
+    args = ap.parse_args()
+
+    print(f"HTML parser: {HTML_PARSER}")
+    extractor = ListingExtractor()
+    for name in sorted(os.listdir(PAGES_DIR)):
+        with open(os.path.join(PAGES_DIR, name), encoding="utf-8") as f: html = f.read()
+        base = "https://www.sahibinden.com/"
+        t_plain, ads_plain = bench(lambda: plain_extract(html, base), args.n)
+        t_fast, ads_fast = bench(lambda: extractor.extract(html, base, target=name), args.n)
+        assert ads_fast == ads_plain, f"{name}: çıktılar farklı"
+        print(f"{name:28s} {len(html) / 1024:7.1f} KB  {len(ads_fast):3d} ilan  "
+              f"düz: {t_plain * 1000:7.2f} ms  hızlı: {t_fast * 1000:7.2f} ms  x{t_plain / t_fast:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""
+Bellek benchmark'ı: tek tam tarama döngüsünün tepe RSS artışı, sayfa sayısına göre.
+
+Sahte site (requests transport adapter'ı) her sayfayı istek anında seed'li
+sentetik ilanlardan, gerçek sayfa şablonuyla (~90 KB) üretir; ağa çıkılmaz.
+Tepe RSS (ru_maxrss) süreç boyunca sadece arttığından her ölçüm ayrı bir
+süreçte çalışır. Akan hatta döngünün geçici belleği sayfa sayısından
+bağımsızdır; kalan artış ilan başına kalıcı durumdur (istatistik önbelleği,
+SQLite sayfa önbelleği).
+
+Kullanım:
+    python -m benchmarks.bench_memory                          # 25, 100, 400 sayfa
+    python -m benchmarks.bench_memory --pages 50 500 --workers 2 -o bellek.json
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from urllib.parse import parse_qsl, urlparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import requests
+from requests.adapters import BaseAdapter
+
+from ProSearcher_V11 import BotEngineV11, Config
+from benchmarks.synthetic import ListingGenerator, load_taxonomy
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+TEMPLATE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "pages", "standard_list_20.html")
+BASE_URL = "https://bench.invalid/kategori"
+DEFAULT_PAGES = [25, 100, 400]
+
+
+def page_template(path=TEMPLATE_PATH):
+    """Gerçek sayfa şablonu: ilan listesinden önceki ve sonraki HTML (stil, menü, alt bilgi)."""
+    with open(path, encoding="utf-8") as f: html = f.read()
+    marker = '<div class="search-result-item'
+    last = html.rindex(marker)
+    end = html.index("</div></div>", last) + len("</div></div>")
+    return html[:html.index(marker)], html[end:]
+
+
+class SyntheticSite(BaseAdapter):
+    """pagingOffset'e göre sayfayı istek anında üretir; aynı seed -> aynı sayfa."""
+
+    def __init__(self, seed=0):
+        super().__init__()
+        self.seed = seed
+        self.taxonomy = load_taxonomy()
+        self.head, self.tail = page_template()
+
+    def render(self, offset):
+        gen = ListingGenerator(self.seed * 1_000_003 + offset, self.taxonomy)
+        items = []
+        for i, ad in enumerate(gen.listings(Config.PAGE_SIZE)):
+            ilan_id = 1_100_000_000 + offset + i
+            price = f"{ad['fiyat']:,.0f}".replace(",", ".") + (" USD" if ad["currency"] == "USD" else " TL")
+            items.append(
+                f'<div class="search-result-item classified" data-id="{ilan_id}"><div class="thumb">'
+                f'<img src="/img/{ilan_id}.jpg" alt=""></div><div class="info">'
+                f'<a class="classifiedTitle" href="/ilan/{ilan_id}/detay">{ad["baslik"]}</a>'
+                f'<span class="searchResultsPriceValue">{price}</span></div></div>')
+        return (self.head + "".join(items) + self.tail).encode("utf-8")
+
+    def send(self, request, **kwargs):
+        offset = int(dict(parse_qsl(urlparse(request.url).query)).get("pagingOffset", 0))
+        resp = requests.Response()
+        resp.status_code, resp.url, resp.request = 200, request.url, request
+        resp.encoding = "utf-8"
+        resp._content = self.render(offset)
+        return resp
+
+    def close(self): pass
+
+
+def peak_rss():
+    """Sürecin tepe RSS'i (bayt); Linux'ta ru_maxrss KB, macOS'ta bayt."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def measure(pages, workers, seed):
+    """Bu süreçte boş DB ile tek tam tarama döngüsü; ana sürecin tepe RSS artışı."""
+    Config.MAX_PAGES = pages
+    Config.PARSE_WORKERS = workers
+    Config.RATE_LIMIT_PER_SEC, Config.RATE_LIMIT_BURST = 1e9, 1e9
+    Config.DISCORD_WEBHOOK_URL = Config.METRICS_FILE = None
+    Config.METRICS_PORT = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        session = requests.Session()
+        session.mount("https://", SyntheticSite(seed))
+        bot = BotEngineV11(os.path.join(tmp, "bench.db"), base_url=BASE_URL, session=session)
+        try:
+            before = peak_rss()
+            t = time.perf_counter()
+            bot.run_cycle()
+            seconds = time.perf_counter() - t
+            growth = peak_rss() - before
+            listings = bot.db.conn.execute("SELECT COUNT(*) FROM ilan").fetchone()[0]
+        finally:
+            bot.close()
+    return {"pages": pages, "listings": listings, "workers": workers, "seconds": round(seconds, 3),
+            "rss_before_mb": round(before / 2**20, 1), "rss_growth_mb": round(growth / 2**20, 1),
+            "growth_kb_per_page": round(growth / 1024 / pages, 1)}
+
+
+def run_child(pages, workers, seed):
+    out = subprocess.run([sys.executable, "-m", "benchmarks.bench_memory", "--child", str(pages),
+                          "--workers", str(workers), "--seed", str(seed)],
+                         cwd=ROOT, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="ProSearcher tarama döngüsü tepe bellek benchmark'ı")
+    ap.add_argument("--pages", type=int, nargs="+", default=DEFAULT_PAGES, help="Döngü başına sayfa sayıları")
+    ap.add_argument("--workers", type=int, default=0, help="PARSE_WORKERS (worker süreçleri ölçüme girmez)")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("-o", "--output", help="Sonuç JSON dosyası (verilmezse stdout)")
+    ap.add_argument("--child", type=int, help=argparse.SUPPRESS) # Tek ölçüm (ayrı süreç)
+    args = ap.parse_args(argv)
+
+    logging.getLogger().setLevel(logging.WARNING) # Döngü logları ölçümü kirletmesin
+    if args.child:
+        print(json.dumps(measure(args.child, args.workers, args.seed)))
+        return 0
+
+    results = []
+    for n in args.pages:
+        print(f"[{n:,} sayfa] ölçülüyor...", file=sys.stderr)
+        r = run_child(n, args.workers, args.seed)
+        print(f"  {r['listings']:,} ilan  {r['seconds']:.1f} sn  tepe RSS +{r['rss_growth_mb']:.1f} MB "
+              f"({r['growth_kb_per_page']:.1f} KB/sayfa)", file=sys.stderr)
+        results.append(r)
+
+    report = {
+        "meta": {"seed": args.seed, "workers": args.workers, "python": platform.python_version(),
+                 "platform": platform.platform(), "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S")},
+        "results": results,
+    }
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f: f.write(text + "\n")
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,146 @@
+"""
+Puanlama hattı benchmark'ı: sentetik ilanlarla taksonomi, upsert, get_prices,
+robust istatistik ve karar motoru throughput'u. Tamamen çevrimdışı; her boyut
+geçici bir SQLite dosyasına yazılır.
+
+Kullanım:
+    python -m benchmarks.bench_pipeline                         # 1k, 10k, 100k
+    python -m benchmarks.bench_pipeline --sizes 1000 10000 -o sonuc.json
+    python -m benchmarks.bench_pipeline --update-baseline       # baseline'ı yenile
+
+Baseline dosyası varsa sonuçlar karşılaştırılır; ops/sn baseline'ın
+(1 - tolerans) katının altına düşen ölçüm regresyon sayılır ve çıkış kodu 1 olur.
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from ProSearcher_V11 import Config, DatabaseManager, DecisionEngine, Listing, MathEngine, TaxonomyEngine
+from benchmarks.synthetic import USD_RATE, generate
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines", "pipeline.json")
+DEFAULT_SIZES = [1_000, 10_000, 100_000]
+STATS_PROBES = 500  # get_prices / calc_robust_stats için örneklenen ilan sayısı
+
+
+def timed(fn, ops, repeat=1):
+    """En iyi süreyi ölçer: {'seconds', 'ops', 'ops_per_sec'}."""
+    best = float("inf")
+    for _ in range(repeat):
+        t = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t)
+    return {"seconds": round(best, 6), "ops": ops, "ops_per_sec": round(ops / best, 1) if best else None}
+
+
+def run_size(n, seed, repeat):
+    ads = [Listing(**ad) for ad in generate(n, seed)]
+    titles = [ad.baslik for ad in ads]
+    res = {}
+
+    TaxonomyEngine.compiled() # Derleme maliyeti ölçüme girmesin
+    res["taxonomy_analyze"] = timed(lambda: [TaxonomyEngine.analyze(t) for t in titles], n, repeat)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DatabaseManager(os.path.join(tmp, "bench.db"))
+        try:
+            # Üretimdeki gibi sayfa sayfa (PAGE_SIZE) upsert; tekrar edilemez (durum değişir)
+            pages = [ads[i:i + Config.PAGE_SIZE] for i in range(0, n, Config.PAGE_SIZE)]
+            res["db_upsert"] = timed(lambda: [db.upsert_many(p) for p in pages], n)
+            # Tekil upsert yolu (aynı ilanlar -> güncelleme dalı), boyuttan bağımsız sabit örneklem
+            sample = ads[:min(n, 1000)]
+            res["db_upsert_single"] = timed(lambda: [db.upsert(ad) for ad in sample], len(sample))
+
+            rng = random.Random(seed)
+            metas = TaxonomyEngine.analyze_many(t for t in rng.sample(titles, min(n, STATS_PROBES)))
+            probes = [(m.category, m.brand, m.cluster_key) for m in metas]
+            res["get_prices"] = timed(lambda: [db.get_prices(*p) for p in probes], len(probes), repeat)
+            price_lists = [db.get_prices(*p) for p in probes]
+            res["calc_robust_stats"] = timed(
+                lambda: [MathEngine.calc_robust_stats(d) for d in price_lists], len(price_lists), repeat)
+
+            # Karar motoru: istatistikler StatsCache'ten, ilanlar yeni görülmüş gibi
+            engine = DecisionEngine(db)
+            db.stats.rebuild()
+            inputs = [(meta, ad.fiyat * (USD_RATE if ad.currency == "USD" else 1.0))
+                      for ad, meta in zip(ads, TaxonomyEngine.analyze_many(titles))]
+            res["decision_evaluate"] = timed(
+                lambda: [engine.evaluate(meta, price, 0.0, 0.0, None) for meta, price in inputs], n, repeat)
+        finally:
+            db.conn.close()
+    return res
+
+
+def compare(results, baseline, tolerance):
+    """Regresyonları [(boyut, ölçüm, şimdi, baseline), ...] olarak döndürür."""
+    regressions = []
+    for size, benches in results.items():
+        for name, cur in benches.items():
+            base = baseline.get(size, {}).get(name)
+            if not base or not base.get("ops_per_sec") or not cur["ops_per_sec"]: continue
+            if cur["ops_per_sec"] < base["ops_per_sec"] * (1 - tolerance):
+                regressions.append((size, name, cur["ops_per_sec"], base["ops_per_sec"]))
+    return regressions
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="ProSearcher puanlama hattı benchmark'ı")
+    ap.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="İlan sayıları")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--repeat", type=int, default=3, help="Durumsuz ölçümlerde tekrar (en iyi süre)")
+    ap.add_argument("-o", "--output", help="Sonuç JSON dosyası (verilmezse stdout)")
+    ap.add_argument("--baseline", default=BASELINE_PATH, help="Karşılaştırılacak baseline JSON")
+    ap.add_argument("--tolerance", type=float, default=0.25, help="İzin verilen yavaşlama oranı")
+    ap.add_argument("--update-baseline", action="store_true", help="Sonuçları baseline olarak yaz")
+    args = ap.parse_args(argv)
+
+    logging.getLogger().setLevel(logging.WARNING) # Göç / döngü logları ölçümü kirletmesin
+
+    results = {}
+    for n in args.sizes:
+        print(f"[{n:,} ilan] ölçülüyor...", file=sys.stderr)
+        results[str(n)] = run_size(n, args.seed, args.repeat)
+
+    report = {
+        "meta": {
+            "seed": args.seed,
+            "repeat": args.repeat,
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+    }
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f: f.write(text + "\n")
+    else:
+        print(text)
+
+    if args.update_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w", encoding="utf-8") as f: f.write(text + "\n")
+        print(f"Baseline güncellendi: {args.baseline}", file=sys.stderr)
+        return 0
+
+    if not os.path.exists(args.baseline): return 0
+    with open(args.baseline, encoding="utf-8") as f: baseline = json.load(f)["results"]
+    regressions = compare(results, baseline, args.tolerance)
+    for size, name, cur, base in regressions:
+        print(f"REGRESYON {name} @ {size}: {cur:,.0f} ops/sn (baseline {base:,.0f})", file=sys.stderr)
+    if not regressions: print("Baseline'a göre regresyon yok.", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
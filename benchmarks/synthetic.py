@@ -0,0 +1,101 @@
+"""
+Seed'li sentetik ilan üreticisi.
+
+Başlıklar rules.json taksonomisinden kurulur: her kategori regex'inden bir
+anahtar kelime, marka eşanlamlısı ve (çoğunlukla) dominant spec değeri.
+Fiyatlar küme (kategori + marka + spec) başına log-normal dağılır; küçük bir
+oran ucuz outlier'dır ki karar motoru fırsat da görsün.
+"""
+import json
+import math
+import os
+import random
+import re
+
+RULES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "rules.json")
+
+# Hiçbir kategori/spec regex'ine takılmayan dolgu kelimeler
+FILLERS = ["temiz", "kutulu", "faturalı", "garantili", "az kullanılmış", "sıfır ayarında",
+           "acil", "takaslı", "orijinal", "sorunsuz", "hediyeli", "kargo dahil"]
+MODELS = ["pro", "x", "elite", "gaming", "ultra", "mini", "v2", "se"]
+
+# Kategori başına tipik fiyat (TL); listede olmayanlar için DEFAULT_BASE
+BASE_PRICES = {"Monitor": 6500, "Ekran Kartı": 18000, "Mouse": 1200, "Klavye": 1800, "SSD": 2200}
+DEFAULT_BASE = 2500
+
+USD_RATE = 34.5       # ProSearcher upsert ile aynı basit kur
+USD_SHARE = 0.03      # USD fiyatlı ilan oranı
+OUTLIER_SHARE = 0.02  # Medianın çok altında fiyatlanan ilan oranı
+NO_CATEGORY_SHARE = 0.05
+
+
+def alternatives(pattern):
+    """'(a|b|m\\.2)' biçimindeki regex'ten düz metin alternatifleri çıkarır."""
+    body = pattern.strip()
+    if body.startswith("(") and body.endswith(")"): body = body[1:-1]
+    return [re.sub(r"\\(.)", r"\1", alt) for alt in body.split("|") if alt]
+
+
+def load_taxonomy(path=RULES_PATH):
+    with open(path, encoding="utf-8") as f: return json.load(f)["TAXONOMY"]
+
+
+class ListingGenerator:
+    """Aynı seed + taksonomi -> aynı ilan dizisi."""
+
+    def __init__(self, seed=0, taxonomy=None):
+        self.rng = random.Random(seed)
+        tax = taxonomy or load_taxonomy()
+        self.categories = []
+        for cat, det in tax["CATEGORIES"].items():
+            spec = det.get("dominant_spec")
+            spec_values = alternatives(tax["SPECS"][spec]["regex"]) if spec else []
+            # Spec değeriyle aynı olan anahtar kelimeler atılır (SSD: nvme/sata); kümeyi spec seçimi belirler
+            keywords = [k for k in alternatives(det["regex"]) if k not in spec_values]
+            self.categories.append((cat, keywords, spec_values))
+        self.brands = [(b, det["synonyms"]) for b, det in tax["BRANDS"].items()]
+        self._cluster_median = {}
+
+    def _median(self, cluster):
+        # Küme medianı ilk görüldüğünde sabitlenir (seed'e bağlı, sıraya bağlı)
+        if cluster not in self._cluster_median:
+            base = BASE_PRICES.get(cluster[0], DEFAULT_BASE)
+            self._cluster_median[cluster] = base * math.exp(self.rng.gauss(0, 0.35))
+        return self._cluster_median[cluster]
+
+    def listing(self, i):
+        rng = self.rng
+        if rng.random() < NO_CATEGORY_SHARE:
+            cat, keyword, spec = "Diğer", rng.choice(["kulaklık", "hoparlör", "mikrofon", "webcam"]), None
+        else:
+            cat, keywords, spec_values = rng.choice(self.categories)
+            keyword = rng.choice(keywords)
+            spec = rng.choice(spec_values) if spec_values and rng.random() < 0.7 else None
+
+        brand, synonyms = rng.choice(self.brands)
+        words = [rng.choice(synonyms)] if synonyms else []
+        words += [rng.choice(MODELS), keyword]
+        if spec: words.append(spec)
+        words += rng.sample(FILLERS, 2)
+        title = " ".join(words)
+        title = title[0].upper() + title[1:]
+
+        price = self._median((cat, brand, spec)) * math.exp(rng.gauss(0, 0.15))
+        if rng.random() < OUTLIER_SHARE: price *= rng.uniform(0.3, 0.6)
+        currency = "TL"
+        if rng.random() < USD_SHARE:
+            currency, price = "USD", price / USD_RATE
+        return {
+            "ilan_id": f"syn{i:07d}",
+            "baslik": title,
+            "fiyat": round(price, 2),
+            "currency": currency,
+            "ilan_url": f"https://www.sahibinden.com/ilan/syn{i:07d}/detay",
+        }
+
+    def listings(self, n):
+        return [self.listing(i) for i in range(n)]
+
+
+def generate(n, seed=0, taxonomy=None):
+    return ListingGenerator(seed, taxonomy).listings(n)
@@ -0,0 +1,109 @@
+import hashlib
+import json
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+PAGES = os.path.join(ROOT, "benchmarks", "pages")
+
+
+def canned_page(index):
+    """
+    benchmarks/pages sayfaları; sayfa başına farklı ilan id'leri
+    (1100000133 -> 11<sayfa>0000133), aksi halde tüm sayfalar aynı ilanları taşır.
+    """
+    name = "standard_list_50.html" if index % 2 == 0 else "standard_list_20.html"
+    with open(os.path.join(PAGES, name), "rb") as f: body = f.read()
+    return body.replace(b"110000", f"11{index}000".encode())
+
+
+class _Server:
+    """Yerel test sunucusu: isteklerin kaydı + yol başına sıradaki sabit yanıtlar."""
+
+    def __init__(self, handler):
+        self.requests = []     # (method, path, headers, body)
+        self.scripted = {}     # path -> [(status, headers, body), ...] normal yanıttan önce
+        self.lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args): pass
+
+            def _serve(self, method):
+                body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                with server.lock:
+                    server.requests.append((method, self.path, dict(self.headers), body))
+                    # Tam yol (sorgu dahil) ya da sadece yol için sıraya konmuş yanıt
+                    queued = server.scripted.get(self.path) or server.scripted.get(urlparse(self.path).path)
+                    reply = queued.pop(0) if queued else None
+                status, headers, data = reply or handler(self, body)
+                self.send_response(status)
+                for k, v in headers.items(): self.send_header(k, v)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self): self._serve("GET")
+            def do_POST(self): self._serve("POST")
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_port}"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def script(self, path, *replies):
+        with self.lock: self.scripted.setdefault(path, []).extend(replies)
+
+    def hits(self, path=None):
+        with self.lock:
+            return [r for r in self.requests if path is None or urlparse(r[1]).path == path]
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def _pages(request, body):
+    """/kategori?pagingOffset=N -> N / PAGE_SIZE'inci hazır sayfa; ETag ile 304."""
+    from ProSearcher_V11 import Config
+    offset = int(parse_qs(urlparse(request.path).query).get("pagingOffset", ["0"])[0])
+    page = canned_page(offset // Config.PAGE_SIZE)
+    etag = '"%s"' % hashlib.sha1(page).hexdigest()
+    if request.headers.get("If-None-Match") == etag: return 304, {"ETag": etag}, b""
+    return 200, {"Content-Type": "text/html; charset=utf-8", "ETag": etag}, page
+
+
+def _webhook(request, body):
+    return 204, {}, b""
+
+
+@pytest.fixture
+def page_server():
+    server = _Server(_pages)
+    yield server
+    server.close()
+
+
+@pytest.fixture
+def webhook_server():
+    server = _Server(_webhook)
+    server.posts = lambda: [json.loads(r[3]) for r in server.hits("/webhook") if r[0] == "POST"]
+    yield server
+    server.close()
+
+
+@pytest.fixture
+def bot_config(monkeypatch, tmp_path):
+    """Ağa ve canlı dosyalara dokunmayan, beklemesiz bot ayarları."""
+    from ProSearcher_V11 import Config
+    for name, value in {"RATE_LIMIT_PER_SEC": 1e6, "RATE_LIMIT_BURST": 1e6, "BACKOFF_BASE": 0.01,
+                        "DISCORD_WEBHOOK_URL": None, "CAPTURE_FILE": None, "METRICS_PORT": 0,
+                        "METRICS_FILE": None, "ARCHIVE_DIR": str(tmp_path / "archive"),
+                        "PARSE_WORKERS": 0}.items():
+        monkeypatch.setattr(Config, name, value)
+    return Config
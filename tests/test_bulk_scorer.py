@@ -0,0 +1,87 @@
+"""
+BulkScorer (NumPy, toplu) her ilan için DecisionEngine.evaluate ile aynı
+puanı, kararı, bayrakları ve açıklamayı üretmeli; evaluate'in None döndürdüğü
+(istatistiği yetersiz) ilanları atlamalı.
+"""
+import json
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+from ProSearcher_V11 import BulkScorer, DatabaseManager, DecisionEngine, Listing, TaxonomyEngine
+from benchmarks.synthetic import generate
+
+NOW = datetime(2026, 3, 1, 12, 0, 0)
+
+
+@pytest.fixture(scope="module")
+def db(tmp_path_factory):
+    db = DatabaseManager(str(tmp_path_factory.mktemp("db") / "test.db"))
+    ads = [Listing(**ad) for ad in generate(3000, seed=7)]
+    # İstatistiği yetersiz kategori: diğer SSD ilanları aşağıda pasife alınır, 3 aktif ilan kalır (< 5)
+    ads += [Listing(f"few{i}", "Zowie ssd nvme 1tb", 2000 + i, "TL", f"https://x/few{i}") for i in range(3)]
+    # MAD = 0 (hepsi aynı fiyat) ve uç z-score'lar: sigmoid taşma yolu
+    ads += [Listing(f"flat{i}", "Razer viper mouse kablosuz", 1500.0, "TL", f"https://x/flat{i}") for i in range(8)]
+    ads += [Listing("flat_low", "Razer viper mouse kablosuz", 1.0, "TL", "https://x/flat_low"),
+            Listing("flat_high", "Razer viper mouse kablosuz", 10 ** 7, "TL", "https://x/flat_high")]
+    for i in range(0, len(ads), 500): db.upsert_many(ads[i:i + 500])
+
+    rng = random.Random(7)
+    rows = db.conn.execute("SELECT ilan_id FROM ilan").fetchall()
+    updates = []
+    for r in rows:
+        # Taze (< 24 sa), normal ve eski (> 30 gün) ilanlar ve eşikler; hız: NULL, yok, makul, panik, eşikler
+        age = rng.choice([2, 100, 1000, 24, 720])
+        velocity = rng.choice([None, 0.0, 0.002, 0.2, -0.01, 0.001, 0.05, 0.10])
+        updates.append(((NOW - timedelta(hours=age)).isoformat(" "), velocity, r['ilan_id']))
+    with db.conn:
+        db.conn.executemany("UPDATE ilan SET first_seen=?, hourly_velocity=? WHERE ilan_id=?", updates)
+        # Eski şema satırları: tier ve tekrar grubu NULL
+        db.conn.execute("UPDATE ilan SET tier=NULL, dup_group_id=NULL WHERE rowid % 7 = 0")
+        db.conn.execute("UPDATE ilan SET aktif_mi=0 WHERE category='SSD' AND ilan_id NOT LIKE 'few%'")
+        # Fiyatı olmayan ilan hiçbir yolda puanlanmaz
+        db.conn.execute("UPDATE ilan SET fiyat_norm=NULL WHERE rowid % 97 = 0")
+    yield db
+    db.conn.close()
+
+
+def scalar(db, rows):
+    """Satır satır DecisionEngine.evaluate -> {ilan_id: rows_for_db satırı}."""
+    engine = DecisionEngine(db)
+    titles = dict(db.conn.execute("SELECT ilan_id, baslik FROM ilan").fetchall())
+    out = {}
+    for r in rows:
+        meta = TaxonomyEngine.analyze(titles[r['ilan_id']])
+        hours = (NOW - datetime.fromisoformat(r['first_seen'])).total_seconds() / 3600
+        res = engine.evaluate(meta, r['fiyat_norm'], hours, r['hourly_velocity'] or 0.0, None)
+        if res: out[r['ilan_id']] = (res.score, res.decision, json.dumps(res.flags), res.explanation, r['ilan_id'])
+    return out
+
+
+def test_bulk_matches_scalar_evaluate(db):
+    scorer = BulkScorer(db)
+    rows = scorer.load()
+    ids, res = scorer.score(rows, now=NOW)
+    bulk = {row[-1]: row for row in BulkScorer.rows_for_db(ids, res)}
+    expected = scalar(db, rows)
+
+    assert bulk.keys() == expected.keys()
+    for ilan_id, row in expected.items():
+        assert bulk[ilan_id] == row, ilan_id
+
+
+def test_fixture_covers_edge_cases(db):
+    scorer = BulkScorer(db)
+    rows = scorer.load()
+    ids, res = scorer.score(rows, now=NOW)
+    scored = set(ids)
+    loaded = {r['ilan_id'] for r in rows}
+    # Yetersiz istatistik atlanır, NULL fiyat hiç yüklenmez
+    assert not {"few0", "few1", "few2"} & scored
+    assert {"few0", "few1", "few2"} <= loaded
+    assert db.conn.execute("SELECT COUNT(*) FROM ilan WHERE fiyat_norm IS NULL").fetchone()[0] > 0
+    assert any(r['hourly_velocity'] is None for r in rows)
+    decisions = {str(d) for d in res['decision']}
+    assert {"NEUTRAL", "✅ GOOD DEAL"} <= decisions
+    assert res['outlier'].any() and res['panic'].any() and res['mismatch'].any()
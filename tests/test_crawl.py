@@ -0,0 +1,77 @@
+"""
+Tarama hattı uçtan uca, hazır sayfaları (benchmarks/pages) sunan yerel HTTP
+sunucusuna karşı: fetch -> parse -> yazma -> puanlama; ikinci (artımlı)
+döngüde ETag/304 sayfa önbelleği; 429'da PageFetcher geri çekilmesi.
+"""
+import pytest
+
+from ProSearcher_V11 import BotEngineV11, PageFetcher
+
+RETRY_LATER = (429, {"Retry-After": "0"}, b"")
+
+
+@pytest.fixture
+def bot(bot_config, page_server, tmp_path):
+    bot = BotEngineV11(db_name=str(tmp_path / "crawl.db"), base_url=page_server.url + "/kategori")
+    yield bot
+    bot.close()
+
+
+def test_cycle_inserts_and_evaluates(bot, page_server, bot_config):
+    page_server.script("/kategori?pagingOffset=40", RETRY_LATER)
+    evaluated = bot.run_cycle(cycle_index=0)
+
+    crawl = bot.last_crawl
+    assert crawl['full'] and crawl['complete']
+    assert crawl['pages'] == bot_config.MAX_PAGES and crawl['skipped'] == 0
+    db = bot.db.conn
+    assert db.execute("SELECT COUNT(*) FROM ilan WHERE aktif_mi=1").fetchone()[0] == len(crawl['seen']) == 190
+    assert evaluated > 0
+    assert db.execute("SELECT COUNT(*) FROM ilan WHERE decision_label IS NOT NULL").fetchone()[0] == evaluated
+    assert db.execute("SELECT COUNT(*) FROM page_cache WHERE etag IS NOT NULL").fetchone()[0] == bot_config.MAX_PAGES
+    # 429 alan sayfa tekrar denendi, döngü eksik sayılmadı
+    paths = [r[1] for r in page_server.hits("/kategori")]
+    assert len(paths) == bot_config.MAX_PAGES + 1 and paths.count("/kategori?pagingOffset=40") == 2
+    assert bot.metrics.cycle_count('http_responses_total', status=200) == bot_config.MAX_PAGES
+
+
+def test_second_cycle_uses_page_cache(bot, page_server, bot_config):
+    bot.run_cycle(cycle_index=0)
+    first = len(page_server.hits("/kategori"))
+
+    # Artımlı döngü: koşullu istek, ilk sayfa 304 -> parse yok, akış durur
+    assert bot.run_cycle(cycle_index=1) == 0
+    crawl = bot.last_crawl
+    assert not crawl['full']
+    assert crawl['pages'] == 1 and crawl['skipped'] == 1 and crawl['complete']
+    # Uçuştaki en fazla FETCH_CONCURRENCY istek; hepsi koşullu, ilk sayfa 304
+    requests = page_server.hits("/kategori")[first:]
+    assert 1 <= len(requests) <= bot_config.FETCH_CONCURRENCY
+    assert "/kategori" in [r[1] for r in requests] and all("If-None-Match" in r[2] for r in requests)
+    assert bot.metrics.cycle_count('http_responses_total', status=304) == 1
+    assert bot.metrics.cycle_count('page_cache_total', result='hit') == 1
+    # Önbellekteki sayfanın ilanları görülmüş sayılır
+    assert len(crawl['seen']) == 50
+
+
+def test_fetcher_backs_off_on_429(bot_config, page_server, monkeypatch):
+    delays = []
+    backoff = PageFetcher.backoff_delay
+    monkeypatch.setattr(PageFetcher, "backoff_delay", staticmethod(
+        lambda attempt, resp=None: delays.append((attempt, resp.status_code)) or 0))
+    page_server.script("/kategori", (429, {"Retry-After": "3"}, b""), (429, {"Retry-After": "3"}, b""))
+    fetcher = PageFetcher(concurrency=1)
+
+    resp = fetcher.fetch(page_server.url + "/kategori")
+    assert resp.status_code == 200
+    assert delays == [(0, 429), (1, 429)]
+    assert len(page_server.hits("/kategori")) == 3
+    # Retry-After üstel gecikmeden büyükse ona uyulur
+    first = page_server.hits("/kategori")[0]
+    assert first[2]["User-Agent"] != page_server.hits("/kategori")[1][2]["User-Agent"]
+    retry = type("Resp", (), {"headers": {"Retry-After": "3"}})()
+    assert 3 <= backoff(0, retry) <= bot_config.BACKOFF_MAX
+
+    # Deneme hakkı biterse son yanıt döner
+    page_server.script("/kategori", *[RETRY_LATER] * (bot_config.FETCH_MAX_RETRIES + 1))
+    assert fetcher.fetch(page_server.url + "/kategori").status_code == 429
@@ -0,0 +1,44 @@
+"""
+get_prices / StatsCache istatistik sorguları her seviyede kapsayan indeksle
+çalışmalı; ANALYZE istatistikleri planı başka bir indekse kaydırmamalı.
+"""
+import pytest
+
+from ProSearcher_V11 import DatabaseManager, Listing
+from benchmarks.synthetic import generate
+
+
+@pytest.fixture(scope="module")
+def db(tmp_path_factory):
+    db = DatabaseManager(str(tmp_path_factory.mktemp("db") / "test.db"))
+    ads = [Listing(**ad) for ad in generate(6000, seed=5)]
+    for i in range(0, len(ads), 500): db.upsert_many(ads[i:i + 500])
+    yield db
+    db.conn.close()
+
+
+def assert_covering(plans):
+    for level, detail in plans.items():
+        assert "USING COVERING INDEX idx_ilan_" in detail, f"{level}: {detail}"
+
+
+def test_stats_queries_use_covering_index(db):
+    assert_covering(db.check_indexes())
+
+
+def test_stats_queries_stay_covering_after_analyze(db, caplog):
+    # Pasif ilanlar aktif_mi'yi seçici yapar; eski filtre indeksi bu durumda seçiliyordu
+    with db.conn: db.conn.execute("UPDATE ilan SET aktif_mi=0 WHERE rowid % 3 = 0")
+    db.conn.execute("ANALYZE")
+    db.conn.commit()
+    assert_covering(db.check_indexes())
+    assert "kapsayan indeks kullanmıyor" not in caplog.text
+
+
+def test_check_indexes_warns_instead_of_failing(db, caplog, monkeypatch):
+    # Plan kapsayan indeks kullanmasa da açılış durmaz, sadece uyarı loglanır
+    monkeypatch.setattr(DatabaseManager, "_prices_query", staticmethod(
+        lambda category, brand=None, cluster_key=None: ("SELECT fiyat_norm FROM ilan NOT INDEXED WHERE category=?", [category])))
+    plans = db.check_indexes()
+    assert "USING COVERING INDEX" not in plans['category']
+    assert "category istatistik sorgusu kapsayan indeks kullanmıyor" in caplog.text
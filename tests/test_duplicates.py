@@ -0,0 +1,108 @@
+"""
+DuplicateIndex kova kayıtları ilanın sınıfı (kategori/marka/küme) değişince
+yeni kümeye taşınmalı; arşivlenen ilanın hiçbir kova kaydı geride kalmamalı.
+"""
+import copy
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+
+from ProSearcher_V11 import CompiledTaxonomy, ConfigLoader, DatabaseManager, Listing, MinHasher, TaxonomyEngine
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = DatabaseManager(str(tmp_path / "test.db"))
+    yield db
+    db.conn.close()
+
+
+def buckets(db, ilan_id):
+    return {tuple(r) for r in db.conn.execute("SELECT band, bucket FROM lsh_buckets WHERE ilan_id=?", (ilan_id,))}
+
+
+def expected(db, ilan_id):
+    """İmza + ilanın güncel sınıfından hesaplanan kova anahtarları."""
+    r = db.conn.execute("""
+        SELECT m.sig, i.category, i.brand, i.cluster_key FROM ilan_minhash m JOIN ilan i USING (ilan_id)
+        WHERE ilan_id=?""", (ilan_id,)).fetchone()
+    sig = np.frombuffer(r['sig'], dtype=np.uint32)[None, :]
+    keys = db.dups.hasher.band_keys(sig, [db.dups.salt(r['category'], r['brand'], r['cluster_key'])])
+    return set(enumerate(keys[0].tolist()))
+
+
+def test_class_change_on_upsert_moves_buckets(db):
+    db.upsert_many([Listing("a1", "Asus rog strix 27 inch monitör 144hz", 9000, "TL", "https://x/a1")])
+    before = buckets(db, "a1")
+    assert before == expected(db, "a1")
+    # Aynı ilan, başlığı güncellenmiş: marka ve küme değişir
+    db.upsert_many([Listing("a1", "Msi optix 27 inch monitör 165hz", 9000, "TL", "https://x/a1")])
+    after = buckets(db, "a1")
+    assert after == expected(db, "a1")
+    assert not before & after
+
+
+def test_class_change_on_recluster_moves_buckets(db):
+    new = ConfigLoader.get_taxonomy()
+    old = copy.deepcopy(new)
+    old['BRANDS']['Logitech']['synonyms'] = ['yok-boyle-marka']
+    # Logitech eşanlamlısı yokken yazılmış ilan: Unknown / generic
+    stale_rules = CompiledTaxonomy(old)
+    with patch.object(TaxonomyEngine, "compiled", classmethod(lambda cls: stale_rules)):
+        db.upsert_many([Listing("r1", "Logitech g pro x superlight mouse", 3000, "TL", "https://x/r1")])
+    stale = buckets(db, "r1")
+    assert db.conn.execute("SELECT brand FROM ilan WHERE ilan_id='r1'").fetchone()[0] == 'Unknown'
+    assert db.recluster(old, new) == 1
+    assert buckets(db, "r1") == expected(db, "r1")
+    assert not stale & buckets(db, "r1")
+
+
+def test_remove_after_class_change_leaves_no_buckets(db):
+    db.upsert_many([Listing("d1", "Samsung 980 pro ssd nvme 1tb", 2500, "TL", "https://x/d1")])
+    with db.conn: db.conn.execute("UPDATE ilan SET category='Diğer', cluster_key='generic' WHERE ilan_id='d1'")
+    with db.conn: db.dups.remove(["d1"])
+    assert not buckets(db, "d1")
+    assert db.conn.execute("SELECT COUNT(*) FROM ilan_minhash WHERE ilan_id='d1'").fetchone()[0] == 0
+
+
+def test_rebuild_buckets_drops_leaked_rows(db):
+    db.upsert_many([Listing(f"b{i}", f"Razer viper mouse kablosuz {i}", 1500, "TL", f"https://x/b{i}") for i in range(5)])
+    with db.conn:
+        db.conn.execute("INSERT INTO lsh_buckets VALUES (0, 12345, 'b0'), (1, 999, 'gone')")
+        db.dups.rebuild_buckets()
+    assert not buckets(db, "gone")
+    for i in range(5): assert buckets(db, f"b{i}") == expected(db, f"b{i}")
+
+
+def groups(db):
+    return dict(db.conn.execute("SELECT ilan_id, dup_group_id FROM ilan").fetchall())
+
+
+@pytest.mark.parametrize("batch", [
+    # Orijinalin fiyatı tekrar ilanla aynı batch'te değişir: aday güncel fiyatla karşılaştırılır
+    [("A", 1300), ("B", 1300)],
+    # Tekrar ilan önce gelir: orijinal henüz eski fiyatında (sıralı eklemede de grup açılır)
+    [("B", 1300), ("A", 1300)],
+    [("A", 1300), ("B", 1300), ("A", 1000), ("C", 1300)],
+])
+def test_batch_grouping_matches_sequential(tmp_path, batch):
+    title = "MSI RTX 3060 Ti Gaming X"
+    ads = [Listing(i, title, p, "TL", f"https://x/{i}") for i, p in batch]
+    dbs = [DatabaseManager(str(tmp_path / f"{name}.db")) for name in ("batch", "seq")]
+    for db in dbs: db.upsert(Listing("A", title, 1000, "TL", "https://x/A"))
+    dbs[0].upsert_many(ads)
+    for ad in ads: dbs[1].upsert(ad)
+    assert groups(dbs[0]) == groups(dbs[1])
+    for db in dbs: db.conn.close()
+
+
+def test_signatures_are_blocked(monkeypatch):
+    hasher = MinHasher()
+    titles = [f"Asus rog strix {i} monitör 144hz ekran" * (1 + i % 3) for i in range(50)]
+    whole = hasher.signatures(titles)
+    # Küçük bloklar (tek başlık da blok sınırını aşabilir) aynı imzaları vermeli
+    monkeypatch.setattr(MinHasher, "BLOCK", 64)
+    assert np.array_equal(hasher.signatures(titles), whole)
+    assert np.array_equal(np.array([hasher.signature(t) for t in titles]), whole)
+    assert hasher.signatures([]).shape == (0, hasher.num_perm)
@@ -0,0 +1,91 @@
+"""
+NotificationDispatcher, yerel sahte webhook'a karşı: mesaj başına en fazla
+10 embed, 429 retry_after ile tekrar, ilan/grup + karar cooldown'u ve
+yeniden başlatmada SQLite kuyruğunda bekleyenlerin gönderimi.
+"""
+import json
+import time
+
+import pytest
+
+from ProSearcher_V11 import DatabaseManager, NotificationDispatcher
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = DatabaseManager(str(tmp_path / "notify.db"))
+    yield db
+    db.conn.close()
+
+
+def embed(i):
+    return {"title": f"ilan {i}", "description": "x", "color": 1, "url": f"https://x/{i}"}
+
+
+def wait_sent(db, n, timeout=10):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if db.conn.execute("SELECT COUNT(*) FROM notification_queue WHERE sent_at IS NOT NULL").fetchone()[0] >= n:
+            return
+        time.sleep(0.02)
+    raise AssertionError(f"{n} bildirim {timeout} sn içinde gönderilmedi")
+
+
+def dispatcher(db, webhook_server):
+    return NotificationDispatcher(db, webhook_server.url + "/webhook")
+
+
+def test_batches_of_ten(db, webhook_server):
+    d = dispatcher(db, webhook_server)
+    for i in range(25): assert d.enqueue(f"id{i}", "✅ GOOD DEAL", embed(i))
+    d.start()
+    wait_sent(db, 25)
+    d.stop()
+    posts = webhook_server.posts()
+    assert [len(p["embeds"]) for p in posts] == [10, 10, 5]
+    assert [e["title"] for p in posts for e in p["embeds"]] == [f"ilan {i}" for i in range(25)]
+
+
+def test_429_is_retried_after_retry_after(db, webhook_server):
+    webhook_server.script("/webhook", (429, {"Content-Type": "application/json"},
+                                       json.dumps({"retry_after": 0.2, "global": False}).encode()))
+    d = dispatcher(db, webhook_server)
+    for i in range(3): d.enqueue(f"id{i}", "✅ GOOD DEAL", embed(i))
+    t = time.time()
+    d.start()
+    wait_sent(db, 3)
+    d.stop()
+    posts = webhook_server.posts()
+    # Aynı paket retry_after kadar beklenip tekrar gönderildi, kayıp ya da tekrar yok
+    assert len(posts) == 2 and posts[0] == posts[1]
+    assert len(posts[1]["embeds"]) == 3
+    assert time.time() - t >= 0.2
+
+
+def test_cooldown_dedupes_by_listing_group_and_decision(db, webhook_server):
+    d = dispatcher(db, webhook_server)
+    assert d.enqueue("a", "✅ GOOD DEAL", embed("a"))
+    assert not d.enqueue("a", "✅ GOOD DEAL", embed("a"))
+    # Tekrar ilan: farklı ilan, aynı grup
+    assert not d.enqueue("a2", "✅ GOOD DEAL", embed("a2"), group="a")
+    # Farklı karar ya da farklı grup ayrı bildirim
+    assert d.enqueue("a", "💎 HIDDEN GEM", embed("a"))
+    assert d.enqueue("b", "✅ GOOD DEAL", embed("b"))
+    # Cooldown geçmiş kayıt engellemez
+    with db.conn: db.conn.execute("UPDATE notification_queue SET created_at = created_at - 7 * 3600 WHERE ilan_id='b'")
+    assert d.enqueue("b", "✅ GOOD DEAL", embed("b"))
+    assert db.conn.execute("SELECT COUNT(*) FROM notification_queue").fetchone()[0] == 4
+
+
+def test_pending_rows_are_sent_after_restart(db, webhook_server):
+    # İlk süreç kuyruğa yazdı ama göndermeden kapandı
+    first = dispatcher(db, webhook_server)
+    for i in range(4): first.enqueue(f"id{i}", "✅ GOOD DEAL", embed(i))
+    with db.conn: db.conn.execute("UPDATE notification_queue SET sent_at=? WHERE ilan_id='id0'", (time.time(),))
+    assert not webhook_server.posts()
+
+    second = dispatcher(db, webhook_server)
+    second.start()
+    wait_sent(db, 4)
+    second.stop()
+    assert [e["title"] for p in webhook_server.posts() for e in p["embeds"]] == ["ilan 1", "ilan 2", "ilan 3"]
@@ -0,0 +1,42 @@
+"""
+PageParser: süreç havuzu (PARSE_WORKERS > 0, spawn) ve tek süreçli yol aynı
+hazır sayfalardan aynı sırayla aynı Listing / TaxonomyResult dizilerini üretmeli.
+"""
+import pytest
+
+from ProSearcher_V11 import Config, ListingExtractor, PageParser
+from conftest import canned_page
+
+
+def jobs():
+    # Farklı boyutlu sayfalar; bozuk/boş sayfa da havuzdan aynı şekilde dönmeli
+    pages = [canned_page(i) for i in range(7)] + [b"<html><body>bos</body></html>"]
+    return [(i, (content, "utf-8", f"http://127.0.0.1/kategori?pagingOffset={i * 20}", (None, 0)))
+            for i, content in enumerate(pages)]
+
+
+def parse(workers, chunk=None):
+    parser = PageParser(ListingExtractor(), workers=workers, chunk=chunk)
+    try:
+        out = list(parser.parse_iter(iter(jobs())))
+        # workers > 0 gerçekten spawn havuzundan geçti
+        assert (parser._pool is not None) == bool(workers)
+        if workers: assert parser._pool._mp_context.get_start_method() == "spawn"
+        return out
+    finally:
+        parser.close()
+
+
+@pytest.mark.parametrize("chunk", [1, 3])
+def test_pool_matches_in_process(monkeypatch, chunk):
+    monkeypatch.setattr(Config, "PARSE_WORKERS", 0)
+    serial = parse(0)
+    monkeypatch.setattr(Config, "PARSE_WORKERS", 2)
+    pooled = parse(Config.PARSE_WORKERS, chunk)
+
+    assert [k for k, _ in pooled] == [k for k, _ in serial] == list(range(8))
+    for (_, (name, ads, metas)), (_, (p_name, p_ads, p_metas)) in zip(serial, pooled):
+        assert p_name == name
+        assert p_ads == ads
+        assert p_metas == metas
+    assert sum(len(ads) for _, (_, ads, _) in serial) == 260
@@ -0,0 +1,52 @@
+"""
+Kayıt / tekrar oynatma: hazır sayfalara karşı CaptureRecorder ile kaydedilen
+döngüler ReplayAdapter üzerinden (Clock.freeze ile) oynatılınca her seferinde
+aynı CrawlReplayer digest'ini, canlı çalıştırmayla da aynı DB durumunu vermeli.
+"""
+import json
+
+import pytest
+
+from ProSearcher_V11 import BotEngineV11, CaptureRecorder, Clock, CrawlReplayer, main
+
+T0 = 1772366400.0 # 2026-03-01
+
+
+@pytest.fixture
+def capture(bot_config, page_server, tmp_path, monkeypatch):
+    """İki döngü kaydı (tam + artımlı) ve canlı çalıştırmanın digest'i."""
+    path = str(tmp_path / "capture.ndjson.gz")
+    monkeypatch.setattr(bot_config, "CAPTURE_FILE", path)
+    page_server.script("/kategori?pagingOffset=60", (429, {"Retry-After": "0"}, b""))
+    bot = BotEngineV11(db_name=str(tmp_path / "live.db"), base_url=page_server.url + "/kategori")
+    try:
+        for i in range(2):
+            Clock.freeze(T0 + i * 3600)
+            bot.run_cycle(cycle_index=i)
+        live = CrawlReplayer(bot, None, path).digest()
+    finally:
+        Clock.release()
+        bot.close()
+    return path, live
+
+
+def replay(path, db, tmp_path):
+    out = tmp_path / "report.json"
+    main(["replay", path, "--db", str(db), "--fresh", "-o", str(out)])
+    return json.loads(out.read_text(encoding="utf-8"))
+
+
+def test_replay_is_deterministic(capture, tmp_path):
+    path, live = capture
+    records = list(CaptureRecorder.read(path))
+    assert [r['full'] for r in records if r['type'] == 'cycle'] == [True, False]
+    assert {r['status'] for r in records if r['type'] == 'response'} >= {200, 304, 429}
+
+    first = replay(path, tmp_path / "replay.db", tmp_path)
+    second = replay(path, tmp_path / "replay.db", tmp_path)
+    assert first['cycles'] == 2 and first['listings'] == 190
+    # Tam döngünün tüm kayıtlı yanıtları (429 tekrarı dahil) tüketildi
+    assert first['per_cycle'][0]['unused'] == 0
+    assert first['per_cycle'][0]['evaluated'] > 0
+    assert first['digest'] == second['digest'] == live
+    assert Clock._frozen is None
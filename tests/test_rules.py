@@ -0,0 +1,65 @@
+"""
+Hatalı rules.json (eksik alan, geçersiz regex, yanlış tipte bölüm) yüklenmez;
+eldeki kurallar kalır ve aynı bozuk dosya tekrar denenmez.
+"""
+import copy
+import json
+
+import pytest
+
+from ProSearcher_V11 import Config, ConfigLoader
+
+with open(Config.RULES_FILE, encoding="utf-8") as _f: RULES = json.load(_f)
+
+
+def broken(path, value):
+    """RULES kopyasında `path` (ör. 'TAXONOMY.SPECS') değerini değiştirir."""
+    data = copy.deepcopy(RULES)
+    *parents, key = path.split(".")
+    node = data
+    for p in parents: node = node[p]
+    node[key] = value
+    return data
+
+
+@pytest.mark.parametrize("path, value", [
+    ("TAXONOMY.SPECS", []),
+    ("TAXONOMY.CATEGORIES", [{"regex": "(x)"}]),
+    ("TAXONOMY.BRANDS", "asus"),
+    ("SELECTORS", [{"name": "x"}]),
+    ("SELECTORS.strategies", {"name": "x"}),
+    ("TAXONOMY.CATEGORIES.Monitor.dominant_spec", ["refresh_rate"]),
+])
+def test_wrong_section_types_are_reported(path, value):
+    errors = ConfigLoader.validate(broken(path, value))
+    assert errors
+
+
+def test_valid_rules_pass():
+    assert ConfigLoader.validate(RULES) == []
+
+
+@pytest.fixture
+def loader_state():
+    saved = (ConfigLoader._rules, ConfigLoader._stamp, ConfigLoader._checked)
+    yield
+    ConfigLoader._rules, ConfigLoader._stamp, ConfigLoader._checked = saved
+
+
+@pytest.mark.parametrize("payload", [
+    broken("TAXONOMY.SPECS", []),
+    broken("TAXONOMY.CATEGORIES", ["x"]),
+    [1, 2, 3],
+])
+def test_bad_file_keeps_previous_rules(tmp_path, loader_state, payload):
+    path = tmp_path / "rules.json"
+    path.write_text(json.dumps(RULES), encoding="utf-8")
+    assert ConfigLoader.load(str(path))
+    version = ConfigLoader.get_version()
+
+    path.write_text(json.dumps(payload), encoding="utf-8")
+    assert ConfigLoader.reload_if_changed(str(path)) is False
+    assert ConfigLoader.get_version() == version
+    assert ConfigLoader.get_taxonomy() == RULES["TAXONOMY"]
+    # Damga ilerledi: aynı bozuk dosya sonraki döngülerde tekrar yüklenmeye çalışılmaz
+    assert ConfigLoader.reload_if_changed(str(path)) is False
@@ -0,0 +1,78 @@
+"""
+StatsCache her seviyede (küme / marka / kategori) get_prices +
+MathEngine.calc_robust_stats ile birebir aynı sonucu vermeli: kurulumdan
+sonra, upsert ile artımlı fiyat değişimlerinden ve pasifleştirmeden sonra.
+"""
+import random
+
+import pytest
+
+from ProSearcher_V11 import Config, DatabaseManager, Listing, MathEngine
+from benchmarks.synthetic import generate
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = DatabaseManager(str(tmp_path / "test.db"))
+    ads = [Listing(**ad) for ad in generate(3000, seed=9)]
+    # Tekrar ilanlar: grup her seviyede bir kez, en düşük fiyatıyla sayılır
+    ads += [Listing(f"re{i}", ad.baslik, ad.fiyat * 1.02, ad.currency, f"https://x/re{i}")
+            for i, ad in enumerate(ads[:200])]
+    for i in range(0, len(ads), 500): db.upsert_many(ads[i:i + 500])
+    db.stats.rebuild()
+    yield db
+    db.conn.close()
+
+
+def reference(db, category, brand, cluster_key):
+    """V10 yolu: küme fiyatları, yetersizse marka (L1/L2 fallback)."""
+    prices = db.get_prices(category, brand, cluster_key)
+    if len(prices) < Config.MIN_SAMPLE_SIZE: prices = db.get_prices(category, brand=brand)
+    return MathEngine.calc_robust_stats(prices)
+
+
+def assert_matches(db):
+    classes = db.conn.execute("SELECT DISTINCT category, brand, cluster_key FROM ilan").fetchall()
+    assert len(classes) > 10
+    for category, brand, cluster_key in classes:
+        assert db.stats.lookup(category, brand, cluster_key) == reference(db, category, brand, cluster_key)
+        # Fallback'ten bağımsız, her seviye ayrı ayrı
+        for args in ((category, brand, cluster_key), (category, brand), (category,)):
+            key = db.stats.level_key(*args)
+            assert db.stats.stats(key) == MathEngine.calc_robust_stats(db.get_prices(*args)), key
+
+
+def test_matches_after_rebuild(db):
+    assert_matches(db)
+
+
+def test_matches_after_incremental_updates(db):
+    rng = random.Random(9)
+    rows = db.conn.execute("SELECT ilan_id, baslik, fiyat, para_birimi, ilan_url FROM ilan").fetchall()
+    for _ in range(3):
+        # Fiyat düşüşü/artışı: grubun en düşük fiyatı da değişebilir
+        ads = [Listing(r['ilan_id'], r['baslik'], round(r['fiyat'] * rng.choice([0.5, 0.9, 1.1, 2.0]), 2),
+                       r['para_birimi'], r['ilan_url']) for r in rng.sample(rows, 400)]
+        db.upsert_many(ads)
+        assert_matches(db)
+
+
+def test_matches_after_removal(db):
+    ids = [r[0] for r in db.conn.execute("SELECT ilan_id FROM ilan ORDER BY ilan_id").fetchall()]
+    rng = random.Random(3)
+    db.deactivate(rng.sample(ids, 800))
+    assert_matches(db)
+    # Bir kümenin neredeyse tamamı gider: fallback seviyesi değişir
+    category, cluster_key = db.conn.execute("""
+        SELECT category, cluster_key FROM ilan WHERE aktif_mi=1 AND cluster_key != 'generic'
+        GROUP BY category, cluster_key ORDER BY COUNT(*) DESC LIMIT 1
+    """).fetchone()
+    active = [r[0] for r in db.conn.execute(
+        "SELECT ilan_id FROM ilan WHERE aktif_mi=1 AND category=? AND cluster_key=?", (category, cluster_key))]
+    db.deactivate(active[:-3])
+    assert_matches(db)
+    # Pasif ilan tekrar görülür
+    r = db.conn.execute("SELECT ilan_id, baslik, fiyat, para_birimi, ilan_url FROM ilan WHERE ilan_id=?",
+                        (active[0],)).fetchone()
+    db.upsert(Listing(*r))
+    assert_matches(db)
@@ -0,0 +1,116 @@
+"""
+CompiledTaxonomy (önceden derlenmiş regexler + Aho-Corasick marka otomatı),
+V10'daki ilk-eşleşme döngüsüyle birebir aynı sonucu vermeli.
+"""
+import json
+import random
+import re
+
+import pytest
+
+from ProSearcher_V11 import CompiledTaxonomy, Config, ConfigLoader
+from benchmarks.synthetic import FILLERS, MODELS, alternatives, generate
+
+with open(Config.RULES_FILE, encoding="utf-8") as _f: RULES = json.load(_f)["TAXONOMY"]
+TAXONOMIES = {"embedded": ConfigLoader.default_taxonomy(), "rules.json": RULES}
+
+
+def baseline_analyze(conf, title):
+    """V10 TaxonomyEngine.analyze: kategoriler ve markalar sırayla, ilk eşleşme kazanır."""
+    t_low = title.lower()
+    res = {'category': 'Diğer', 'brand': 'Unknown', 'tier': 'UNKNOWN', 'cluster_key': 'generic'}
+    for cat, det in conf['CATEGORIES'].items():
+        if re.search(det['regex'], t_low):
+            res['category'] = cat
+            if 'dominant_spec' in det:
+                m = re.search(conf['SPECS'][det['dominant_spec']]['regex'], t_low)
+                if m: res['dominant_spec'] = m.group(1)
+            break
+    for br, det in conf['BRANDS'].items():
+        for syn in det['synonyms']:
+            if syn in t_low:
+                res['brand'] = br
+                res['tier'] = det['tier']
+                break
+        if res['brand'] != 'Unknown': break
+    parts = []
+    if res['brand'] != 'Unknown': parts.append(res['brand'].lower())
+    if res.get('dominant_spec'): parts.append(res.get('dominant_spec'))
+    if parts: res['cluster_key'] = "_".join(parts)
+    return res
+
+
+def as_dict(res):
+    d = {'category': res.category, 'brand': res.brand, 'tier': res.tier, 'cluster_key': res.cluster_key}
+    if res.dominant_spec: d['dominant_spec'] = res.dominant_spec
+    return d
+
+
+def vocabulary(conf):
+    words = [s for det in conf['BRANDS'].values() for s in det['synonyms']]
+    words += [a for det in conf['CATEGORIES'].values() for a in alternatives(det['regex'])]
+    words += [a for det in conf['SPECS'].values() for a in alternatives(det['regex'])]
+    return words + FILLERS + MODELS
+
+
+def random_titles(conf, n, seed):
+    rng = random.Random(seed)
+    words = vocabulary(conf)
+    titles = []
+    for _ in range(n):
+        parts = rng.sample(words, rng.randint(1, 6))
+        if rng.random() < 0.3:
+            # Kelime içine gömülü eşanlamlılar (ör. "xasusq") ve büyük/küçük harf karışımı
+            i = rng.randrange(len(parts))
+            parts[i] = rng.choice("xqz") + parts[i] + rng.choice("xqz")
+        title = " ".join(parts)
+        titles.append(title.upper() if rng.random() < 0.1 else title)
+    return titles
+
+
+def overlapping_titles(conf):
+    """Birden fazla markanın eşanlamlısını (ve iç içe geçen eşanlamlıları) aynı başlıkta taşır."""
+    syns = [(br, s) for br, det in conf['BRANDS'].items() for s in det['synonyms']]
+    titles = []
+    for (b1, s1) in syns:
+        for (b2, s2) in syns:
+            if b1 == b2: continue
+            titles += [f"{s1} {s2} monitör", f"{s2}{s1}", f"ekran kartı {s1}-{s2} 3080"]
+    # Bir eşanlamlının diğerini içerdiği çiftler: ilk-eşleşme sırası belirleyici
+    for (b1, s1) in syns:
+        for (b2, s2) in syns:
+            if b1 != b2 and s1 in s2: titles.append(f"sadece {s2} var")
+    return titles
+
+
+@pytest.mark.parametrize("name", sorted(TAXONOMIES))
+def test_random_titles_match_baseline(name):
+    conf = TAXONOMIES[name]
+    compiled = CompiledTaxonomy(conf)
+    titles = random_titles(conf, 5000, seed=11) + [ad["baslik"] for ad in generate(2000, seed=3)]
+    for title in titles:
+        assert as_dict(compiled.analyze(title)) == baseline_analyze(conf, title), title
+
+
+@pytest.mark.parametrize("name", sorted(TAXONOMIES))
+def test_overlapping_synonyms_match_baseline(name):
+    conf = TAXONOMIES[name]
+    compiled = CompiledTaxonomy(conf)
+    for title in overlapping_titles(conf):
+        assert as_dict(compiled.analyze(title)) == baseline_analyze(conf, title), title
+
+
+def test_synonym_priority_follows_brand_order():
+    # Sonraki markanın eşanlamlısı öncekinin alt dizgesi / üst dizgesi olsa da sıra kazanır
+    conf = {
+        'CATEGORIES': {'X': {'regex': '(x)'}},
+        'SPECS': {},
+        'BRANDS': {
+            'Long': {'synonyms': ['abcd'], 'tier': 'T1'},
+            'Short': {'synonyms': ['bc', 'a'], 'tier': 'T2'},
+            'Empty': {'synonyms': ['zz', 'cd'], 'tier': 'T3'},
+        },
+    }
+    compiled = CompiledTaxonomy(conf)
+    for title in ["abcd", "xbcd", "zzcd", "cd abc", "q", "ABCD zz", "bcd"]:
+        assert as_dict(compiled.analyze(title)) == baseline_analyze(conf, title), title
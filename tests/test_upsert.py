@@ -0,0 +1,70 @@
+"""
+upsert_many (tek transaction, toplu) sıralı upsert ile aynı durumu yazmalı:
+fiyat değişim sayısı, hızlar, fiyat geçmişi, tekrar ilan grupları; batch
+içinde aynı ilan birden fazla kez geçse de.
+"""
+import random
+from datetime import datetime
+
+import pytest
+
+from ProSearcher_V11 import Clock, DatabaseManager, Listing
+from benchmarks.synthetic import generate
+
+START = datetime(2026, 3, 1, 12, 0, 0).timestamp()
+COLUMNS = ["ilan_id", "baslik", "category", "brand", "tier", "cluster_key", "fiyat", "fiyat_norm",
+           "first_seen", "last_seen", "initial_price", "price_change_count", "hourly_velocity",
+           "recent_velocity", "aktif_mi", "dup_group_id"]
+
+
+@pytest.fixture
+def frozen():
+    yield
+    Clock.release()
+
+
+def rounds(seed=4, n=400, cycles=6):
+    """Döngü başına ilan listesi: fiyat değişimleri, tekrar ilanlar ve batch içi tekrarlar."""
+    rng = random.Random(seed)
+    pool = [Listing(**ad) for ad in generate(n, seed=seed)]
+    out = []
+    for c in range(cycles):
+        batch = []
+        for ad in rng.sample(pool, n // 2):
+            price = ad.fiyat * rng.choice([1, 1, 1, 0.9, 1.15])
+            batch.append(Listing(ad.ilan_id, ad.baslik, round(price, 2), ad.currency, ad.ilan_url))
+        # Aynı ilan batch'te ikinci kez, farklı fiyatla
+        for ad in rng.sample(batch, 20):
+            batch.insert(rng.randrange(len(batch) + 1),
+                         Listing(ad.ilan_id, ad.baslik, round(ad.fiyat * 0.95, 2), ad.currency, ad.ilan_url))
+        # Tekrar ilan: mevcut bir ilanın başlığıyla yeni id
+        for j, ad in enumerate(rng.sample(batch, 10)):
+            batch.insert(rng.randrange(len(batch) + 1),
+                         Listing(f"re{c}_{j}", ad.baslik, ad.fiyat, ad.currency, f"https://x/re{c}_{j}"))
+        out.append(batch)
+    return out
+
+
+def state(db):
+    rows = db.conn.execute(f"SELECT {','.join(COLUMNS)} FROM ilan ORDER BY ilan_id").fetchall()
+    history = db.conn.execute("SELECT * FROM ilan_price_history ORDER BY ilan_id, ts").fetchall()
+    return [tuple(r) for r in rows], [tuple(r) for r in history]
+
+
+def test_batch_matches_sequential(tmp_path, frozen):
+    batch_db = DatabaseManager(str(tmp_path / "batch.db"))
+    seq_db = DatabaseManager(str(tmp_path / "seq.db"))
+    for c, ads in enumerate(rounds()):
+        # Döngüler arası 5 saat; aynı döngüdeki batch içi tekrarlar aynı saniyede
+        Clock.freeze(START + c * 5 * 3600)
+        batch_res = batch_db.upsert_many(ads)
+        seq_res = [seq_db.upsert(ad) for ad in ads]
+        assert [r[2:] for r in batch_res] == [r[2:] for r in seq_res]
+        assert [r[1].dup_group_id for r in batch_res] == [r[1].dup_group_id for r in seq_res]
+    rows, history = state(batch_db)
+    assert (rows, history) == state(seq_db)
+    # Senaryo gerçekten değişim, hız ve tekrar grubu üretti
+    assert any(r[COLUMNS.index("price_change_count")] > 1 for r in rows)
+    assert any(r[COLUMNS.index("recent_velocity")] for r in rows)
+    assert any(r[0] != r[COLUMNS.index("dup_group_id")] for r in rows)
+    for db in (batch_db, seq_db): db.conn.close()